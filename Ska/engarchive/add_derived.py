@@ -19,6 +19,7 @@ import numpy as np
 import Ska.engarchive.fetch as fetch
 import Ska.engarchive.file_defs as file_defs
 import Ska.engarchive.derived as derived
+import Ska.engarchive.storage as storage
 
 
 def get_options():
@@ -35,6 +36,10 @@ def get_options():
     parser.add_option("--content",
                       action='append',
                       help="Content type to process [match regex] (default = all)")
+    parser.add_option("--storage-layout",
+                      type='int',
+                      default=storage.DEFAULT_LAYOUT,
+                      help="Storage layout version for new MSID files")
     return parser.parse_args()
 
 
@@ -102,19 +107,13 @@ def make_msid_file(colname, content, content_def):
         dp_vals = np.asarray(dp.calc(dataset), dtype=dp.dtype)
 
     # Finally make the actual MSID data file
-    filters = tables.Filters(complevel=5, complib='zlib')
-    h5 = tables.open_file(filename, mode='w', filters=filters)
-
     n_rows = int(20 * 3e7 / content_def['time_step'])
     h5shape = (0,)
     h5type = tables.Atom.from_dtype(dp_vals.dtype)
-    h5.create_earray(h5.root, 'data', h5type, h5shape, title=colname,
-                     expectedrows=n_rows)
-    h5.create_earray(h5.root, 'quality', tables.BoolAtom(), (0,), title='Quality',
-                     expectedrows=n_rows)
+    storage.create_msid_file(filename, colname, h5type, h5shape, n_rows,
+                             layout=opt.storage_layout)
 
     logger.info('Made {} shape={} with n_rows(1e6)={}'.format(colname, h5shape, n_rows / 1.0e6))
-    h5.close()
 
 
 def main():
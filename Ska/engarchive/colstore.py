@@ -0,0 +1,304 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+Memory-mapped raw column store mirror of the full-resolution MSID files.
+
+For selected content types the ``data`` and ``quality`` columns of every
+full-resolution MSID HDF5 file (including TIME) are mirrored as uncompressed
+``.npy`` files in the ``colstore`` directory of the content, along with a small
+JSON index giving the number of valid rows of each column.  Fetch reads these
+with ``np.load(..., mmap_mode='c')`` and slices them without any decompression
+or PyTables overhead.  The mirror uses the same row numbering as the HDF5
+files, so the row slice from ``archfiles.db3`` applies directly.
+
+A content type is selected for mirroring by the existence of its ``colstore``
+directory (``msid_files['colstore']``), which is created with :func:`enable`
+(e.g. via ``update_archive.py --colstore-content``).  The mirror for every
+selected content is then brought up to date after each update by
+``update_archive`` and ``cheta_sync`` using :func:`sync_content`.
+
+The index is the commit point: a reader only uses a column if the index says
+it has at least the requested rows, otherwise it falls back to the HDF5 file.
+"""
+import io
+import json
+import os
+
+import numpy as np
+import tables
+
+INDEX_NAME = 'index.json'
+
+# Maximum number of rows copied from HDF5 into the mirror in one chunk
+SYNC_CHUNK_ROWS = 10_000_000
+
+# Cache of the parsed index for each colstore dir, keyed on the index mtime
+_index_cache = {}
+
+
+def get_filenames(colstore_dir, msid):
+    """
+    Get the ``data`` and ``quality`` mirror file names for ``msid``.
+
+    :param colstore_dir: colstore directory for the content
+    :param msid: MSID name
+    :returns: tuple (data file name, quality file name)
+    """
+    msid = msid.upper()
+    return (os.path.join(colstore_dir, msid + '.data.npy'),
+            os.path.join(colstore_dir, msid + '.quality.npy'))
+
+
+def is_enabled(colstore_dir):
+    """Return True if the column store mirror is enabled for ``colstore_dir``"""
+    return os.path.isdir(colstore_dir)
+
+
+def enable(colstore_dir):
+    """
+    Enable the column store mirror for a content by creating ``colstore_dir``.
+    The mirror files are populated on the next :func:`sync_content`.
+    """
+    os.makedirs(colstore_dir, exist_ok=True)
+
+
+def read_index(colstore_dir):
+    """
+    Read the index of valid row counts for the mirror in ``colstore_dir``.
+
+    The parsed index is cached and only re-read when the file changes.
+
+    :param colstore_dir: colstore directory for the content
+    :returns: dict of {MSID: number of rows}, empty if there is no index
+    """
+    filename = os.path.join(colstore_dir, INDEX_NAME)
+    try:
+        mtime = os.stat(filename).st_mtime_ns
+    except OSError:
+        return {}
+
+    cached = _index_cache.get(filename)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with open(filename, 'r') as fh:
+        n_rows = json.load(fh)['n_rows']
+    _index_cache[filename] = (mtime, n_rows)
+    return n_rows
+
+
+def write_index(colstore_dir, n_rows):
+    """
+    Atomically write the index of valid row counts ``n_rows`` in ``colstore_dir``.
+
+    :param colstore_dir: colstore directory for the content
+    :param n_rows: dict of {MSID: number of rows}
+    """
+    filename = os.path.join(colstore_dir, INDEX_NAME)
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'w') as fh:
+        json.dump({'n_rows': n_rows}, fh, sort_keys=True)
+    os.replace(tmp_filename, filename)
+
+
+def read_column(colstore_dir, msid, row_slice, n_rows=None):
+    """
+    Read rows ``row_slice`` of ``msid`` from the mirror as memory-mapped arrays.
+
+    The returned arrays are copy-on-write views of the mirror files, so they
+    can be modified in memory without affecting the files.
+
+    :param colstore_dir: colstore directory for the content
+    :param msid: MSID name
+    :param row_slice: slice of rows (same numbering as the HDF5 file)
+    :param n_rows: index of valid row counts (default=read index)
+    :returns: tuple (data, quality) or None if the rows are not in the mirror
+    """
+    if n_rows is None:
+        n_rows = read_index(colstore_dir)
+    if n_rows.get(msid.upper(), 0) < row_slice.stop:
+        return None
+
+    data_file, quality_file = get_filenames(colstore_dir, msid)
+    try:
+        data = np.load(data_file, mmap_mode='c')
+        quality = np.load(quality_file, mmap_mode='c')
+    except OSError:
+        return None
+
+    return data[row_slice], quality[row_slice]
+
+
+def _read_npy_header(fh):
+    """Read header of open .npy file, returning (shape, dtype, header length)"""
+    version = np.lib.format.read_magic(fh)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fh)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fh)
+    if fortran_order:
+        raise ValueError('column store file {} is not C-ordered'.format(fh.name))
+    return shape, dtype, fh.tell()
+
+
+def _make_npy_header(shape, dtype):
+    out = io.BytesIO()
+    np.lib.format.write_array_header_1_0(
+        out, {'descr': np.lib.format.dtype_to_descr(dtype),
+              'fortran_order': False,
+              'shape': tuple(shape)})
+    return out.getvalue()
+
+
+def get_npy_len(filename):
+    """Return the number of rows in .npy ``filename`` (0 if it does not exist)"""
+    try:
+        with open(filename, 'rb') as fh:
+            shape, dtype, header_len = _read_npy_header(fh)
+    except FileNotFoundError:
+        return 0
+    return shape[0]
+
+
+def _rewrite_npy(filename, n_rows, vals=None):
+    """Rewrite ``filename`` with the first ``n_rows`` rows plus ``vals``"""
+    old_vals = np.load(filename, mmap_mode='r')[:n_rows]
+    if vals is not None:
+        old_vals = np.concatenate([old_vals, vals])
+    tmp_filename = filename + '.tmp'
+    np.save(tmp_filename, old_vals)
+    os.replace(tmp_filename + '.npy', filename)
+
+
+def set_npy_rows(filename, n_rows, vals=None):
+    """
+    Set the length of .npy ``filename`` to ``n_rows`` rows and then append ``vals``.
+
+    A pure append (``n_rows`` equal to the current length) is written in place
+    and the shape in the header is updated last.  If the file shrinks
+    (``n_rows`` less than the current length, which may not be exceeded) or the
+    new header does not fit in the existing header space then the whole file is
+    rewritten to a temporary file that replaces it, since truncating in place
+    would invalidate the memory maps of readers (SIGBUS on access).
+
+    :param filename: .npy file name (created if it does not exist)
+    :param n_rows: number of existing rows to keep
+    :param vals: rows to append (optional)
+    """
+    if not os.path.exists(filename):
+        np.save(filename, vals)
+        return
+
+    with open(filename, 'r+b') as fh:
+        shape, dtype, header_len = _read_npy_header(fh)
+        if n_rows > shape[0]:
+            raise ValueError('cannot extend {} from {} to {} rows'
+                             .format(filename, shape[0], n_rows))
+        if vals is not None:
+            vals = np.ascontiguousarray(vals)
+            if vals.dtype != dtype or vals.shape[1:] != shape[1:]:
+                raise ValueError('dtype or shape of appended values {} {} does not '
+                                 'match {} {} in {}'.format(vals.dtype, vals.shape[1:],
+                                                            dtype, shape[1:], filename))
+
+        if n_rows == shape[0] and (vals is None or len(vals) == 0):
+            return
+
+        n_new = n_rows + (0 if vals is None else len(vals))
+        new_shape = (n_new,) + tuple(shape[1:])
+        header = _make_npy_header(new_shape, dtype)
+        if n_rows < shape[0] or len(header) != header_len:
+            fh.close()
+            _rewrite_npy(filename, n_rows, vals)
+            return
+
+        row_bytes = dtype.itemsize * int(np.prod(shape[1:], dtype=np.int64))
+        fh.seek(header_len + n_rows * row_bytes)
+        fh.write(vals.tobytes())
+        fh.flush()
+        fh.seek(0)
+        fh.write(header)
+
+
+def sync_msid(h5_filename, colstore_dir, msid, n_valid=None):
+    """
+    Bring the mirror of ``msid`` in ``colstore_dir`` up to date with the HDF5
+    file ``h5_filename``.
+
+    New rows are appended to the mirror and any rows beyond the end of the
+    HDF5 file (e.g. after the archive was truncated) are removed.
+
+    :param h5_filename: full-resolution MSID HDF5 file name
+    :param colstore_dir: colstore directory for the content
+    :param msid: MSID name
+    :param n_valid: number of leading mirror rows known to be valid (default=all)
+    :returns: number of rows in the mirror
+    """
+    data_file, quality_file = get_filenames(colstore_dir, msid)
+    n_mirror = min(get_npy_len(data_file), get_npy_len(quality_file))
+    if n_valid is not None:
+        n_mirror = min(n_mirror, n_valid)
+
+    with tables.open_file(h5_filename, mode='r') as h5:
+        n_rows = min(len(h5.root.data), len(h5.root.quality))
+        n_mirror = min(n_mirror, n_rows)
+        for filename in (data_file, quality_file):
+            if os.path.exists(filename):
+                set_npy_rows(filename, n_mirror)
+
+        for row0 in range(n_mirror, n_rows, SYNC_CHUNK_ROWS):
+            row1 = min(row0 + SYNC_CHUNK_ROWS, n_rows)
+            set_npy_rows(data_file, row0, h5.root.data[row0:row1])
+            set_npy_rows(quality_file, row0, h5.root.quality[row0:row1])
+
+        if n_rows == 0 and not os.path.exists(data_file):
+            # Create empty mirror files with the correct dtype
+            set_npy_rows(data_file, 0, h5.root.data[:0])
+            set_npy_rows(quality_file, 0, h5.root.quality[:0])
+
+    return n_rows
+
+
+def sync_content(contentdir, colstore_dir, colnames, rowstart=None, logger=None):
+    """
+    Bring the mirror in ``colstore_dir`` up to date with the full-resolution
+    MSID HDF5 files in ``contentdir``.
+
+    The index is first reduced to the rows that remain valid in both the mirror
+    and the HDF5 files, then each column is synced, and finally the index is
+    updated with the new row counts.  A reader therefore never sees rows in
+    the index that are not yet (or no longer) in the mirror files.
+
+    :param contentdir: content directory with the MSID HDF5 files
+    :param colstore_dir: colstore directory for the content
+    :param colnames: MSID names to mirror (including TIME)
+    :param rowstart: re-copy all rows from ``rowstart`` onward, e.g. after rows
+        were modified in place (default=only copy new rows)
+    :param logger: logger for progress messages (optional)
+    :returns: dict of {MSID: number of rows} for all mirrored MSIDs
+    """
+    old_n_rows = read_index(colstore_dir)
+    h5_files = {}
+    safe_n_rows = dict(old_n_rows)
+    for colname in colnames:
+        msid = colname.upper()
+        h5_filename = os.path.join(contentdir, msid + '.h5')
+        if not os.path.exists(h5_filename):
+            continue
+        h5_files[msid] = h5_filename
+        with tables.open_file(h5_filename, mode='r') as h5:
+            n_h5 = min(len(h5.root.data), len(h5.root.quality))
+        safe_n_rows[msid] = min(old_n_rows.get(msid, 0), n_h5)
+        if rowstart is not None:
+            safe_n_rows[msid] = min(safe_n_rows[msid], rowstart)
+
+    if safe_n_rows != old_n_rows:
+        write_index(colstore_dir, safe_n_rows)
+
+    n_rows = dict(safe_n_rows)
+    for msid, h5_filename in h5_files.items():
+        n_rows[msid] = sync_msid(h5_filename, colstore_dir, msid, safe_n_rows[msid])
+        if logger is not None and n_rows[msid] != safe_n_rows[msid]:
+            logger.verbose('Synced {} colstore mirror to {} rows'.format(msid, n_rows[msid]))
+
+    write_index(colstore_dir, n_rows)
+    return n_rows
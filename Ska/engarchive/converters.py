@@ -85,6 +85,41 @@ def generic_converter(prefix=None, add_quality=False, aliases=None):
     return _convert
 
 
+# Cache of fixed-width byte string arrays of state codes for single-bit MSIDs,
+# keyed by MSID name.  Element 0 is the state code for a bit value of 0, element 1
+# for a bit value of 1.
+_bit_state_codes_cache = {}
+
+
+def get_bit_state_codes(out_name):
+    """
+    Return a 2-element fixed-width byte string array of state codes for the
+    single-bit MSID ``out_name``.  The TDB is queried only on the first call for
+    each MSID and the result is cached.
+    """
+    try:
+        return _bit_state_codes_cache[out_name]
+    except KeyError:
+        pass
+
+    try:
+        tscs = Ska.tdb.msids[out_name].Tsc
+        scs = {tsc['LOW_RAW_COUNT']: tsc['STATE_CODE'] for tsc in tscs}
+    except (KeyError, AttributeError):
+        scs = {0: 'OFF', 1: 'ON '}
+
+    # CXC telemetry stores state code vals with trailing spaces so all match
+    # in length.  Annoying, but reproduce this here for consistency so
+    # fetch Msid.raw_vals does the right thing.
+    max_len = max(len(sc) for sc in scs.values())
+    fmtstr = '{:' + str(max_len) + 's}'
+    scs = [fmtstr.format(val) for key, val in scs.items()]
+
+    out = np.array(scs[:2], dtype='S{}'.format(max_len))
+    _bit_state_codes_cache[out_name] = out
+    return out
+
+
 def get_bit_array(dat, in_name, out_name, bit_index):
     bit_indexes = [int(bi) for bi in bit_index.split(',')]
     bit_index = max(bit_indexes)
@@ -94,28 +129,15 @@ def get_bit_array(dat, in_name, out_name, bit_index):
                              .format(in_name, dat[in_name].shape[1], bit_index + 1))
 
     if len(bit_indexes) > 1:
-        mult = 1
-        out_array = np.zeros(len(dat), dtype=np.uint32)  # no more than 32 bit indexes
-        for bit_index in reversed(bit_indexes):
-            # Note: require casting mult and 0 to uint32 because recent versions of numpy
-            # disallow in-place adding of int64 to uint32.
-            out_array += np.where(dat[in_name][:, bit_index], np.uint32(mult), np.uint32(0))
-            mult *= 2
+        # Unpack selected bits (first index is the most significant) into an
+        # unsigned int with a dot product against the corresponding powers of 2.
+        # No more than 32 bit indexes.
+        bits = dat[in_name][:, bit_indexes] != 0
+        powers = 2 ** np.arange(len(bit_indexes) - 1, -1, -1, dtype=np.uint32)
+        out_array = np.dot(bits.astype(np.uint32), powers)
     else:
-        try:
-            tscs = Ska.tdb.msids[out_name].Tsc
-            scs = {tsc['LOW_RAW_COUNT']: tsc['STATE_CODE'] for tsc in tscs}
-        except (KeyError, AttributeError):
-            scs = ['OFF', 'ON ']
-
-        # CXC telemetry stores state code vals with trailing spaces so all match
-        # in length.  Annoying, but reproduce this here for consistency so
-        # fetch Msid.raw_vals does the right thing.
-        max_len = max(len(sc) for sc in scs.values())
-        fmtstr = '{:' + str(max_len) + 's}'
-        scs = [fmtstr.format(val) for key, val in scs.items()]
-
-        out_array = np.where(dat[in_name][:, bit_index], scs[1], scs[0])
+        scs = get_bit_state_codes(out_name)
+        out_array = scs[(dat[in_name][:, bit_index] != 0).astype(np.intp)]
 
     return out_array
 
@@ -137,7 +159,7 @@ def generic_converter2(msid_cxc_map, default_dtypes=None):
         out_arrays = {'TIME': dat['TIME'],
                       'QUALITY': out_quality}
 
-        for out_name, in_name in msid_cxc_map.items():
+        for i_out, (out_name, in_name) in enumerate(msid_cxc_map.items(), 2):
             if ':' in in_name:
                 in_name, bit_index = in_name.split(':')
                 out_array = get_bit_array(dat, in_name, out_name, bit_index)
@@ -154,7 +176,7 @@ def generic_converter2(msid_cxc_map, default_dtypes=None):
 
             assert out_array.ndim == 1
             out_arrays[out_name] = out_array
-            out_quality[:, out_names.index(out_name)] = quality
+            out_quality[:, i_out] = quality
 
         out = Ska.Numpy.structured_array(out_arrays, out_names)
         return out
@@ -508,41 +530,56 @@ def acisdeahk(dat):
     if len(rows) == 0:
         raise NoValidDataError()
 
-    # Go through input data one row (query) at a time and assemble contemporaneous
-    # queries into a single row with a column for each query value.
-    # Collect each assembled row into %data_out for writing to a FITS bin table
+    # Assemble contemporaneous queries (blocks of rows with the same TIME) into a
+    # single output row with a column for each query value.  Each block is
+    # identified by TIME discontinuities and every query row is scattered into
+    # (n_blocks x n_cols) arrays at (block id, column index for QUERY_ID).
     block_idxs = 1 + numpy.flatnonzero(numpy.abs(rows['TIME'][1:] - rows['TIME'][:-1]) > 0.001)
     block_idxs = numpy.hstack([[0], block_idxs, [len(rows)]])
-    query_val_tus = rows['QUERY_VAL_TU']
-    query_vals = rows['QUERY_VAL']
-    query_ids = rows['QUERY_ID']
-    times = rows['TIME']
-
-    outs = []
-    for i0, i1 in zip(block_idxs[:-1], block_idxs[1:]):
-        # Map query_id to an index into rows for each row in the block
-        id_idxs = dict((query_ids[i], i) for i in range(i0, i1))
-
-        # Make tuples of the values and qual flags corresponding to each DEAHK_COLUMN
-        bads = tuple(query_id not in id_idxs for query_id in col_query_ids)
-        vals = tuple((0.0 if bad else query_vals[id_idxs[query_id]])
-                     for bad, query_id in zip(bads, col_query_ids))
-        val_tus = tuple((0 if bad else query_val_tus[id_idxs[query_id]])
-                        for bad, query_id in zip(bads, col_query_ids))
-
-        # Now have another pass at finding bad values.  Take these out now so the
-        # 5min and daily stats are not frequently corrupted.
-        bads = tuple(True if (val_tu == 65535 or numpy.isnan(val)) else bad
-                     for bad, val, val_tu in zip(bads, vals, val_tus))
-
-        quality = (False, False) + bads
-        outs.append((times[i0], quality) + vals)
+    n_blocks = len(block_idxs) - 1
+    n_cols = len(col_names)
+    block_ids = numpy.repeat(numpy.arange(n_blocks), numpy.diff(block_idxs))
+
+    # Lookup array mapping QUERY_ID to column index, or -1 for unused query ids
+    query_ids = rows['QUERY_ID'].astype(numpy.int64)
+    col_idx_lookup = numpy.full(max(col_query_ids) + 1, -1, dtype=numpy.int64)
+    col_idx_lookup[list(col_query_ids)] = numpy.arange(n_cols)
+    col_idxs = numpy.full(len(rows), -1, dtype=numpy.int64)
+    in_range = (query_ids >= 0) & (query_ids < len(col_idx_lookup))
+    col_idxs[in_range] = col_idx_lookup[query_ids[in_range]]
+    ok = col_idxs >= 0
+
+    # Flat index into the output arrays.  If a query id repeats within a block
+    # then the last query wins, so keep only the last row for each flat index.
+    flat_idxs = (block_ids * n_cols + col_idxs)[ok]
+    _, i_last = numpy.unique(flat_idxs[::-1], return_index=True)
+    i_last = len(flat_idxs) - 1 - i_last
+    flat_idxs = flat_idxs[i_last]
+
+    # Missing queries are bad with value 0.0 and val_tu 0
+    vals = numpy.zeros((n_blocks, n_cols), dtype=numpy.float64)
+    val_tus = numpy.zeros((n_blocks, n_cols), dtype=numpy.int64)
+    bads = numpy.ones((n_blocks, n_cols), dtype=bool)
+    vals.flat[flat_idxs] = rows['QUERY_VAL'][ok][i_last]
+    val_tus.flat[flat_idxs] = rows['QUERY_VAL_TU'][ok][i_last]
+    bads.flat[flat_idxs] = False
+
+    # Now have another pass at finding bad values.  Take these out now so the
+    # 5min and daily stats are not frequently corrupted.
+    bads |= (val_tus == 65535) | numpy.isnan(vals)
 
     dtype = [('TIME', numpy.float64),
              ('QUALITY', numpy.bool, (len(col_names) + 2,))]
     dtype += [(col_name, numpy.float32) for col_name in col_names]
 
-    return numpy.rec.fromrecords(outs, dtype=dtype)
+    out = numpy.recarray(n_blocks, dtype=dtype)
+    out['TIME'] = rows['TIME'][block_idxs[:-1]]
+    out['QUALITY'][:, :2] = False
+    out['QUALITY'][:, 2:] = bads
+    for i_col, col_name in enumerate(col_names):
+        out[col_name] = vals[:, i_col]
+
+    return out
 
 
 def _get_deahk_cols():
@@ -15,6 +15,7 @@ import numpy as np
 from Chandra.Time import DateTime
 
 from ..units import converters as unit_converter_funcs
+from ..utils import STATS_DT, STATS_LEVELS
 
 __all__ = ['ComputedMsid', 'Comp_MUPS_Valve_Temp_Clean', 'Comp_KadiCommandState']
 
@@ -33,12 +34,14 @@ def calc_stats_vals(msid, rows, indexes, interval):
     :param msid: Msid object (filter_bad=True)
     :param rows: Msid row indices corresponding to stat boundaries
     :param indexes: Universal index values for stat (row times // dt)
-    :param interval: interval name (5min or daily)
+    :param interval: interval name (key of STATS_LEVELS)
 
     :returns: np.recarray of stats values
     """
     import scipy.stats
 
+    level = STATS_LEVELS[interval]
+
     quantiles = (1, 5, 16, 50, 84, 95, 99)
     n_out = len(rows) - 1
 
@@ -64,8 +67,9 @@ def calc_stats_vals(msid, rows, indexes, interval):
         out['max'] = np.ndarray((n_out,), dtype=msid_dtype)
         out['mean'] = np.ndarray((n_out,), dtype=np.float32)
 
-        if interval == 'daily':
+        if level['std']:
             out['std'] = np.ndarray((n_out,), dtype=msid_dtype)
+        if level['percentiles']:
             for quantile in quantiles:
                 out['p{:02d}'.format(quantile)] = np.ndarray((n_out,), dtype=msid_dtype)
 
@@ -106,11 +110,12 @@ def calc_stats_vals(msid, rows, indexes, interval):
                 out['min'][i] = np.min(vals)
                 out['max'][i] = np.max(vals)
                 out['mean'][i] = np.sum(dts * vals) / sum_dts
-                if interval == 'daily':
+                if level['std']:
                     # biased weighted estimator of variance (N should be big enough)
                     # http://en.wikipedia.org/wiki/Mean_square_weighted_deviation
                     sigma_sq = np.sum(dts * (vals - out['mean'][i]) ** 2) / sum_dts
                     out['std'][i] = np.sqrt(sigma_sq)
+                if level['percentiles']:
                     quant_vals = scipy.stats.mstats.mquantiles(vals, np.array(quantiles) / 100.0)
                     for quant_val, quantile in zip(quant_vals, quantiles):
                         out['p%02d' % quantile][i] = quant_val
@@ -138,6 +143,11 @@ class ComputedMsid:
     # Global dict of registered computed MSIDs
     msid_classes = []
 
+    # Single compiled regex that matches any registered ``msid_match``.  This is
+    # built lazily by get_matching_comp_cls() and reset whenever a new subclass
+    # is registered.
+    _msid_classes_re = None
+
     # Base units specification (None implies no unit handling)
     units = None
 
@@ -152,6 +162,27 @@ class ComputedMsid:
             raise ValueError(f'comp {cls.__name__} must define msid_match')
 
         cls.msid_classes.append(cls)
+        ComputedMsid._msid_classes_re = None
+
+    @classmethod
+    def _get_msid_classes_re(cls):
+        """Get a single compiled regex matching any registered computed MSID.
+
+        Each ``msid_match`` pattern is wrapped in a named group ``_comp<N>``
+        where N is the index into ``msid_classes``.  Alternatives are tried in
+        order so the first matching class wins, as for a sequential search.
+        If the patterns cannot be combined (e.g. duplicate named groups) then
+        False is returned and the caller falls back to the sequential search.
+        """
+        if ComputedMsid._msid_classes_re is None:
+            pattern = '|'.join(f'(?P<_comp{ii}>(?:{comp_cls.msid_match})$)'
+                               for ii, comp_cls in enumerate(ComputedMsid.msid_classes))
+            try:
+                ComputedMsid._msid_classes_re = re.compile(pattern, re.IGNORECASE)
+            except re.error:
+                ComputedMsid._msid_classes_re = False
+
+        return ComputedMsid._msid_classes_re
 
     @classmethod
     def get_matching_comp_cls(cls, msid):
@@ -160,6 +191,16 @@ class ComputedMsid:
         :param msid: str, input msid
         :returns: first ComputedMsid subclass that matches ``msid`` or None
         """
+        if not ComputedMsid.msid_classes:
+            return None
+
+        msid_classes_re = cls._get_msid_classes_re()
+        if msid_classes_re:
+            match = msid_classes_re.match(msid)
+            if match:
+                return ComputedMsid.msid_classes[int(match.lastgroup[5:])]
+            return None
+
         for comp_cls in ComputedMsid.msid_classes:
             match = re.match(comp_cls.msid_match + '$', msid, re.IGNORECASE)
             if match:
@@ -202,7 +243,7 @@ class ComputedMsid:
         :param tstart: float, start time (CXC seconds)
         :param tstop: float, stop time (CXC seconds)
         :param msid: str, MSID name
-        :param interval: str or None, stats interval (None, '5min', 'daily')
+        :param interval: str or None, stats interval (None or key of STATS_DT)
 
         :returns: dict of MSID attributes including 'times', 'vals', 'bads'
         """
@@ -272,7 +313,7 @@ class ComputedMsid:
         raise NotImplementedError('sub-class must implement get_msid_attrs()')
 
     def get_stats_attrs(self, tstart, tstop, msid, match_args, interval):
-        """Get 5-min or daily stats attributes.
+        """Get stats attributes for ``interval`` (e.g. 5min or daily).
 
         This is normally not overridden by sub-classes.
 
@@ -287,8 +328,7 @@ class ComputedMsid:
         # Replicate a stripped-down version of processing in update_archive.
         # This produces a recarray with columns that correspond to the raw
         # stats HDF5 files.
-        dt = {'5min': 328,
-              'daily': 86400}[interval]
+        dt = STATS_DT[interval]
         index0 = int(np.floor(tstart / dt))
         index1 = int(np.ceil(tstop / dt))
         tstart = (index0 - 1) * dt
@@ -8,13 +8,17 @@ from __future__ import print_function, division, absolute_import
 import sys
 import os
 import time
+import bisect
 import contextlib
 import logging
 import operator
 import fnmatch
+import functools
+import inspect
 import collections
 import warnings
 import re
+import threading
 from pathlib import Path
 
 import numpy as np
@@ -26,7 +30,10 @@ import pickle
 from . import file_defs
 from .units import Units
 from . import cache
+from . import fetch_cache
+from . import colstore
 from . import remote_access
+from .utils import STATS_DT
 from .remote_access import ENG_ARCHIVE
 from .derived.comps import ComputedMsid
 from .lazy import LazyDict
@@ -41,6 +48,60 @@ UNITS = Units(system='cxc')
 # Module-level control of whether MSID.fetch will cache the last 30 results
 CACHE = False
 
+# Module-level default for whether MSID objects defer fetching data until first
+# use (see lazy())
+LAZY = False
+
+# Module-level default for whether string state values of MSID objects are stored
+# as integer ``codes`` into a table of ``categories`` (see MSID categorical)
+CATEGORICAL = False
+
+# Time chunks (sec) for the persistent fetch cache enabled with fetch_cache.enable(),
+# keyed by stat.  Stats chunks are a multiple of the stat interval.
+DISK_CACHE_CHUNK_DT = {None: 8 * 86400,
+                       '1min': 16384 * 60,
+                       '5min': 4096 * 328,
+                       'hourly': 4096 * 3600,
+                       'daily': 512 * 86400,
+                       'weekly': 128 * 604800}
+
+# Module-level control of whether full-resolution data are read from the
+# memory-mapped column store mirror for content types where it is available.
+COLSTORE = True
+
+# Shortest full-resolution sample interval (sec), used by select_stat() to
+# conservatively estimate the number of samples for MSIDs without archfiles
+# row counts (e.g. computed MSIDs).
+FULL_RES_DT_MIN = 0.25625
+
+# Number of rows formatted at a time by the CSV writer for MSID.write_zip()
+CSV_BLOCK_ROWS = 100000
+
+# Comparison functions for the logical operators of logical_intervals() and
+# find_intervals()
+LOGICAL_OPS = {'==': operator.eq,
+               '!=': operator.ne,
+               '>': operator.gt,
+               '<': operator.lt,
+               '>=': operator.ge,
+               '<=': operator.le}
+
+# Stats levels used by find_intervals() to prune the time range, from coarse
+# to fine, before reading full-resolution data in the remaining windows
+FIND_INTERVALS_STATS = ('daily', '5min')
+
+# Conditions on the stats (mins, maxes) of a bin under which "vals op val" may
+# hold for some sample in the bin.  The tolerance ``tol`` allows for rounding
+# differences between the unit conversion of the stats and full-resolution
+# values.  There is no pruning for '!='.
+_STATS_CANDIDATE_FUNCS = {
+    '==': lambda mins, maxes, val, tol: (mins <= val + tol) & (maxes >= val - tol),
+    '>': lambda mins, maxes, val, tol: maxes > val - tol,
+    '>=': lambda mins, maxes, val, tol: maxes >= val - tol,
+    '<': lambda mins, maxes, val, tol: mins < val + tol,
+    '<=': lambda mins, maxes, val, tol: mins <= val + tol,
+}
+
 IGNORE_COLNAMES = ('TIME', 'MJF', 'MNF', 'TLM_FMT')
 DIR_PATH = os.path.dirname(os.path.abspath(__file__))
 
@@ -142,20 +203,12 @@ class _DataSource(object):
         """
         Get the set of MSID names corresponding to ``source`` (e.g. 'cxc' or 'maude')
 
+        The returned frozenset is cached and shared, so it must not be modified.
+
         :param source: str
-        :returns: set of MSIDs
+        :returns: frozenset of MSIDs
         """
-        source = source.split()[0]
-
-        if source == 'cxc':
-            out = list(content.keys())
-        elif source == 'maude':
-            import maude
-            out = list(maude.MSIDS.keys())
-        else:
-            raise ValueError('source must be "cxc" or "msid"')
-
-        return set(out)
+        return _get_msid_index(source).names
 
     @classmethod
     def options(cls):
@@ -189,6 +242,87 @@ class _DataSource(object):
 data_source = _DataSource
 
 
+class _MsidIndex(object):
+    """
+    Name index of the MSIDs available from one data source.
+
+    This provides a frozenset for exact name lookups and a sorted list of names
+    that is bisected on the literal prefix of a glob pattern, so that only names
+    sharing that prefix need to be tested with fnmatch.
+
+    :param names: iterable of MSID names
+    :param token: value identifying the catalog state used to build the index
+    """
+    glob_chars_re = re.compile(r'[*?[]')
+
+    def __init__(self, names, token):
+        self.names = frozenset(names)
+        self.sorted_names = sorted(self.names)
+        self.token = token
+
+    def glob(self, pattern):
+        """Return the sorted list of names matching the file glob ``pattern``.
+        """
+        match = self.glob_chars_re.search(pattern)
+        if match is None:
+            return [pattern] if pattern in self.names else []
+
+        names = self.sorted_names
+        prefix = pattern[:match.start()]
+        if prefix:
+            # Names starting with ``prefix`` are a contiguous block in the sorted
+            # list, ending before the next possible prefix of the same length.
+            prefix_next = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+            i0 = bisect.bisect_left(names, prefix)
+            i1 = bisect.bisect_left(names, prefix_next, lo=i0)
+            names = names[i0:i1]
+
+        return fnmatch.filter(names, pattern)
+
+
+# Cache of _MsidIndex objects keyed by data source name
+_msid_indexes = {}
+
+
+def _get_msid_index(source):
+    """
+    Get the MSID name index for ``source`` (e.g. 'cxc' or 'maude').
+
+    The index is rebuilt if the source catalog has been replaced or changed size
+    since the index was made.  Use clear_msid_index() after any other in-place
+    modification of the catalog.
+
+    :param source: str
+    :returns: _MsidIndex
+    """
+    source = source.split()[0]
+
+    if source == 'cxc':
+        catalog = content
+    elif source == 'maude':
+        import maude
+        catalog = maude.MSIDS
+    else:
+        raise ValueError('source must be "cxc" or "msid"')
+
+    token = (id(catalog), len(catalog))
+    index = _msid_indexes.get(source)
+    if index is None or index.token != token:
+        logger.info('Building MSID name index for %s data source', source)
+        index = _MsidIndex(catalog.keys(), token)
+        _msid_indexes[source] = index
+
+    return index
+
+
+def clear_msid_index():
+    """
+    Clear the cached MSID name indexes used by msid_glob() and
+    data_source.get_msids().  Indexes are rebuilt on next use.
+    """
+    _msid_indexes.clear()
+
+
 def local_or_remote_function(remote_print_output):
     """
     Decorator maker so that a function gets run either locally or remotely
@@ -312,6 +446,12 @@ content = LazyDict(load_content, all_colnames)
 # The key is (content_type, tstart, tstop).
 times_cache = dict(key=None)
 
+# Fetching uses module-level state (the filetype context ``ft``, the
+# ``msid_files`` base directory and ``times_cache``), so fetches from different
+# threads (e.g. the ``iplot()`` background prefetch) are serialized with this
+# lock.  It is re-entrant since fetches can be nested.
+_fetch_lock = threading.RLock()
+
 
 # Set up logging.
 class NullHandler(logging.Handler):
@@ -364,10 +504,36 @@ def read_bad_times(table):
 
     for msid, start, stop in bad_times:
         msid_bad_times.setdefault(msid.upper(), []).append((start, stop))
+    _msid_bad_times_secs.clear()
+
+
+def _get_msid_bad_times(MSID):
+    """
+    Get the bad times for ``MSID`` from the ``msid_bad_times`` registry as
+    arrays of CXC seconds sorted by start time.  The glob matching and time
+    conversion are done once per MSID and cached until the registry changes.
+
+    :param MSID: MSID name (upper case)
+    :returns: tuple (tstarts, tstops)
+    """
+    if _msid_bad_times_secs.get('_registry') is not msid_bad_times:
+        _msid_bad_times_secs.clear()
+        _msid_bad_times_secs['_registry'] = msid_bad_times
+
+    if MSID not in _msid_bad_times_secs:
+        bad_times = [bad_time for msid_glob, times in msid_bad_times.items()
+                     if fnmatch.fnmatch(MSID, msid_glob)
+                     for bad_time in times]
+        tstarts, tstops = _get_intervals_secs(bad_times)
+        order = np.argsort(tstarts, kind='stable')
+        _msid_bad_times_secs[MSID] = (tstarts[order], tstops[order])
+
+    return _msid_bad_times_secs[MSID]
 
 
-# Set up bad times dict
+# Set up bad times dict and cache of bad times in seconds for each MSID
 msid_bad_times = dict()
+_msid_bad_times_secs = dict()
 read_bad_times(os.path.join(DIR_PATH, 'msid_bad_times.dat'))
 
 
@@ -414,13 +580,13 @@ def _msid_glob(msid, source):
     :param msid: input MSID glob
     :returns: tuple (msids, MSIDs)
     """
-    source_msids = data_source.get_msids(source)
+    index = _get_msid_index(source)
 
     MSID = msid.upper()
     # First try MSID or DP_<MSID>.  If success then return the upper
     # case version and whatever the user supplied (could be any case).
     for match in (MSID, 'DP_' + MSID):
-        if match in source_msids:
+        if match in index.names:
             return [msid], [match]
 
     # Next try as a file glob.  If there is a match then return a
@@ -428,7 +594,7 @@ def _msid_glob(msid, source):
     # input was a glob the returned msids are just lower case versions
     # of the matched upper case MSIDs.
     for match in (MSID, 'DP_' + MSID):
-        matches = fnmatch.filter(source_msids, match)
+        matches = index.glob(match)
         if matches:
             if len(matches) > MAX_GLOB_MATCHES:
                 raise ValueError(
@@ -457,8 +623,8 @@ def _get_table_intervals_as_list(table, check_overlaps=True):
 
     if isinstance(table, (list, tuple)):
         try:
-            intervals = [(DateTime(row[0]).secs, DateTime(row[1]).secs)
-                         for row in table]
+            intervals = list(zip(_get_secs([row[0] for row in table]),
+                                 _get_secs([row[1] for row in table])))
         except Exception:
             pass
     else:
@@ -466,8 +632,12 @@ def _get_table_intervals_as_list(table, check_overlaps=True):
             start = prefix + 'start'
             stop = prefix + 'stop'
             try:
-                intervals = [(DateTime(row[start]).secs, DateTime(row[stop]).secs)
-                             for row in table]
+                try:
+                    starts, stops = table[start], table[stop]
+                except Exception:
+                    starts = [row[start] for row in table]
+                    stops = [row[stop] for row in table]
+                intervals = list(zip(_get_secs(starts), _get_secs(stops)))
             except Exception:
                 pass
             else:
@@ -485,6 +655,285 @@ def _get_table_intervals_as_list(table, check_overlaps=True):
     return intervals
 
 
+def _get_secs(times):
+    """
+    Convert ``times`` (sequence of DateTime-compatible values) to an array of
+    CXC seconds.  Numeric and string values are converted in one batch, falling
+    back to converting each value for mixed or object inputs.
+    """
+    if len(times) == 0:
+        return np.array([], dtype=np.float64)
+
+    try:
+        vals = np.asarray(times)
+        if vals.dtype.kind in 'iuf':
+            return vals.astype(np.float64)
+        if vals.dtype.kind in 'SU':
+            return np.asarray(DateTime(vals).secs, dtype=np.float64)
+    except Exception:
+        pass
+
+    return np.array([DateTime(time).secs for time in times], dtype=np.float64)
+
+
+def _get_intervals_secs(intervals, datestart=None, datestop=None):
+    """
+    Get the start and stop times of ``intervals`` as arrays of CXC seconds.
+
+    :param intervals: EventQuery, table of intervals (see
+        ``_get_table_intervals_as_list``) or iterable (N x 2) of start, stop
+    :param datestart: start date for EventQuery intervals
+    :param datestop: stop date for EventQuery intervals
+    :returns: tuple (tstarts, tstops)
+    """
+    # See if the input intervals is actually a table of intervals
+    intervals_list = _get_table_intervals_as_list(intervals, check_overlaps=False)
+    if intervals_list is not None:
+        intervals = intervals_list
+
+    # Check if this is an EventQuery.  Would rather not import EventQuery
+    # because this is expensive (django), so just look at the names in
+    # object MRO.
+    if 'EventQuery' in (cls.__name__ for cls in intervals.__class__.__mro__):
+        intervals = intervals.intervals(datestart, datestop)
+
+    intervals = list(intervals)
+    tstarts = _get_secs([interval[0] for interval in intervals])
+    tstops = _get_secs([interval[1] for interval in intervals])
+
+    bad = np.flatnonzero(tstarts > tstops)
+    if len(bad) > 0:
+        raise ValueError("Start time %s must be less than stop time %s"
+                         % (tstarts[bad[0]], tstops[bad[0]]))
+
+    return tstarts, tstops
+
+
+def _get_times_mask(times, tstarts, tstops, exclude=True, stop_side='right'):
+    """
+    Get the mask of ``times`` that are outside (``exclude=True``) or inside
+    (``exclude=False``) any of the intervals ``tstarts`` to ``tstops``.
+
+    Points exactly equal to an interval start count as inside, as do points
+    equal to an interval stop unless ``stop_side='left'``.  The intervals may
+    overlap and need not be sorted.
+
+    :param times: sorted array of times
+    :param tstarts: array of interval start times
+    :param tstops: array of interval stop times
+    :param exclude: mask is True outside intervals if True, else inside
+    :param stop_side: searchsorted side for interval stops (default='right')
+    :returns: bool array
+    """
+    n_times = len(times)
+    i0 = np.searchsorted(times, tstarts, side='left')
+    i1 = np.searchsorted(times, tstops, side=stop_side)
+
+    # Number of intervals covering each time from a cumulative sum of +1 at
+    # each interval start index and -1 at each stop index.
+    n_cover = np.cumsum(np.bincount(i0, minlength=n_times + 1)
+                        - np.bincount(i1, minlength=n_times + 1))[:n_times]
+    return n_cover == 0 if exclude else n_cover > 0
+
+
+def _get_categorical(vals):
+    """
+    Encode the string state values ``vals`` as integer codes into a table of the
+    unique values.  State values change rarely, so the unique values are found
+    from the first value of each run and the codes are expanded from the runs.
+
+    :param vals: 1-d array of state values
+    :returns: tuple (codes, categories) where ``categories[codes]`` equals ``vals``
+    """
+    if len(vals) == 0:
+        return np.zeros(0, dtype=np.uint8), vals[:0].copy()
+
+    i_runs = np.concatenate([[0], np.flatnonzero(vals[1:] != vals[:-1]) + 1])
+    categories, run_codes = np.unique(vals[i_runs], return_inverse=True)
+    run_codes = run_codes.astype(np.min_scalar_type(len(categories) - 1))
+    codes = np.repeat(run_codes, np.diff(np.append(i_runs, len(vals))))
+    return codes, categories
+
+
+def _write_csv_rows(fh, colvals, block_rows=None):
+    """
+    Write the columns ``colvals`` as CSV rows to the binary file object ``fh``.
+
+    Each block of ``block_rows`` rows (default=CSV_BLOCK_ROWS) is formatted with
+    vectorized string operations, which give the same text as ``'%s' % val``.
+    """
+    if block_rows is None:
+        block_rows = CSV_BLOCK_ROWS
+    n_rows = len(colvals[0]) if colvals else 0
+    for i0 in range(0, n_rows, block_rows):
+        cols = [np.asarray(col[i0:i0 + block_rows]).astype(str) for col in colvals]
+        lines = cols[0]
+        for col in cols[1:]:
+            lines = np.char.add(np.char.add(lines, ','), col)
+        fh.write(('\n'.join(lines.tolist()) + '\n').encode('utf-8'))
+
+
+def _get_pandas_col(vals):
+    """pandas column for ``vals`` from MSID._get_table_cols()"""
+    import pandas as pd
+
+    if isinstance(vals, tuple):
+        codes, categories = vals
+        return pd.Categorical.from_codes(codes, categories)
+    return vals
+
+
+def _get_arrow_col(vals):
+    """Arrow column for ``vals`` from MSID._get_table_cols()"""
+    import pyarrow as pa
+
+    if isinstance(vals, tuple):
+        codes, categories = vals
+        # Arrow dictionary indices must be signed.  Use int16 for all so that the
+        # dictionary types of different MSIDs match.
+        return pa.DictionaryArray.from_arrays(pa.array(codes.astype(np.int16)),
+                                              pa.array(categories))
+    return pa.array(vals)
+
+
+def _concat_arrow_tables(tables):
+    """
+    Concatenate the per-MSID Arrow ``tables`` into one tidy table.
+
+    Columns that do not exist for an MSID are null.  Numeric columns with
+    different types for different MSIDs (e.g. float32 and float64 ``vals``) are
+    cast to float64.  State (dictionary-encoded) columns with the same name as
+    a numeric column of another MSID are stored as ``state_<colname>``, so a set
+    of numeric and state MSIDs has numeric ``vals`` and state ``state_vals``.
+    """
+    import pyarrow as pa
+
+    def is_numeric(pa_type):
+        return (pa.types.is_integer(pa_type) or pa.types.is_floating(pa_type)
+                or pa.types.is_boolean(pa_type))
+
+    numeric_names = {field.name for table in tables for field in table.schema
+                     if is_numeric(field.type)}
+    tables = [table.rename_columns([
+        'state_' + field.name if (pa.types.is_dictionary(field.type)
+                                  and field.name in numeric_names) else field.name
+        for field in table.schema]) for table in tables]
+
+    fields = collections.OrderedDict()
+    for name in (name for table in tables for name in table.column_names):
+        if name in fields:
+            continue
+        col_types = set(table.schema.field(name).type for table in tables
+                        if name in table.column_names)
+        if len(col_types) == 1:
+            fields[name] = col_types.pop()
+        elif all(is_numeric(col_type) for col_type in col_types):
+            fields[name] = pa.float64()
+        else:
+            raise ValueError('column {} has incompatible types {} for different MSIDs'
+                             .format(name, sorted(str(x) for x in col_types)))
+
+    schema = pa.schema(list(fields.items()))
+    tables = [pa.table([table.column(name).cast(col_type) if name in table.column_names
+                        else pa.nulls(len(table), type=col_type)
+                        for name, col_type in fields.items()], schema=schema)
+              for table in tables]
+    return pa.concat_tables(tables)
+
+
+def _get_xarray_col(vals):
+    """xarray variable values for ``vals`` from MSID._get_table_cols()"""
+    if isinstance(vals, tuple):
+        codes, categories = vals
+        return categories[codes]
+    return vals
+
+
+def _get_logical_op(op):
+    """Get the comparison function for logical operator ``op`` (e.g. '>=')"""
+    try:
+        return LOGICAL_OPS[op]
+    except KeyError:
+        raise ValueError('op = "{}" is not in allowed values: {}'
+                         .format(op, sorted(LOGICAL_OPS.keys())))
+
+
+def _merge_intervals(tstarts, tstops):
+    """
+    Merge the (unsorted) intervals ``tstarts`` to ``tstops`` into a sorted list
+    of disjoint intervals, joining intervals that overlap or touch.
+
+    :returns: tuple (tstarts, tstops) arrays
+    """
+    tstarts = np.asarray(tstarts, dtype=np.float64)
+    tstops = np.asarray(tstops, dtype=np.float64)
+    if len(tstarts) == 0:
+        return tstarts, tstops
+
+    order = np.argsort(tstarts, kind='stable')
+    tstarts = tstarts[order]
+    tstops = np.maximum.accumulate(tstops[order])
+    i_new = np.flatnonzero(np.hstack([[True], tstarts[1:] > tstops[:-1]]))
+    i_end = np.hstack([i_new[1:] - 1, [len(tstarts) - 1]])
+    return tstarts[i_new], tstops[i_end]
+
+
+def _get_bad_times(start=None, stop=None, table=None):
+    """
+    Get the bad times list for ``filter_bad_times`` from either a single
+    ``start``, ``stop`` interval or a two-column ``table``.
+    """
+    if table is not None:
+        bad_times = ascii.read(table, format='no_header',
+                               names=['start', 'stop'])
+        return list(zip(bad_times['start'], bad_times['stop']))
+    elif start is None or stop is None:
+        raise ValueError('filter_times requires either 2 args '
+                         '(start, stop) or no args')
+    else:
+        return [(start, stop)]
+
+
+def _queue_if_lazy(method):
+    """
+    Decorator for in-place MSID methods.  For a lazy MSID that has not yet fetched
+    its data the call is queued and applied right after the data are fetched.
+    Calls with ``copy=True`` need the data now so are never queued.
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if (self.__dict__.get('_lazy') is not None
+                and not signature.bind(self, *args, **kwargs).arguments.get('copy')):
+            self._lazy['ops'].append((method, args, kwargs))
+            return None
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+@contextlib.contextmanager
+def lazy(enable=True):
+    """
+    Context manager to make MSID and MSIDset objects lazy by default, i.e. defer
+    fetching the data until they are first used.  For example::
+
+      with fetch.lazy():
+          dats = fetch.MSIDset(msids, '2020:001', '2021:001')
+      dats['tephin'].vals  # Only TEPHIN is read
+
+    :param enable: lazy default within the context (default=True)
+    """
+    global LAZY
+    orig_lazy = LAZY
+    LAZY = enable
+    try:
+        yield
+    finally:
+        LAZY = orig_lazy
+
+
 class MSID(object):
     """Fetch data from the engineering telemetry archive into an MSID object.
 
@@ -497,14 +946,26 @@ class MSID(object):
     :param start: start date of telemetry (Chandra.Time compatible)
     :param stop: stop date of telemetry (current time if not supplied)
     :param filter_bad: automatically filter out bad values
-    :param stat: return 5-minute or daily statistics ('5min' or 'daily')
+    :param stat: return statistics ('5min', 'daily' or other level in utils.STATS_DT)
+    :param stat_cols: list of stat columns to read, e.g. ['means', 'maxes'] (default=all).
+        The ``times`` column is always included.  Not supported for computed MSIDs.
+    :param max_points: select the data resolution automatically (see ``select_stat``)
+        to return at most about ``max_points`` samples
+    :param target_dt: select the data resolution automatically (see ``select_stat``)
+        to return samples at intervals of at most ``target_dt`` seconds
+    :param lazy: defer fetching the data until an attribute such as ``vals`` or
+        ``times`` is first used (default=module ``LAZY`` setting, see ``lazy()``)
+    :param categorical: store string state values as integer ``codes`` into the
+        ``categories`` array of state values (default=module ``CATEGORICAL`` setting)
 
     :returns: MSID instance
     """
     units = UNITS
     fetch = sys.modules[__name__]
 
-    def __init__(self, msid, start=LAUNCH_DATE, stop=None, filter_bad=False, stat=None):
+    def __init__(self, msid, start=LAUNCH_DATE, stop=None, filter_bad=False, stat=None,
+                 stat_cols=None, max_points=None, target_dt=None, lazy=None,
+                 categorical=None):
         msids, MSIDs = msid_glob(msid)
         if len(MSIDs) > 1:
             raise ValueError('Multiple matches for {} in Eng Archive'
@@ -516,9 +977,6 @@ class MSID(object):
         # Capture the current module units
         self.units = Units(self.units['system'])
         self.unit = self.units.get_msid_unit(self.MSID)
-        self.stat = stat
-        if stat:
-            self.dt = {'5min': 328, 'daily': 86400}[stat]
 
         # If ``start`` is actually a table of intervals then fetch
         # each interval separately and concatenate the results
@@ -531,6 +989,28 @@ class MSID(object):
                       DateTime(time.time(), format='unix').secs)
         self.datestart = DateTime(self.tstart).date
         self.datestop = DateTime(self.tstop).date
+
+        auto_stat = max_points is not None or target_dt is not None
+        if auto_stat:
+            if stat:
+                raise ValueError('stat cannot be specified with max_points or target_dt')
+            stat = self.fetch.select_stat(self.msid, self.tstart, self.tstop,
+                                          max_points=max_points, target_dt=target_dt)
+            if stat is None:
+                stat_cols = None
+
+        self.stat = stat
+        if stat:
+            try:
+                self.dt = STATS_DT[stat]
+            except KeyError:
+                raise ValueError('stat {!r} is not in allowed values {}'
+                                 .format(stat, list(STATS_DT)))
+        if isinstance(stat_cols, str):
+            stat_cols = [stat_cols]
+        if stat_cols is not None and not stat:
+            raise ValueError('stat_cols can only be specified for stat data')
+        self.stat_cols = None if stat_cols is None else list(stat_cols)
         self.data_source = {}
         self.content = content.get(self.MSID)
 
@@ -538,43 +1018,134 @@ class MSID(object):
             intervals = [(self.datestart, DATE2000_HI),
                          (DATE2000_HI, self.datestop)]
 
-        # Get the times, values, bad values mask from the HDF5 files archive
-        if intervals is None:
-            self._get_data()
+        fetch_args = (intervals, auto_stat and stat is None, filter_bad,
+                      CATEGORICAL if categorical is None else categorical)
+        if LAZY if lazy is None else lazy:
+            # Keep the query and the data sources in effect now, along with
+            # any in-place operations called before the data are fetched.
+            self._lazy = {'fetch_args': fetch_args,
+                          'data_sources': data_source._data_sources,
+                          'ops': []}
         else:
-            self._get_data_over_intervals(intervals)
+            self._fetch_data(*fetch_args)
+
+    def _fetch_data(self, intervals, add_minmax, filter_bad, categorical):
+        """Get the data and apply the fetch post-processing"""
+        # Get the times, values, bad values mask from the HDF5 files archive
+        with _fetch_lock:
+            if intervals is None:
+                self._get_data()
+            else:
+                self._get_data_over_intervals(intervals)
+
+        self.categories = None
+        if categorical:
+            self._set_categorical()
+
+        if add_minmax:
+            self._add_full_res_minmax()
 
         # If requested filter out bad values and set self.bad = None
         if filter_bad:
             self.filter_bad()
 
+    def _materialize(self):
+        """Fetch the data for a lazy MSID and apply any queued operations"""
+        lazy = self._lazy
+        # If the fetch or an operation fails then restore the lazy MSID (including
+        # queued operations) so that the next data access tries again.
+        orig_dict = self.__dict__.copy()
+        self._lazy = None
+        logger.info('Fetching data for lazy MSID %s', self.msid)
+        try:
+            with data_source(*lazy['data_sources']):
+                self._fetch_data(*lazy['fetch_args'])
+            for method, args, kwargs in lazy['ops']:
+                method(self, *args, **kwargs)
+        except BaseException:
+            self.__dict__.clear()
+            self.__dict__.update(orig_dict)
+            raise
+
+    def __getattr__(self, attr):
+        # Only called when ``attr`` is not found normally.  For a lazy MSID the
+        # data attributes (vals, times, colnames, ...) do not exist until the data
+        # are fetched, so fetch now and try again.  For a categorical MSID the
+        # ``vals`` are decoded from ``codes`` on each access.
+        if not attr.startswith('__'):
+            if self.__dict__.get('_lazy') is not None:
+                self._materialize()
+                return getattr(self, attr)
+            if attr == 'vals' and self.__dict__.get('categories') is not None:
+                return self.categories[self.codes]
+
+        raise AttributeError("'{}' object has no attribute '{}'"
+                             .format(self.__class__.__name__, attr))
+
+    def _set_categorical(self):
+        """Replace string state ``vals`` by integer ``codes`` and ``categories``"""
+        vals = self.__dict__.get('vals')
+        if vals is None or vals.ndim != 1 or vals.dtype.kind not in 'SU':
+            return
+
+        self.codes, self.categories = _get_categorical(vals)
+        del self.vals
+        self.colnames[self.colnames.index('vals')] = 'codes'
+
     def __len__(self):
-        return len(self.vals)
+        return len(self.times)
 
     @property
     def dtype(self):
-        return self.vals.dtype
+        return self.vals.dtype if self.categories is None else self.categories.dtype
 
     def __repr__(self):
         attrs = [self.__class__.__name__]
+        lazy = self.__dict__.get('_lazy') is not None
         for name, val in (('start', self.datestart),
                           ('stop', self.datestop),
-                          ('len', len(self)),
-                          ('dtype', self.dtype.name),
+                          ('len', None if lazy else len(self)),
+                          ('dtype', self.dtype.name
+                           if not lazy and ('vals' in self.colnames
+                                            or 'codes' in self.colnames) else None),
                           ('unit', self.unit),
-                          ('stat', self.stat)):
+                          ('stat', self.stat),
+                          ('lazy', lazy or None)):
             if val is not None:
                 attrs.append('{}={}'.format(name, val))
 
         return '<' + ' '.join(attrs) + '>'
 
+    @_queue_if_lazy
+    def _add_full_res_minmax(self):
+        """Add ``mins`` and ``maxes`` columns (equal to ``vals``) for numeric full
+        resolution data so the attributes match stat data.  This is used when the
+        resolution is selected automatically.
+        """
+        if 'mins' not in self.colnames and self.dtype.kind in 'iuf':
+            self.mins = self.vals
+            self.maxes = self.vals
+            self.colnames.extend(['mins', 'maxes'])
+
     def _get_data_over_intervals(self, intervals):
         """
         Fetch intervals separately and concatenate the results.
         """
+        # Full-resolution CXC archive data are read in a single pass
+        if (not self.stat
+                and not CACHE
+                and self.datestart >= DATE2000_LO
+                and data_source.sources() == ('cxc',)
+                and self.MSID in data_source.get_msids('cxc')
+                and not ComputedMsid.get_matching_comp_cls(self.msid)):
+            self._get_data_single_pass(intervals)
+            return
+
         msids = []
         for start, stop in intervals:
-            msids.append(self.fetch.MSID(self.msid, start, stop, filter_bad=False, stat=self.stat))
+            msids.append(self.fetch.MSID(self.msid, start, stop, filter_bad=False, stat=self.stat,
+                                         stat_cols=self.stat_cols, lazy=False,
+                                         categorical=False))
 
         # No bad values column for stat='5min' or 'daily', but still need this attribute.
         if self.stat:
@@ -585,6 +1156,26 @@ class MSID(object):
             vals = np.concatenate([getattr(msid, attr) for msid in msids])
             setattr(self, attr, vals)
 
+    def _get_data_single_pass(self, intervals):
+        """
+        Get full-resolution data for all ``intervals`` (sorted, non-overlapping
+        list of (tstart, tstop) in CXC seconds) with one read of the merged row
+        ranges of each HDF5 file, then select the samples within the intervals.
+        """
+        logger.info('Getting data for %s in %d intervals between %s to %s',
+                    self.msid, len(intervals), self.datestart, self.datestop)
+        tstarts = np.array([interval[0] for interval in intervals], dtype=np.float64)
+        tstops = np.array([interval[1] for interval in intervals], dtype=np.float64)
+
+        # Avoid stomping on caller's filetype 'ft' values with _cache_ft()
+        with _cache_ft():
+            h5_slices = get_interval_slices(self.content, tstarts, tstops)
+            self.vals, self.times, self.bads = self._get_msid_data_from_cxc_slices(
+                self.content, tstarts, tstops, self.MSID, self.units['system'], h5_slices)
+
+        self.colnames = ['vals', 'times', 'bads']
+        self.data_source['cxc'] = _get_start_stop_dates(self.times)
+
     def _get_data(self):
         """Get data from the Eng archive"""
         logger.info('Getting data for %s between %s to %s',
@@ -615,8 +1206,12 @@ class MSID(object):
                         # CACHE is normally True only when doing ingest processing.  Note
                         # also that to support caching the get_msid_data_from_cxc_cached
                         # method must be static.
-                        get_msid_data = (self._get_msid_data_from_cxc_cached if CACHE
-                                         else self._get_msid_data_from_cxc)
+                        if CACHE:
+                            get_msid_data = self._get_msid_data_from_cxc_cached
+                        elif fetch_cache.disk_cache is not None and self.datestart >= DATE2000_LO:
+                            get_msid_data = self._get_msid_data_from_disk_cache
+                        else:
+                            get_msid_data = self._get_msid_data_from_cxc
                         self.vals, self.times, self.bads = get_msid_data(*args)
                         self.data_source['cxc'] = _get_start_stop_dates(self.times)
 
@@ -639,6 +1234,8 @@ class MSID(object):
 
     def _get_comp_data(self, comp_cls):
         logger.info(f'Getting computed values for {self.msid}')
+        if self.stat_cols is not None:
+            raise ValueError('stat_cols is not supported for computed MSIDs')
 
         # Do computation.  This returns a dict of MSID attribute values.
         attrs = comp_cls(self.units['system'])(self.tstart, self.tstop, self.msid, self.stat)
@@ -671,36 +1268,77 @@ class MSID(object):
 
         @local_or_remote_function("Getting stat data for " + self.MSID +
                                   " from Ska eng archive server...")
-        def get_stat_data_from_server(filename, dt, tstart, tstop):
+        def get_stat_data_from_server(filename, dt, tstart, tstop, colnames=None):
             import tables
             open_file = getattr(tables, 'open_file', None) or tables.openFile
             h5 = open_file(os.path.join(*filename))
             table = h5.root.data
-            times = (table.col('index') + 0.5) * dt
-            row0, row1 = np.searchsorted(times, [tstart, tstop])
-            table_rows = table[row0:row1]  # returns np.ndarray (structured array)
+            n_rows = len(table)
+            index0 = int(table.read(0, 1, field='index')[0]) if n_rows else 0
+
+            def get_row(tval):
+                # Row for time ``tval`` (as np.searchsorted on the table times).  The
+                # stats ``index`` values are strictly increasing integers, so the row
+                # is at most index(tval) - index0.  Search back from that bound over
+                # a growing window of index values until the window brackets tval.
+                row_hi = int(np.clip(np.floor(tval / dt) + 1 - index0, 0, n_rows))
+                n_read = 64
+                while True:
+                    row_lo = max(0, row_hi - n_read)
+                    times = (table.read(row_lo, row_hi, field='index') + 0.5) * dt
+                    idx = np.searchsorted(times, tval)
+                    if idx > 0 or row_lo == 0:
+                        return row_lo + idx
+                    n_read *= 8
+
+            row0 = get_row(tstart)
+            row1 = max(row0, get_row(tstop))
+            table_rows = table.read(row0, row1)  # returns np.ndarray (structured array)
+            if colnames is not None:
+                from numpy.lib import recfunctions
+                names = ['index'] + [name for name in table.colnames if name in colnames]
+                table_rows = recfunctions.repack_fields(table_rows[names])
+            times = (table_rows['index'] + 0.5) * dt
+            # Archive state (number of rows, last time) for the persistent cache
+            if n_rows:
+                time_last = (float(table.read(n_rows - 1, n_rows, field='index')[0]) + 0.5) * dt
+            else:
+                time_last = 0.0
             h5.close()
-            return (times[row0:row1], table_rows, row0, row1)
-        times, table_rows, row0, row1 = \
-            get_stat_data_from_server(_split_path(filename),
-                                      self.dt, self.tstart, self.tstop)
+            state = (float(n_rows), time_last)
+            return (times, table_rows, row0, row1, state)
+
+        colnames = (None if self.stat_cols is None
+                    else _get_stat_table_colnames(self.stat_cols))
+        if fetch_cache.disk_cache is not None and self.datestart >= DATE2000_LO:
+            times, table_rows = self._get_stat_rows_disk_cached(
+                get_stat_data_from_server, _split_path(filename), colnames)
+        else:
+            times, table_rows, row0, row1, state = \
+                get_stat_data_from_server(_split_path(filename),
+                                          self.dt, self.tstart, self.tstop, colnames)
         logger.info('Closed %s', filename)
 
         self.bads = None
         self.times = times
         self.colnames = ['times']
         for colname in table_rows.dtype.names:
+            # Sum of sample weights is only used for deriving coarser stats levels
+            if colname == 'sum_w':
+                continue
+
             # Don't like the way columns were named in the stats tables.
             # Fix that here.
             colname_out = _plural(colname) if colname != 'n' else 'samples'
 
+            # The table rows were just read so convert the columns in place
             if colname_out in ('vals', 'mins', 'maxes', 'means',
                                'p01s', 'p05s', 'p16s', 'p50s',
                                'p84s', 'p95s', 'p99s'):
-                vals = self.units.convert(self.MSID, table_rows[colname])
+                vals = self.units.convert(self.MSID, table_rows[colname], copy=False)
             elif colname_out == 'stds':
                 vals = self.units.convert(self.MSID, table_rows[colname],
-                                          delta_val=True)
+                                          delta_val=True, copy=False)
             else:
                 vals = table_rows[colname]
 
@@ -710,12 +1348,15 @@ class MSID(object):
         # Redefine the 'vals' attribute to be 'means' if it exists.  This is a
         # more consistent use of the 'vals' attribute and there is little use
         # for the original sampled version.
-        if hasattr(self, 'means'):
+        if hasattr(self, 'means') and hasattr(self, 'vals'):
             # Create new attribute midvals and add as a column (fixes kadi#17)
             self.colnames.append('midvals')
             self.midvals = self.vals
             self.vals = self.means
 
+        if self.stat_cols is not None:
+            self._select_stat_cols()
+
         # Convert vals to unicode for Python 3+.  If this MSID is a
         # state-valued MSID (with string value) then `vals` is the only possible
         # string attribute.  None of the others like mins/maxes etc will exist.
@@ -724,6 +1365,105 @@ class MSID(object):
             if vals.dtype.kind == 'S':
                 setattr(self, colname, vals.astype('U'))
 
+    def _select_stat_cols(self):
+        """Keep only the ``times`` and ``stat_cols`` stat columns"""
+        missing = [col for col in self.stat_cols if col not in self.colnames]
+        if missing:
+            raise ValueError('stat columns {} not available for {} {} stats'
+                             .format(missing, self.MSID, self.stat))
+        colnames = ['times']
+        for colname in self.colnames:
+            if colname in self.stat_cols and colname != 'times':
+                colnames.append(colname)
+            elif colname != 'times':
+                delattr(self, colname)
+        self.colnames = colnames
+
+    def _get_stat_rows_disk_cached(self, get_stat_data, filename, colnames=None):
+        """Get stats table rows for this MSID using the persistent fetch cache.
+
+        Rows are read and cached in chunks aligned on DISK_CACHE_CHUNK_DT[stat]
+        boundaries (default 1024 stat intervals).  A chunk is complete (can no
+        longer change) once the stats file has a row after the chunk.  As for
+        full-resolution data, a cached chunk is valid if the stats file is
+        unchanged since the chunk was cached, or if the chunk is complete, the
+        stats file has not been truncated and no rows of the chunk were
+        modified in place since.
+        """
+        chunk_dt = DISK_CACHE_CHUNK_DT.get(self.stat, 1024 * self.dt)
+        times_list = []
+        rows_list = []
+        modified_times = _get_modified_times(self.content)
+        # Current stats file state (n_rows, last time), which comes with a data read,
+        # and the number of in-place modifications.
+        state = get_stat_data(filename, self.dt, 0.0, 0.0, colnames)[-1] + (len(modified_times),)
+        for ichunk in range(int(self.tstart // chunk_dt), int(self.tstop // chunk_dt) + 1):
+            key = (self.MSID, ichunk, self.stat, msid_files.basedir,
+                   None if colnames is None else tuple(colnames))
+            tstart, tstop = ichunk * chunk_dt, (ichunk + 1) * chunk_dt
+            entry = fetch_cache.disk_cache.get(key)
+            # A modified sample at time t changes the stats row starting before t,
+            # which has a time (row center) before t + dt / 2.
+            if (entry is not None
+                    and _is_disk_cache_entry_valid(entry, state, modified_times,
+                                                   tstop + self.dt)):
+                times_list.append(entry[0]['times'])
+                rows_list.append(entry[0]['rows'])
+                continue
+
+            times, rows, row0, row1, stats_state = get_stat_data(filename, self.dt, tstart,
+                                                                 tstop, colnames)
+            state = stats_state + (len(modified_times),)
+            fetch_cache.disk_cache.put(key, {'times': times, 'rows': rows}, state,
+                                       complete=state[1] >= tstop)
+            times_list.append(times)
+            rows_list.append(rows)
+
+        times = np.concatenate(times_list)
+        row0, row1 = np.searchsorted(times, [self.tstart, self.tstop])
+        return times[row0:row1], np.concatenate(rows_list)[row0:row1]
+
+    @staticmethod
+    def _get_msid_data_from_disk_cache(content, tstart, tstop, msid, unit_system):
+        """Get time and values for an MSID from HDF5 files using the persistent
+        fetch cache (see ``fetch_cache.enable()``).
+
+        Values are read and cached in chunks aligned on DISK_CACHE_CHUNK_DT[None]
+        boundaries.  A cached chunk is valid if it is complete (the archive
+        extends beyond the chunk), the archive has not been truncated and no
+        data in the chunk were modified in place (e.g. quality of overlapping
+        data), or if the archive is unchanged since the chunk was cached.
+        Appending data to the archive therefore only invalidates the last chunk.
+        """
+        # Get the archive state before reading any data so the data are always
+        # at least as recent as the state that is stored with them.
+        modified_times = _get_modified_times(content)
+        state = _get_archive_state(content) + (len(modified_times),)
+        chunk_dt = DISK_CACHE_CHUNK_DT[None]
+        parts = []
+        for ichunk in range(int(tstart // chunk_dt), int(tstop // chunk_dt) + 1):
+            key = (msid, ichunk, unit_system, msid_files.basedir)
+            chunk_tstart, chunk_tstop = ichunk * chunk_dt, (ichunk + 1) * chunk_dt
+            entry = fetch_cache.disk_cache.get(key)
+            if (entry is not None
+                    and _is_disk_cache_entry_valid(entry, state, modified_times, chunk_tstop)):
+                arrays = entry[0]
+                parts.append((arrays['vals'], arrays['times'], arrays['bads']))
+                continue
+
+            ft['content'] = content
+            h5_slice = _get_interval_from_db(chunk_tstart, chunk_tstop,
+                                             _split_path(msid_files['archfiles'].abs))
+            vals, times, bads = MSID._get_msid_data_from_cxc(
+                content, chunk_tstart, chunk_tstop, msid, unit_system, h5_slice)
+            fetch_cache.disk_cache.put(key, {'vals': vals, 'times': times, 'bads': bads}, state,
+                                       complete=state[1] >= chunk_tstop)
+            parts.append((vals, times, bads))
+
+        vals, times, bads = (np.concatenate(x) for x in zip(*parts))
+        row0, row1 = np.searchsorted(times, [tstart, tstop])
+        return vals[row0:row1], times[row0:row1], bads[row0:row1]
+
     @staticmethod
     @cache.lru_cache(30)
     def _get_msid_data_from_cxc_cached(content, tstart, tstop, msid, unit_system):
@@ -733,24 +1473,35 @@ class MSID(object):
         return MSID._get_msid_data_from_cxc(content, tstart, tstop, msid, unit_system)
 
     @staticmethod
-    def _get_msid_data_from_cxc(content, tstart, tstop, msid, unit_system):
+    def _get_msid_data_from_cxc(content, tstart, tstop, msid, unit_system, h5_slice=None):
         """Do the actual work of getting time and values for an MSID from HDF5
         files"""
 
         # Get a row slice into HDF5 file for this content type that picks out
         # the required time range plus a little padding on each end.
-        h5_slice = get_interval(content, tstart, tstop)
+        if h5_slice is None:
+            h5_slice = get_interval(content, tstart, tstop)
+
+        return MSID._get_msid_data_from_cxc_slices(content, [tstart], [tstop], msid,
+                                                   unit_system, [h5_slice])
+
+    @staticmethod
+    def _get_msid_data_from_cxc_slices(content, tstarts, tstops, msid, unit_system, h5_slices):
+        """Get time and values for an MSID from HDF5 files within the time
+        intervals ``tstarts`` to ``tstops``, reading rows ``h5_slices`` (sorted,
+        non-overlapping row slices that enclose the intervals)."""
 
         # Cache the last set of TIME values so repeated queries from within a
-        # content type use the already-available times. Use the content, start
-        # row and stop row as key. This guarantees that the times array matches
+        # content type use the already-available times. Use the content and
+        # start / stop rows as key. This guarantees that the times array matches
         # the subsequent values.
-        cache_key = (content, h5_slice.start, h5_slice.stop)
+        cache_key = (content,) + tuple(x for h5_slice in h5_slices
+                                       for x in (h5_slice.start, h5_slice.stop))
 
         # Read the TIME values either from cache or from disk.
         if times_cache['key'] == cache_key:
             logger.info('Using times_cache for %s %s to %s',
-                        content, tstart, tstop)
+                        content, tstarts[0], tstops[-1])
             times = times_cache['val']  # Already filtered on times_ok
             times_ok = times_cache['ok']  # For filtering MSID.val and MSID.bad
             times_all_ok = times_cache['all_ok']
@@ -760,16 +1511,23 @@ class MSID(object):
             logger.info('Reading %s', filename)
 
             @local_or_remote_function("Getting time data from Ska eng archive server...")
-            def get_time_data_from_server(h5_slice, filename):
+            def get_time_data_from_server(h5_slices, filename):
                 import tables
                 open_file = getattr(tables, 'open_file', None) or tables.openFile
                 h5 = open_file(os.path.join(*filename))
-                times_ok = ~h5.root.quality[h5_slice]
-                times = h5.root.data[h5_slice]
+                times_ok = [~h5.root.quality[h5_slice] for h5_slice in h5_slices]
+                times = [h5.root.data[h5_slice] for h5_slice in h5_slices]
                 h5.close()
-                return(times_ok, times)
-
-            times_ok, times = get_time_data_from_server(h5_slice, _split_path(filename))
+                if len(h5_slices) > 1:
+                    return (np.concatenate(times_ok), np.concatenate(times))
+                return(times_ok[0], times[0])
+
+            cols = _read_colstore_slices(content, 'TIME', h5_slices)
+            if cols is not None:
+                times, times_ok = cols
+                times_ok = ~times_ok
+            else:
+                times_ok, times = get_time_data_from_server(h5_slices, _split_path(filename))
 
             # Filter bad times.  Last instance of bad times in archive is 2004
             # so don't do this unless needed.  Creating a new 'times' array is
@@ -790,16 +1548,22 @@ class MSID(object):
 
         @local_or_remote_function("Getting msid data for " + msid +
                                   " from Ska eng archive server...")
-        def get_msid_data_from_server(h5_slice, filename):
+        def get_msid_data_from_server(h5_slices, filename):
             import tables
             open_file = getattr(tables, 'open_file', None) or tables.openFile
             h5 = open_file(os.path.join(*filename))
-            vals = h5.root.data[h5_slice]
-            bads = h5.root.quality[h5_slice]
+            vals = [h5.root.data[h5_slice] for h5_slice in h5_slices]
+            bads = [h5.root.quality[h5_slice] for h5_slice in h5_slices]
             h5.close()
-            return(vals, bads)
+            if len(h5_slices) > 1:
+                return (np.concatenate(vals), np.concatenate(bads))
+            return(vals[0], bads[0])
 
-        vals, bads = get_msid_data_from_server(h5_slice, _split_path(filename))
+        cols = _read_colstore_slices(content, msid, h5_slices)
+        if cols is not None:
+            vals, bads = cols
+        else:
+            vals, bads = get_msid_data_from_server(h5_slices, _split_path(filename))
 
         # Remote access will return arrays that don't own their data, see #150.
         # For an explanation see:
@@ -817,12 +1581,17 @@ class MSID(object):
             bads = bads[times_ok]
             vals = vals[times_ok]
 
-        # Slice down to exact requested time range
-        row0, row1 = np.searchsorted(times, [tstart, tstop])
-        logger.info('Slicing %s arrays [%d:%d]', msid, row0, row1)
-        vals = Units(unit_system).convert(msid.upper(), vals[row0:row1])
-        times = times[row0:row1]
-        bads = bads[row0:row1]
+        # Slice (or mask for multiple intervals) down to exact requested time range
+        if len(tstarts) == 1:
+            row0, row1 = np.searchsorted(times, [tstarts[0], tstops[0]])
+            logger.info('Slicing %s arrays [%d:%d]', msid, row0, row1)
+            rows = slice(row0, row1)
+        else:
+            logger.info('Selecting %s arrays in %d intervals', msid, len(tstarts))
+            rows = _get_times_mask(times, tstarts, tstops, exclude=False, stop_side='left')
+        vals = Units(unit_system).convert(msid.upper(), vals[rows], copy=False)
+        times = times[rows]
+        bads = bads[rows]
 
         # Possibly expand the bads list for a set of about 30 MSIDs which
         # have incorrect values in CXCDS telemetry
@@ -884,7 +1653,7 @@ class MSID(object):
         """List of state codes tuples (raw_count, state_code) for state-valued
         MSIDs
         """
-        if self.vals.dtype.kind not in ('S', 'U'):
+        if self.dtype.kind not in ('S', 'U'):
             self._state_codes = None
 
         if self.MSID in STATE_CODES:
@@ -913,21 +1682,29 @@ class MSID(object):
         stored in ``self.vals``
         """
         # If this is not a string-type value then there are no raw values
-        if self.vals.dtype.kind not in ('S', 'U') or self.state_codes is None:
+        if self.dtype.kind not in ('S', 'U') or self.state_codes is None:
             self._raw_vals = None
+        elif self.categories is not None:
+            # Look up the raw count of each category
+            return self._get_raw_vals(self.categories)[self.codes]
 
         if not hasattr(self, '_raw_vals'):
-            self._raw_vals = np.zeros(len(self.vals), dtype='int8') - 1
-            # CXC state code telem all has same length with trailing spaces
-            # so find max length for formatting below.
-            max_len = max(len(x[1]) for x in self.state_codes)
-            fmtstr = '{:' + str(max_len) + 's}'
-            for raw_val, state_code in self.state_codes:
-                ok = self.vals == fmtstr.format(state_code)
-                self._raw_vals[ok] = raw_val
+            self._raw_vals = self._get_raw_vals(self.vals)
 
         return self._raw_vals
 
+    def _get_raw_vals(self, vals):
+        """Raw counts corresponding to string state-code values ``vals``"""
+        raw_vals = np.zeros(len(vals), dtype='int8') - 1
+        # CXC state code telem all has same length with trailing spaces
+        # so find max length for formatting below.
+        max_len = max(len(x[1]) for x in self.state_codes)
+        fmtstr = '{:' + str(max_len) + 's}'
+        for raw_val, state_code in self.state_codes:
+            ok = vals == fmtstr.format(state_code)
+            raw_vals[ok] = raw_val
+        return raw_vals
+
     @property
     def tdb(self):
         """Access the Telemetry database entries for this MSID
@@ -935,6 +1712,7 @@ class MSID(object):
         import Ska.tdb
         return Ska.tdb.msids[self.MSID]
 
+    @_queue_if_lazy
     def interpolate(self, dt=None, start=None, stop=None, times=None):
         """Perform nearest-neighbor interpolation of the MSID to the specified
         time sequence.
@@ -996,6 +1774,7 @@ class MSID(object):
         from copy import deepcopy
         return deepcopy(self)
 
+    @_queue_if_lazy
     def filter_bad(self, bads=None, copy=False):
         """Filter out any bad values.
 
@@ -1027,6 +1806,7 @@ class MSID(object):
         if copy:
             return obj
 
+    @_queue_if_lazy
     def filter_bad_times(self, start=None, stop=None, table=None, copy=False):
         """Filter out intervals of bad data in the MSID object.
 
@@ -1054,25 +1834,18 @@ class MSID(object):
         :param table: Two-column table (start, stop) of bad time intervals
         :param copy: return a copy of MSID object with bad times filtered
         """
-        if table is not None:
-            bad_times = ascii.read(table, format='no_header',
-                                   names=['start', 'stop'])
-        elif start is None and stop is None:
-            bad_times = []
-            for msid_glob, times in msid_bad_times.items():
-                if fnmatch.fnmatch(self.MSID, msid_glob):
-                    bad_times.extend(times)
-        elif start is None or stop is None:
-            raise ValueError('filter_times requires either 2 args '
-                             '(start, stop) or no args')
+        obj = self.copy() if copy else self
+
+        if table is None and start is None and stop is None:
+            tstarts, tstops = _get_msid_bad_times(obj.MSID)
+            obj._apply_times_mask(_get_times_mask(obj.times, tstarts, tstops))
         else:
-            bad_times = [(start, stop)]
+            obj._filter_times(_get_bad_times(start, stop, table), exclude=True)
 
-        obj = self.copy() if copy else self
-        obj._filter_times(bad_times, exclude=True)
         if copy:
             return obj
 
+    @_queue_if_lazy
     def remove_intervals(self, intervals, copy=False):
         """
         Remove telemetry points that occur within the specified ``intervals``
@@ -1112,6 +1885,7 @@ class MSID(object):
         if copy:
             return obj
 
+    @_queue_if_lazy
     def select_intervals(self, intervals, copy=False):
         """
         Select telemetry points that occur within the specified ``intervals``
@@ -1158,46 +1932,36 @@ class MSID(object):
         :param intervals: iterable (N x 2) with tstart, tstop in seconds
         :param exclude: exclude intervals if True, else include intervals
         """
-        # Make an initial acceptance mask.  If exclude is True then initially
-        # all values are allowed (ok=True).  If exclude is False (i.e. only
-        # include the interval times) then ok=False everywhere.
-        ok = np.empty(len(self.times), dtype=bool)
-        ok[:] = exclude
+        tstarts, tstops = _get_intervals_secs(intervals, self.datestart, self.datestop)
+        self._apply_times_mask(_get_times_mask(self.times, tstarts, tstops, exclude))
 
-        # See if the input intervals is actually a table of intervals
-        intervals_list = _get_table_intervals_as_list(intervals, check_overlaps=False)
-        if intervals_list is not None:
-            intervals = intervals_list
-
-        # Check if this is an EventQuery.  Would rather not import EventQuery
-        # because this is expensive (django), so just look at the names in
-        # object MRO.
-        if 'EventQuery' in (cls.__name__ for cls in intervals.__class__.__mro__):
-            intervals = intervals.intervals(self.datestart, self.datestop)
+    def _apply_times_mask(self, ok):
+        """
+        Keep only the samples where the bool mask ``ok`` (matching ``times``) is True.
+        """
+        if np.all(ok):
+            return
 
-        intervals = [(DateTime(start).secs, DateTime(stop).secs)
-                     for start, stop in intervals]
+        for colname in self.colnames:
+            attr = getattr(self, colname)
+            if isinstance(attr, np.ndarray):
+                setattr(self, colname, attr[ok])
 
-        for tstart, tstop in intervals:
-            if tstart > tstop:
-                raise ValueError("Start time %s must be less than stop time %s"
-                                 % (tstart, tstop))
+    def _get_output_cols(self):
+        """Get the names and values of the columns for file output"""
+        colnames = ['vals' if x == 'codes' else x for x in self.colnames]
+        if self.bads is None and 'bads' in colnames:
+            colnames.remove('bads')
 
-            if tstop < self.times[0] or tstart > self.times[-1]:
-                continue
+        if self.state_codes:
+            colnames.append('raw_vals')
 
-            # Find the indexes of bad data.  Using side=left,right respectively
-            # will exclude points exactly equal to the bad_times values
-            # (though in reality an exact tie is extremely unlikely).
-            i0 = np.searchsorted(self.times, tstart, side='left')
-            i1 = np.searchsorted(self.times, tstop, side='right')
-            ok[i0:i1] = not exclude
+        # Indexes value is not interesting for output
+        if 'indexes' in colnames:
+            colnames.remove('indexes')
 
-        colnames = (x for x in self.colnames)
-        for colname in colnames:
-            attr = getattr(self, colname)
-            if isinstance(attr, np.ndarray):
-                setattr(self, colname, attr[ok])
+        colvals = [getattr(self, x) for x in colnames]
+        return colnames, colvals
 
     def write_zip(self, filename, append=False):
         """Write MSID to a zip file named ``filename``
@@ -1210,33 +1974,150 @@ class MSID(object):
         """
         import zipfile
 
-        colnames = self.colnames[:]
-        if self.bads is None and 'bads' in colnames:
-            colnames.remove('bads')
-
-        if self.state_codes:
-            colnames.append('raw_vals')
+        with zipfile.ZipFile(filename, ('a' if append
+                                        and os.path.exists(filename)
+                                        else 'w')) as zf:
+            self._write_zip_member(zf)
 
-        # Indexes value is not interesting for output
-        if 'indexes' in colnames:
-            colnames.remove('indexes')
+    def _write_zip_member(self, zf):
+        """Stream the CSV data for this MSID into the open zipfile ``zf``"""
+        import zipfile
 
-        colvals = tuple(getattr(self, x) for x in colnames)
-        fmt = ",".join("%s" for x in colnames)
+        colnames, colvals = self._get_output_cols()
 
-        f = zipfile.ZipFile(filename, ('a' if append
-                                       and os.path.exists(filename)
-                                       else 'w'))
         info = zipfile.ZipInfo(self.msid + '.csv')
         info.external_attr = 0o664 << 16  # Set permissions
         info.date_time = time.localtime()[:7]
         info.compress_type = zipfile.ZIP_DEFLATED
-        f.writestr(info,
-                   ",".join(colnames) + '\n' +
-                   '\n'.join(fmt % x for x in zip(*colvals)) + '\n')
-        f.close()
+        # Allow for members over 2 Gb with an estimate of 24 bytes per value
+        force_zip64 = len(self.times) * len(colnames) * 24 > 2 ** 31
+        with zf.open(info, 'w', force_zip64=force_zip64) as fh:
+            fh.write((",".join(colnames) + '\n').encode('utf-8'))
+            _write_csv_rows(fh, colvals)
+
+    def _get_hdf5_cols(self):
+        """Get the columns for HDF5 output, with strings encoded as bytes"""
+        colnames, colvals = self._get_output_cols()
+        colvals = [np.char.encode(vals, 'utf-8') if vals.dtype.kind == 'U' else vals
+                   for vals in colvals]
+        return colnames, colvals
+
+    def write_hdf5(self, filename, append=False):
+        """Write MSID to an HDF5 file named ``filename``
+
+        The data for this MSID are stored as one array per column in the group
+        /<msid_name>, which has attributes ``unit``, ``stat``, ``datestart`` and
+        ``datestop``.  String values are stored as UTF-8 bytes.
+
+        :param filename: output HDF5 file name
+        :param append: append to an existing HDF5 file
+        """
+        import tables
+
+        mode = 'a' if append and os.path.exists(filename) else 'w'
+        with tables.open_file(filename, mode=mode) as h5:
+            self._write_hdf5_group(h5)
+
+    def _write_hdf5_group(self, h5):
+        """Write the columns for this MSID into a new group in open HDF5 file ``h5``"""
+        group = h5.create_group(h5.root, self.msid)
+        for colname, vals in zip(*self._get_hdf5_cols()):
+            h5.create_array(group, colname, vals)
+        for attr in ('unit', 'stat', 'datestart', 'datestop'):
+            group._v_attrs[attr] = getattr(self, attr) or ''
+
+    def write_npz(self, filename):
+        """Write MSID to a numpy ``.npz`` file named ``filename``
+
+        Each column is stored as an array named <msid_name>/<colname>, e.g.
+        ``tephin/vals``, so files from ``MSID`` and ``MSIDset`` have the same
+        layout.  Read the file with ``np.load(filename)``.
+
+        :param filename: output npz file name
+        """
+        np.savez(filename, **self._get_npz_arrays())
+
+    def _get_npz_arrays(self):
+        colnames, colvals = self._get_output_cols()
+        return {self.msid + '/' + colname: vals
+                for colname, vals in zip(colnames, colvals)}
+
+    def write_parquet(self, filename):
+        """Write MSID to a Parquet file named ``filename``
+
+        The file has the columns of ``to_arrow()``.  This requires the ``pyarrow``
+        package.
+
+        :param filename: output Parquet file name
+        """
+        import pyarrow.parquet as pq
+
+        pq.write_table(self.to_arrow(), filename)
+
+    def _get_table_cols(self):
+        """
+        Get the data columns (all but ``times``) for conversion to a table, as a
+        dict of {colname: vals}.  State values are given as (codes, categories).
+        """
+        cols = {}
+        for colname in self.colnames:
+            vals = getattr(self, colname)
+            if colname in ('times', 'indexes') or vals is None:
+                continue
+            if colname == 'codes':
+                cols['vals'] = (self.codes, self.categories)
+            elif colname == 'vals' and vals.ndim == 1 and vals.dtype.kind in 'SU':
+                cols['vals'] = _get_categorical(vals)
+            else:
+                cols[colname] = vals
+        return cols
+
+    def to_pandas(self):
+        """Convert MSID to a pandas DataFrame indexed by ``times``
+
+        The columns use the MSID arrays without copying where pandas allows.
+        State values are given as a ``Categorical`` column.  This requires the
+        ``pandas`` package.
 
-    def logical_intervals(self, op, val, complete_intervals=True, max_gap=None):
+        :returns: pandas.DataFrame
+        """
+        import pandas as pd
+
+        cols = {name: _get_pandas_col(vals) for name, vals in self._get_table_cols().items()}
+        return pd.DataFrame(cols, index=pd.Index(self.times, name='times'), copy=False)
+
+    def to_arrow(self):
+        """Convert MSID to an Arrow table
+
+        The table has a ``times`` column and one column for each data column.
+        Numeric columns use the MSID arrays without copying and state values
+        are given as a dictionary-encoded column.  This requires the ``pyarrow``
+        package.
+
+        :returns: pyarrow.Table
+        """
+        import pyarrow as pa
+
+        cols = {'times': self.times}
+        cols.update(self._get_table_cols())
+        return pa.table({name: _get_arrow_col(vals) for name, vals in cols.items()})
+
+    def to_xarray(self):
+        """Convert MSID to an xarray Dataset with coordinate ``times``
+
+        The Dataset has one variable for each data column.  This requires the
+        ``xarray`` package.
+
+        :returns: xarray.Dataset
+        """
+        import xarray as xr
+
+        data_vars = {name: ('times', _get_xarray_col(vals))
+                     for name, vals in self._get_table_cols().items()}
+        attrs = {'msid': self.msid, 'unit': self.unit or '', 'stat': self.stat or ''}
+        return xr.Dataset(data_vars, coords={'times': self.times}, attrs=attrs)
+
+    def logical_intervals(self, op, val, complete_intervals=True, max_gap=None, table=True):
         """Determine contiguous intervals during which the logical comparison
         expression "MSID.vals op val" is True.  Allowed values for ``op``
         are::
@@ -1272,35 +2153,31 @@ class MSID(object):
         :param val: comparison value
         :param complete_intervals: return only complete intervals (default=True)
         :param max_gap: max allowed gap between time stamps (sec, default=None)
+        :param table: return a Table with date columns (default) or a structured
+            array without them (faster for many intervals)
         :returns: structured array table of intervals
         """
         from . import utils
 
-        ops = {'==': operator.eq,
-               '!=': operator.ne,
-               '>': operator.gt,
-               '<': operator.lt,
-               '>=': operator.ge,
-               '<=': operator.le}
-        try:
-            op = ops[op]
-        except KeyError:
-            raise ValueError('op = "{}" is not in allowed values: {}'
-                             .format(op, sorted(ops.keys())))
+        op = _get_logical_op(op)
 
         # Do local version of bad value filtering
+        vals = self.vals if self.categories is None else self.codes
         if self.bads is not None and np.any(self.bads):
             ok = ~self.bads
-            vals = self.vals[ok]
+            vals = vals[ok]
             times = self.times[ok]
         else:
-            vals = self.vals
             times = self.times
 
-        bools = op(vals, val)
-        return utils.logical_intervals(times, bools, complete_intervals, max_gap)
+        if self.categories is None:
+            bools = op(vals, val)
+        else:
+            # Compare each category once and look up the result for each code
+            bools = op(self.categories, val)[vals]
+        return utils.logical_intervals(times, bools, complete_intervals, max_gap, table)
 
-    def state_intervals(self):
+    def state_intervals(self, table=True):
         """Determine contiguous intervals during which the MSID value
         is unchanged.
 
@@ -1319,26 +2196,36 @@ class MSID(object):
           dat = fetch.MSID('cobsrqid', '2010:001', '2010:005')
           obsids = dat.state_intervals()
 
-        :param val: state value for which intervals are returned.
+        :param table: return a Table with date columns (default) or a structured
+            array without them (faster for many intervals)
         :returns: structured array table of intervals
         """
         from . import utils
 
         # Do local version of bad value filtering
+        vals = self.vals if self.categories is None else self.codes
         if self.bads is not None and np.any(self.bads):
             ok = ~self.bads
-            vals = self.vals[ok]
+            vals = vals[ok]
             times = self.times[ok]
         else:
-            vals = self.vals
             times = self.times
 
-        if len(self.vals) < 2:
+        if len(self.times) < 2:
             raise ValueError('Filtered data length must be at least 2')
 
-        return utils.state_intervals(times, vals)
+        intervals = utils.state_intervals(times, vals, table)
+        if self.categories is not None:
+            state_vals = self.categories[intervals['val']]
+            if table:
+                intervals['val'] = state_vals
+            else:
+                names = intervals.dtype.names
+                intervals = np.rec.fromarrays([state_vals if name == 'val' else intervals[name]
+                                               for name in names], names=names)
+        return intervals
 
-    def iplot(self, fmt='-b', fmt_minmax='-c', **plot_kwargs):
+    def iplot(self, fmt='-b', fmt_minmax='-c', prefetch=True, **plot_kwargs):
         """Make an interactive plot for exploring the MSID data.
 
         This method opens a new plot figure (or clears the current figure) and
@@ -1346,7 +2233,9 @@ class MSID(object):
         zoomed arbitrarily and the data values will be fetched from the archive
         as needed.  Depending on the time scale, ``iplot`` displays either full
         resolution, 5-minute, or daily values.  For 5-minute and daily values
-        the min and max values are also plotted.
+        the min and max values are also plotted.  Data for the adjacent pan and
+        zoom windows are fetched in the background, and full-resolution data
+        are reduced to the min and max in each pixel before plotting.
 
         Once the plot is displayed and the window is selected by clicking in
         it, the following key commands are recognized::
@@ -1370,14 +2259,15 @@ class MSID(object):
 
         :param fmt: plot format for values (default="-b")
         :param fmt_minmax: plot format for mins and maxes (default="-c")
+        :param prefetch: fetch adjacent windows in the background (default=True)
         :param plot_kwargs: additional plotting keyword args
 
         """
 
         from .plot import MsidPlot
-        self._iplot = MsidPlot(self, fmt, fmt_minmax, **plot_kwargs)
+        self._iplot = MsidPlot(self, fmt, fmt_minmax, prefetch=prefetch, **plot_kwargs)
 
-    def plot(self, *args, **kwargs):
+    def plot(self, *args, decimate='minmax', max_points=None, **kwargs):
         """Plot the MSID ``vals`` using Ska.Matplotlib.plot_cxctime()
 
         This is a convenience function for plotting the MSID values.  It
@@ -1388,17 +2278,41 @@ class MSID(object):
         where ``*args`` are additional arguments and ``**kwargs`` are
         additional keyword arguments that are accepted by ``plot_cxctime()``.
 
+        Data with more than ``max_points`` samples are first decimated so that
+        the plot looks the same at the resolution of the axes while rendering
+        far fewer points.  The default 'minmax' method keeps the first, last,
+        min and max values in each pixel-wide time bin, so lines, envelopes and
+        data gaps are unchanged.  State-valued MSIDs, including string values
+        without state codes, keep the samples around each state change.  Use
+        ``decimate=None`` to plot every sample, e.g. for a scatter plot where
+        the density of points matters.
+
         Example::
 
           dat = fetch.Msid('tephin', '2011:001', '2012:001', stat='5min')
           dat.plot('-r', linewidth=2)
 
+        :param decimate: decimation method ('minmax', 'lttb' or None)
+        :param max_points: max number of points to plot (default=4 per pixel of
+            the axes width)
         """
 
         import matplotlib.pyplot as plt
         from Ska.Matplotlib import plot_cxctime
+        from .plot import get_decimated_indexes, DECIMATE_POINTS_PER_PIX
+
+        times = self.times
         vals = self.raw_vals if self.state_codes else self.vals
-        plot_cxctime(self.times, vals, *args, state_codes=self.state_codes,
+        if decimate is not None:
+            if max_points is None:
+                ax = kwargs.get('ax') or plt.gca()
+                max_points = DECIMATE_POINTS_PER_PIX * int(ax.get_window_extent().width + 0.5)
+            i_plot = get_decimated_indexes(times, vals, max_points, decimate,
+                                           self.state_codes)
+            if len(i_plot) < len(times):
+                times, vals = times[i_plot], vals[i_plot]
+
+        plot_cxctime(times, vals, *args, state_codes=self.state_codes,
                      **kwargs)
         plt.margins(0.02, 0.05)
         plt.title(self.MSID)
@@ -1418,13 +2332,24 @@ class MSIDset(collections.OrderedDict):
     :param start: start date of telemetry (Chandra.Time compatible)
     :param stop: stop date of telemetry (current time if not supplied)
     :param filter_bad: automatically filter out bad values
-    :param stat: return 5-minute or daily statistics ('5min' or 'daily')
+    :param stat: return statistics ('5min', 'daily' or other level in utils.STATS_DT)
+    :param stat_cols: list of stat columns to read, e.g. ['means', 'maxes'] (default=all)
+    :param max_points: select one data resolution for all MSIDs automatically (see
+        ``select_stat``) to return at most about ``max_points`` samples per MSID
+    :param target_dt: select one data resolution for all MSIDs automatically (see
+        ``select_stat``) to return samples at intervals of at most ``target_dt`` seconds
+    :param lazy: defer fetching the data for each MSID until it is first used
+        (default=module ``LAZY`` setting, see ``lazy()``)
+    :param categorical: store string state values as integer ``codes`` into the
+        ``categories`` array of state values (default=module ``CATEGORICAL`` setting)
 
     :returns: Dict-like object containing MSID instances keyed by MSID name
     """
     MSID = MSID
 
-    def __init__(self, msids, start=LAUNCH_DATE, stop=None, filter_bad=False, stat=None):
+    def __init__(self, msids, start=LAUNCH_DATE, stop=None, filter_bad=False, stat=None,
+                 stat_cols=None, max_points=None, target_dt=None, lazy=None,
+                 categorical=None):
         super(MSIDset, self).__init__()
 
         intervals = _get_table_intervals_as_list(start, check_overlaps=True)
@@ -1440,12 +2365,40 @@ class MSIDset(collections.OrderedDict):
         new_msids = []
         for msid in msids:
             new_msids.extend(msid_glob(msid)[0])
-        for msid in new_msids:
+
+        # Select one resolution for the whole set so the MSIDs line up
+        auto_stat = max_points is not None or target_dt is not None
+        if auto_stat:
+            if stat:
+                raise ValueError('stat cannot be specified with max_points or target_dt')
+            stat = self.MSID.fetch.select_stat(new_msids, self.tstart, self.tstop,
+                                               max_points=max_points, target_dt=target_dt)
+            if stat is None:
+                stat_cols = None
+
+        # For intervals fetch the MSIDs grouped by content type so that each
+        # content TIME array is read once and shared via the times cache.
+        if intervals is not None:
+            fetch_order = sorted(new_msids, key=lambda x: content.get(x.upper(), ''))
+        else:
+            fetch_order = new_msids
+
+        msids_fetched = {}
+        for msid in fetch_order:
             if intervals is None:
-                self[msid] = self.MSID(msid, self.tstart, self.tstop,
-                                       filter_bad=False, stat=stat)
+                msids_fetched[msid] = self.MSID(msid, self.tstart, self.tstop,
+                                                filter_bad=False, stat=stat,
+                                                stat_cols=stat_cols, lazy=lazy,
+                                                categorical=categorical)
             else:
-                self[msid] = self.MSID(msid, intervals, filter_bad=False, stat=stat)
+                msids_fetched[msid] = self.MSID(msid, intervals, filter_bad=False, stat=stat,
+                                                stat_cols=stat_cols, lazy=lazy,
+                                                categorical=categorical)
+            if auto_stat and stat is None:
+                msids_fetched[msid]._add_full_res_minmax()
+
+        for msid in new_msids:
+            self[msid] = msids_fetched[msid]
 
         if filter_bad:
             self.filter_bad()
@@ -1540,12 +2493,76 @@ class MSIDset(collections.OrderedDict):
         """
         obj = self.copy() if copy else self
 
-        for msid in obj.values():
-            msid.filter_bad_times(start, stop, table)
+        if table is None and start is None and stop is None:
+            for msid in obj.values():
+                msid.filter_bad_times()
+        else:
+            obj._filter_times(_get_bad_times(start, stop, table), exclude=True)
+
+        if copy:
+            return obj
+
+    def remove_intervals(self, intervals, copy=False):
+        """
+        Remove telemetry points that occur within the specified ``intervals``
+        for every MSID in the set.
 
+        The ``intervals`` are converted once and a single mask is computed for
+        all MSIDs that share the same times (e.g. after ``interpolate()``).
+        See ``MSID.remove_intervals()`` for details.
+
+        :param intervals: EventQuery or iterable (N x 2) with start, stop dates/times
+        :param copy: return a copy of MSIDset object with intervals removed
+        """
+        obj = self.copy() if copy else self
+        obj._filter_times(intervals, exclude=True)
         if copy:
             return obj
 
+    def select_intervals(self, intervals, copy=False):
+        """
+        Select telemetry points that occur within the specified ``intervals``
+        for every MSID in the set.
+
+        The ``intervals`` are converted once and a single mask is computed for
+        all MSIDs that share the same times (e.g. after ``interpolate()``).
+        See ``MSID.select_intervals()`` for details.
+
+        :param intervals: EventQuery or iterable (N x 2) with start, stop dates/times
+        :param copy: return a copy of MSIDset object with intervals selected
+        """
+        obj = self.copy() if copy else self
+        obj._filter_times(intervals, exclude=False)
+        if copy:
+            return obj
+
+    def _filter_times(self, intervals, exclude=True):
+        """
+        Filter the times of each MSID based on ``intervals``, computing the mask
+        only once for each distinct times array.
+
+        :param intervals: iterable (N x 2) with tstart, tstop in seconds
+        :param exclude: exclude intervals if True, else include intervals
+        """
+        tstarts, tstops = _get_intervals_secs(intervals, self.datestart, self.datestop)
+        masks = []
+
+        def get_mask(times):
+            for mask_times, ok in masks:
+                if times is mask_times or (len(times) == len(mask_times)
+                                           and np.array_equal(times, mask_times)):
+                    return ok
+            ok = _get_times_mask(times, tstarts, tstops, exclude)
+            masks.append((times, ok))
+            return ok
+
+        for msid in self.values():
+            msid._apply_times_mask(get_mask(msid.times))
+
+        # Common times from interpolate()
+        if hasattr(self, 'times'):
+            self.times = self.times[get_mask(self.times)]
+
     def interpolate(self, dt=None, start=None, stop=None, filter_bad=True, times=None,
                     bad_union=False, copy=False):
         """
@@ -1675,10 +2692,193 @@ class MSIDset(collections.OrderedDict):
 
         :param filename: output zipfile name
         """
-        append = False
+        import zipfile
+
+        with zipfile.ZipFile(filename, 'w') as zf:
+            for msid in self.values():
+                msid._write_zip_member(zf)
+
+    def write_hdf5(self, filename):
+        """Write MSIDset to an HDF5 file named ``filename``
+
+        The data for each MSID in the set are stored in the group /<msid_name>
+        as for ``MSID.write_hdf5()``.
+
+        :param filename: output HDF5 file name
+        """
+        import tables
+
+        with tables.open_file(filename, mode='w') as h5:
+            for msid in self.values():
+                msid._write_hdf5_group(h5)
+
+    def write_npz(self, filename):
+        """Write MSIDset to a numpy ``.npz`` file named ``filename``
+
+        Each column of each MSID is stored as an array named <msid_name>/<colname>,
+        e.g. ``tephin/vals``.
+
+        :param filename: output npz file name
+        """
+        arrays = {}
         for msid in self.values():
-            msid.write_zip(filename, append=append)
-            append = True
+            arrays.update(msid._get_npz_arrays())
+        np.savez(filename, **arrays)
+
+    def write_parquet(self, filename):
+        """Write MSIDset to a Parquet file named ``filename``
+
+        The file has the table layout of ``to_arrow()``.  This requires the
+        ``pyarrow`` package.
+
+        :param filename: output Parquet file name
+        """
+        import pyarrow.parquet as pq
+
+        pq.write_table(self.to_arrow(), filename)
+
+    def plot(self, *args, decimate='minmax', max_points=None, **kwargs):
+        """Plot each MSID in a separate panel of the current figure with a shared
+        time axis, using MSID.plot() (including its decimation).
+
+        Example::
+
+          dat = fetch.Msidset(['tephin', 'aopcadmd'], '2011:001', '2012:001')
+          dat.plot('-b')
+
+        :param decimate: decimation method ('minmax', 'lttb' or None)
+        :param max_points: max number of points to plot for each MSID (default=4
+            per pixel of the axes width)
+        :returns: list of axes
+        """
+        import matplotlib.pyplot as plt
+
+        fig = plt.gcf()
+        fig.clf()
+        axes = fig.subplots(len(self), 1, sharex=True, squeeze=False)[:, 0]
+        for ax, msid in zip(axes, self.values()):
+            plt.sca(ax)
+            msid.plot(*args, decimate=decimate, max_points=max_points, ax=ax, fig=fig,
+                      **kwargs)
+        return list(axes)
+
+    def _get_layout(self, layout):
+        """Check table ``layout`` or select it from the MSID times (if None)"""
+        msids = list(self.values())
+        common_times = all(len(msid.times) == len(msids[0].times)
+                           and (msid.times is msids[0].times
+                                or np.all(msid.times == msids[0].times))
+                           for msid in msids[1:])
+        if layout is None:
+            layout = 'wide' if common_times else 'tidy'
+        if layout not in ('wide', 'tidy'):
+            raise ValueError("layout must be 'wide' or 'tidy'")
+        if layout == 'wide' and not common_times:
+            raise ValueError('wide layout requires that all MSIDs have the same times, '
+                             'e.g. after interpolate()')
+        return layout
+
+    def _get_wide_cols(self):
+        """
+        Get the times and the data columns of all MSIDs for a wide table.  The
+        ``vals`` column is named by the MSID and other columns <msid>.<colname>.
+        """
+        msids = list(self.values())
+        times = msids[0].times if msids else np.zeros(0)
+        cols = {}
+        for name, msid in self.items():
+            for colname, vals in msid._get_table_cols().items():
+                cols[name if colname == 'vals' else name + '.' + colname] = vals
+        return times, cols
+
+    def to_pandas(self, layout=None):
+        """Convert MSIDset to a pandas DataFrame
+
+        For the ``wide`` layout the DataFrame is indexed by the common ``times``
+        and has a column named by each MSID for the values, plus columns named
+        <msid>.<colname> for other data such as ``mins``.  For the ``tidy``
+        layout the ``MSID.to_pandas()`` frames are stacked with a (msid, times)
+        MultiIndex.  The default is ``wide`` if all MSIDs have the same times
+        (e.g. after ``interpolate()``), otherwise ``tidy``.
+
+        The ``wide`` columns use the MSID arrays without copying where pandas
+        allows and the shared times are used once.  This requires the ``pandas``
+        package.
+
+        :param layout: table layout ('wide' or 'tidy', default=from times)
+        :returns: pandas.DataFrame
+        """
+        import pandas as pd
+
+        if self._get_layout(layout) == 'tidy':
+            return pd.concat({name: msid.to_pandas() for name, msid in self.items()},
+                             names=['msid'])
+
+        times, cols = self._get_wide_cols()
+        cols = {name: _get_pandas_col(vals) for name, vals in cols.items()}
+        return pd.DataFrame(cols, index=pd.Index(times, name='times'), copy=False)
+
+    def to_arrow(self, layout=None):
+        """Convert MSIDset to an Arrow table
+
+        For the ``wide`` layout the table has the common ``times`` column and
+        columns as for ``to_pandas()``.  For the ``tidy`` layout the
+        ``MSID.to_arrow()`` tables are stacked with a dictionary-encoded ``msid``
+        column, where columns that do not exist for an MSID are null.  Numeric
+        columns with different types for different MSIDs are cast to float64,
+        and state values are in a ``state_vals`` column if there are also
+        numeric MSIDs (see ``_concat_arrow_tables()``).  The default
+        is ``wide`` if all MSIDs have the same times, otherwise ``tidy``.  This
+        requires the ``pyarrow`` package.
+
+        :param layout: table layout ('wide' or 'tidy', default=from times)
+        :returns: pyarrow.Table
+        """
+        import pyarrow as pa
+
+        if self._get_layout(layout) == 'wide':
+            times, cols = self._get_wide_cols()
+            return pa.table({name: _get_arrow_col(vals)
+                             for name, vals in [('times', times)] + list(cols.items())})
+
+        tables = []
+        for name, msid in self.items():
+            table = msid.to_arrow()
+            msid_col = pa.DictionaryArray.from_arrays(
+                pa.array(np.zeros(len(table), dtype=np.int16)), pa.array([name]))
+            tables.append(table.add_column(0, 'msid', msid_col))
+
+        return _concat_arrow_tables(tables)
+
+    def to_xarray(self, layout=None):
+        """Convert MSIDset to an xarray Dataset
+
+        For the ``wide`` layout all variables (named as for ``to_pandas()``) share
+        the ``times`` coordinate.  For the ``tidy`` layout the variables for each
+        MSID have their own <msid>.times coordinate.  The default is ``wide`` if
+        all MSIDs have the same times, otherwise ``tidy``.  This requires the
+        ``xarray`` package.
+
+        :param layout: table layout ('wide' or 'tidy', default=from times)
+        :returns: xarray.Dataset
+        """
+        import xarray as xr
+
+        if self._get_layout(layout) == 'wide':
+            times, cols = self._get_wide_cols()
+            data_vars = {name: ('times', _get_xarray_col(vals))
+                         for name, vals in cols.items()}
+            return xr.Dataset(data_vars, coords={'times': times})
+
+        data_vars = {}
+        coords = {}
+        for name, msid in self.items():
+            dim = name + '.times'
+            coords[dim] = msid.times
+            for colname, vals in msid._get_table_cols().items():
+                var_name = name if colname == 'vals' else name + '.' + colname
+                data_vars[var_name] = (dim, _get_xarray_col(vals))
+        return xr.Dataset(data_vars, coords=coords)
 
 
 class Msid(MSID):
@@ -1690,16 +2890,28 @@ class Msid(MSID):
     :param start: start date of telemetry (Chandra.Time compatible)
     :param stop: stop date of telemetry (current time if not supplied)
     :param filter_bad: automatically filter out bad values
-    :param stat: return 5-minute or daily statistics ('5min' or 'daily')
+    :param stat: return statistics ('5min', 'daily' or other level in utils.STATS_DT)
+    :param stat_cols: list of stat columns to read, e.g. ['means', 'maxes'] (default=all)
+    :param max_points: select the data resolution automatically (see ``select_stat``)
+        to return at most about ``max_points`` samples
+    :param target_dt: select the data resolution automatically (see ``select_stat``)
+        to return samples at intervals of at most ``target_dt`` seconds
+    :param lazy: defer fetching the data until first used (default=module ``LAZY``)
+    :param categorical: store string state values as integer ``codes`` into
+        ``categories`` (default=module ``CATEGORICAL``)
     :param unit_system: Unit system (cxc|eng|sci, default=current units)
 
     :returns: MSID instance
     """
     units = UNITS
 
-    def __init__(self, msid, start=LAUNCH_DATE, stop=None, filter_bad=True, stat=None):
+    def __init__(self, msid, start=LAUNCH_DATE, stop=None, filter_bad=True, stat=None,
+                 stat_cols=None, max_points=None, target_dt=None, lazy=None,
+                 categorical=None):
         super(Msid, self).__init__(msid, start=start, stop=stop,
-                                   filter_bad=filter_bad, stat=stat)
+                                   filter_bad=filter_bad, stat=stat, stat_cols=stat_cols,
+                                   max_points=max_points, target_dt=target_dt,
+                                   lazy=lazy, categorical=categorical)
 
 
 class Msidset(MSIDset):
@@ -1710,16 +2922,28 @@ class Msidset(MSIDset):
     :param start: start date of telemetry (Chandra.Time compatible)
     :param stop: stop date of telemetry (current time if not supplied)
     :param filter_bad: automatically filter out bad values
-    :param stat: return 5-minute or daily statistics ('5min' or 'daily')
+    :param stat: return statistics ('5min', 'daily' or other level in utils.STATS_DT)
+    :param stat_cols: list of stat columns to read, e.g. ['means', 'maxes'] (default=all)
+    :param max_points: select one data resolution for all MSIDs automatically (see
+        ``select_stat``) to return at most about ``max_points`` samples per MSID
+    :param target_dt: select one data resolution for all MSIDs automatically (see
+        ``select_stat``) to return samples at intervals of at most ``target_dt`` seconds
+    :param lazy: defer fetching the data until first used (default=module ``LAZY``)
+    :param categorical: store string state values as integer ``codes`` into
+        ``categories`` (default=module ``CATEGORICAL``)
     :param unit_system: Unit system (cxc|eng|sci, default=current units)
 
     :returns: Dict-like object containing MSID instances keyed by MSID name
     """
     MSID = MSID
 
-    def __init__(self, msids, start=LAUNCH_DATE, stop=None, filter_bad=True, stat=None):
+    def __init__(self, msids, start=LAUNCH_DATE, stop=None, filter_bad=True, stat=None,
+                 stat_cols=None, max_points=None, target_dt=None, lazy=None,
+                 categorical=None):
         super(Msidset, self).__init__(msids, start=start, stop=stop,
-                                      filter_bad=filter_bad, stat=stat)
+                                      filter_bad=filter_bad, stat=stat, stat_cols=stat_cols,
+                                      max_points=max_points, target_dt=target_dt,
+                                      lazy=lazy, categorical=categorical)
 
 
 class HrcSsMsid(Msid):
@@ -1731,7 +2955,7 @@ class HrcSsMsid(Msid):
     :param start: start date of telemetry (Chandra.Time compatible)
     :param stop: stop date of telemetry (current time if not supplied)
     :param filter_bad: automatically filter out bad values
-    :param stat: return 5-minute or daily statistics ('5min' or 'daily')
+    :param stat: return statistics ('5min', 'daily' or other level in utils.STATS_DT)
     :param unit_system: Unit system (cxc|eng|sci, default=current units)
 
     :returns: MSID instance
@@ -1834,7 +3058,7 @@ def get_time_range(msid, format=None):
 def get_telem(msids, start=None, stop=None, sampling='full', unit_system='eng',
               interpolate_dt=None, remove_events=None, select_events=None,
               time_format=None, outfile=None, quiet=False,
-              max_fetch_Mb=1000, max_output_Mb=100):
+              max_fetch_Mb=1000, max_output_Mb=100, max_points=None):
     """
     High-level routine to get telemetry for one or more MSIDs and perform
     common processing functions:
@@ -1857,10 +3081,13 @@ def get_telem(msids, start=None, stop=None, sampling='full', unit_system='eng',
     :param remove_events: Remove kadi events expression (default=None)
     :param select_events: Select kadi events expression (default=None)
     :param time_format: Output time format (secs|date|greta|jd|..., default=secs)
-    :param outfile: Output file name (default=None)
+    :param outfile: Output file name, with format from the extension
+        (.zip of CSV files, .h5, .npz or .parquet, default=None)
     :param quiet: Suppress run-time logging output (default=False)
     :param max_fetch_Mb: Max allowed memory (Mb) for fetching (default=1000)
     :param max_output_Mb: Max allowed memory (Mb) for file output (default=100)
+    :param max_points: Select sampling automatically for at most about this many
+        samples per MSID, overriding ``sampling`` (default=None)
 
     :returns: MSIDset object
     """
@@ -1868,7 +3095,423 @@ def get_telem(msids, start=None, stop=None, sampling='full', unit_system='eng',
     return get_telem(msids, start, stop, sampling, unit_system,
                      interpolate_dt, remove_events, select_events,
                      time_format, outfile, quiet,
-                     max_fetch_Mb, max_output_Mb)
+                     max_fetch_Mb, max_output_Mb, max_points)
+
+
+def _read_colstore(content, msid, h5_slice):
+    """
+    Read rows ``h5_slice`` of ``msid`` for ``content`` from the memory-mapped
+    column store mirror.
+
+    :returns: tuple (vals, bads) or None if the mirror is not enabled or
+        does not (yet) contain the rows, in which case the HDF5 file is used.
+    """
+    if not COLSTORE or remote_access.access_remotely:
+        return None
+
+    with _fetch_lock:
+        ft['content'] = content
+        colstore_dir = msid_files['colstore'].abs
+    if not colstore.is_enabled(colstore_dir):
+        return None
+
+    cols = colstore.read_column(colstore_dir, msid, h5_slice)
+    if cols is not None:
+        logger.info('Reading %s from column store %s', msid, colstore_dir)
+    return cols
+
+
+def _read_colstore_slices(content, msid, h5_slices):
+    """
+    Read rows ``h5_slices`` of ``msid`` for ``content`` from the memory-mapped
+    column store mirror and concatenate them.
+
+    :returns: tuple (vals, bads) or None if any of the rows are not available
+    """
+    cols = [_read_colstore(content, msid, h5_slice) for h5_slice in h5_slices]
+    if any(col is None for col in cols):
+        return None
+    if len(cols) == 1:
+        return cols[0]
+    return tuple(np.concatenate(x) for x in zip(*cols))
+
+
+@local_or_remote_function("Checking stats files on Ska eng archive server...")
+def _get_files_exist(filenames):
+    return [os.path.exists(os.path.join(*filename)) for filename in filenames]
+
+
+def get_available_stats(msid):
+    """
+    Get the stats levels available in the archive for ``msid``.
+
+    The standard 5min and daily levels are always available, while additional
+    levels in ``utils.STATS_LEVELS`` (e.g. 1min, hourly, weekly) are only
+    available for content types where they have been enabled.
+
+    :param msid: MSID name
+    :returns: list of stats levels in order of increasing interval
+    """
+    from .utils import DEFAULT_STATS
+
+    MSID = msid.upper()
+    stats = list(DEFAULT_STATS)
+    if MSID in content:
+        extra_stats = [stat for stat in STATS_DT if stat not in DEFAULT_STATS]
+        filenames = []
+        with _cache_ft():
+            ft['content'] = content[MSID]
+            ft['msid'] = MSID
+            for stat in extra_stats:
+                ft['interval'] = stat
+                filenames.append(_split_path(msid_files['stats'].abs))
+        stats.extend(stat for stat, exists in zip(extra_stats, _get_files_exist(filenames))
+                     if exists)
+
+    return sorted(stats, key=STATS_DT.get)
+
+
+def select_stat(msids, start=LAUNCH_DATE, stop=None, max_points=None, target_dt=None):
+    """
+    Select the data resolution for fetching ``msids`` from ``start`` to ``stop``.
+
+    Exactly one of ``max_points`` or ``target_dt`` must be given:
+
+    - ``max_points``: full resolution is selected if the archfiles row counts
+      show at most ``max_points`` samples in the time range, otherwise the
+      finest stats level giving at most ``max_points`` intervals (or the
+      coarsest level if none does).
+    - ``target_dt``: the coarsest stats level with an interval of at most
+      ``target_dt`` seconds, or full resolution if there is none.
+
+    Only stats levels available for every MSID are considered.  Nothing is read
+    from the MSID data files, so this is cheap even for long time ranges.
+
+    :param msids: MSID name or list of MSID names
+    :param start: start date of telemetry (Chandra.Time compatible)
+    :param stop: stop date of telemetry (current time if not supplied)
+    :param max_points: maximum number of samples
+    :param target_dt: maximum sample interval (sec)
+    :returns: stat name (e.g. '5min') or None for full resolution
+    """
+    if (max_points is None) == (target_dt is None):
+        raise ValueError('exactly one of max_points or target_dt must be specified')
+
+    # MAUDE does not provide stats
+    if 'cxc' not in data_source.sources():
+        return None
+
+    if isinstance(msids, str):
+        msids = [msids]
+    MSIDs = [MSID for msid in msids for MSID in msid_glob(msid)[1]]
+    stats = set.intersection(*(set(get_available_stats(MSID)) for MSID in MSIDs))
+    stats = sorted(stats, key=STATS_DT.get)
+
+    if target_dt is not None:
+        stats = [stat for stat in stats if STATS_DT[stat] <= target_dt]
+        return stats[-1] if stats else None
+
+    tstart = DateTime(start).secs
+    tstop = DateTime(stop).secs if stop else DateTime().secs
+    if _get_n_rows_estimate(MSIDs, tstart, tstop) <= max_points:
+        return None
+
+    for stat in stats:
+        if (tstop - tstart) / STATS_DT[stat] <= max_points:
+            return stat
+    return stats[-1]
+
+
+def find_intervals(msid, op=None, val=None, start=LAUNCH_DATE, stop=None,
+                   complete_intervals=True, max_gap=None, table=True):
+    """
+    Find the intervals from ``start`` to ``stop`` during which the logical
+    comparison "vals op val" is True for ``msid``.
+
+    The result is the same as::
+
+      Msid(msid, start, stop).logical_intervals(op, val, complete_intervals, max_gap)
+
+    but for numeric MSIDs the daily and then 5min stats ``mins`` and ``maxes``
+    are first used to rule out the times where the condition cannot hold.
+    Full-resolution data are then read only in the remaining candidate windows,
+    so a mission-wide search for rare events reads a small fraction of the
+    archive.  Each window is widened as needed so the intervals found in it
+    have the exact boundaries.  State-valued and computed MSIDs, the '!='
+    operator and data sources other than 'cxc' fall back to the full search.
+
+    Multiple conditions can be given as a list of (msid, op, val) tuples in
+    place of ``msid``, in which case a list of the results for each condition
+    is returned.  Values are in the current units for this fetch module.
+
+    Examples::
+
+      >>> hot = fetch.find_intervals('tephin', '>', 318, '2000:001', '2020:001')
+
+      >>> limits = [('tephin', '>', 318), ('4rt700t', '>', 325)]
+      >>> hot_tephin, hot_4rt700t = fetch.find_intervals(limits, start='2010:001')
+
+    :param msid: MSID name or list of (msid, op, val) conditions
+    :param op: logical operator, one of ==  !=  >  <  >=  <=
+    :param val: comparison value
+    :param start: start date of telemetry (Chandra.Time compatible)
+    :param stop: stop date of telemetry (current time if not supplied)
+    :param complete_intervals: return only complete intervals (default=True)
+    :param max_gap: max allowed gap between time stamps (sec, default=None)
+    :param table: return a Table with date columns (default) or a structured
+        array without them
+    :returns: table of intervals (or list of tables for multiple conditions)
+    """
+    return _find_intervals(MSID, msid, op, val, start, stop, complete_intervals,
+                           max_gap, table)
+
+
+def _find_intervals(MSID, msid, op, val, start, stop, complete_intervals, max_gap, table):
+    """
+    Implement find_intervals() using ``MSID`` class (which sets the units).
+    """
+    tstart = DateTime(start).secs
+    tstop = (DateTime(stop).secs if stop else
+             DateTime(time.time(), format='unix').secs)
+
+    conditions = [(msid, op, val)] if isinstance(msid, str) else list(msid)
+    out = [_find_msid_intervals(MSID, cond_msid, cond_op, cond_val, tstart, tstop,
+                                complete_intervals, max_gap, table)
+           for cond_msid, cond_op, cond_val in conditions]
+
+    return out[0] if isinstance(msid, str) else out
+
+
+def _find_msid_intervals(MSID, msid, op, val, tstart, tstop, complete_intervals, max_gap,
+                         table):
+    """
+    Find the intervals from ``tstart`` to ``tstop`` where "vals op val" for
+    ``msid``, reading full-resolution data only within the candidate windows.
+    """
+    from . import utils
+
+    windows = _get_candidate_windows(MSID, msid, [(op, val)], tstart, tstop)
+    if windows is None:
+        dat = MSID(msid, tstart, tstop, filter_bad=True, lazy=False)
+        return dat.logical_intervals(op, val, complete_intervals, max_gap, table)
+
+    intervals = _get_window_intervals(MSID, msid, op, val, windows[0], windows[1],
+                                      tstart, tstop, complete_intervals, max_gap)
+    return utils._get_intervals_output(intervals, table)
+
+
+def _get_window_intervals(MSID, msid, op, val, tstarts, tstops, tstart, tstop,
+                          complete_intervals, max_gap, dat=None):
+    """
+    Get the intervals where "vals op val" for ``msid`` from the full-resolution
+    data in the windows ``tstarts`` to ``tstops`` (within ``tstart`` to ``tstop``).
+
+    The windows are widened until the first and last samples in each window
+    are False (or at ``tstart`` / ``tstop``), so the intervals found in each
+    window are the same as for the full time range.  The widening doubles
+    each time.
+
+    :param dat: MSID (filter_bad=True) already fetched over the windows (optional)
+    :returns: dict of tstart, tstop and duration arrays
+    """
+    from . import utils
+
+    op_func = _get_logical_op(op)
+    pad = STATS_DT[FIND_INTERVALS_STATS[-1]]
+    intervals = []
+    while len(tstarts) > 0:
+        if dat is None:
+            dat = MSID(msid, list(zip(tstarts, tstops)), filter_bad=True, lazy=False,
+                       categorical=False)
+        bools = op_func(dat.vals, val)
+        i0s = np.searchsorted(dat.times, tstarts, side='left')
+        i1s = np.searchsorted(dat.times, tstops, side='right')
+        ok = i1s > i0s
+        grow_lo = np.zeros(len(tstarts), dtype=bool)
+        grow_hi = np.zeros(len(tstarts), dtype=bool)
+        grow_lo[ok] = bools[i0s[ok]] & (tstarts[ok] > tstart)
+        grow_hi[ok] = bools[i1s[ok] - 1] & (tstops[ok] < tstop)
+        if not np.any(grow_lo | grow_hi):
+            intervals = [utils.logical_intervals(dat.times[i0:i1], bools[i0:i1],
+                                                 complete_intervals, max_gap, table=False)
+                         for i0, i1 in zip(i0s, i1s) if i1 - i0 >= 2]
+            break
+
+        tstarts = np.where(grow_lo, np.maximum(tstarts - pad, tstart), tstarts)
+        tstops = np.where(grow_hi, np.minimum(tstops + pad, tstop), tstops)
+        tstarts, tstops = _merge_intervals(tstarts, tstops)
+        pad *= 2
+        dat = None
+
+    return {name: (np.concatenate([ivals[name] for ivals in intervals])
+                   if intervals else np.zeros(0, dtype=np.float64))
+            for name in ('duration', 'tstart', 'tstop')}
+
+
+def _get_candidate_windows(MSID, msid, conditions, tstart, tstop):
+    """
+    Get the time windows from ``tstart`` to ``tstop`` where "vals op val" may
+    hold for ``msid`` for any of the (op, val) ``conditions`` according to the
+    FIND_INTERVALS_STATS stats, padded by one bin of the finest stats level.
+
+    Each stats level only needs to be read within the windows remaining from
+    the previous level.  Times after the start of the last stats bin (where
+    the stats may be incomplete or not yet computed) are always candidates.
+
+    :returns: tuple (tstarts, tstops) arrays or None if stats cannot be used
+    """
+    if (data_source.sources() != ('cxc',)
+            or any(op not in _STATS_CANDIDATE_FUNCS for op, val in conditions)
+            or ComputedMsid.get_matching_comp_cls(msid)):
+        return None
+    try:
+        tols = [1e-5 * (abs(val) + 1) for op, val in conditions]
+    except TypeError:
+        return None
+
+    tstarts = np.array([tstart])
+    tstops = np.array([tstop])
+    for stat in FIND_INTERVALS_STATS:
+        if len(tstarts) == 0:
+            break
+        dt = STATS_DT[stat]
+        try:
+            dat = MSID(msid, tstarts[0] - dt, tstops[-1] + dt, stat=stat,
+                       stat_cols=['mins', 'maxes'], lazy=False)
+        except ValueError:
+            # No mins / maxes stats for non-numeric MSIDs
+            return None
+
+        # Candidate bins that overlap the current windows
+        bin_starts = dat.times - dt / 2
+        i_win = np.searchsorted(tstops, bin_starts, side='right')
+        ok = i_win < len(tstarts)
+        ok[ok] = tstarts[i_win[ok]] < bin_starts[ok] + dt
+        is_candidate = np.zeros(len(ok), dtype=bool)
+        for (op, val), tol in zip(conditions, tols):
+            is_candidate |= _STATS_CANDIDATE_FUNCS[op](dat.mins, dat.maxes, val, tol)
+        ok &= is_candidate
+
+        # Current windows after the start of the last stats bin
+        tail_start = bin_starts[-1] if len(bin_starts) > 0 else -np.inf
+        tail = tstops > tail_start
+        tstarts, tstops = _merge_intervals(
+            np.concatenate([bin_starts[ok], np.maximum(tstarts[tail], tail_start)]),
+            np.concatenate([bin_starts[ok] + dt, tstops[tail]]))
+        tstarts = np.maximum(tstarts, tstart)
+        tstops = np.minimum(tstops, tstop)
+        keep = tstops > tstarts
+        tstarts, tstops = tstarts[keep], tstops[keep]
+
+    pad = STATS_DT[FIND_INTERVALS_STATS[-1]]
+    return _merge_intervals(np.maximum(tstarts - pad, tstart),
+                            np.minimum(tstops + pad, tstop))
+
+
+def _get_n_rows_estimate(MSIDs, tstart, tstop):
+    """
+    Get the maximum number of full-resolution rows for any of ``MSIDs`` between
+    ``tstart`` and ``tstop`` from the archfiles row counts.
+    """
+    n_rows = 0
+    for MSID in MSIDs:
+        if MSID in content:
+            with _cache_ft(), _set_msid_files_basedir(DateTime(tstart).date):
+                h5_slice = get_interval(content[MSID], tstart, tstop)
+            n_rows = max(n_rows, h5_slice.stop - h5_slice.start)
+        else:
+            n_rows = max(n_rows, (tstop - tstart) / FULL_RES_DT_MIN)
+    return n_rows
+
+
+@local_or_remote_function("Getting interval data from " +
+                          "DB on Ska eng archive server...")
+def _get_interval_from_db(tstart, tstop, server):
+    """
+    Get the row slice enclosing ``tstart`` to ``tstop`` from the archfiles DB
+    ``server`` (split path).  This is the uncached version of get_interval().
+    """
+    import Ska.DBI
+
+    db = Ska.DBI.DBI(dbi='sqlite', server=os.path.join(*server))
+
+    query_row = db.fetchone('SELECT tstart, rowstart FROM archfiles '
+                            'WHERE filetime < ? order by filetime desc',
+                            (tstart,))
+    if not query_row:
+        query_row = db.fetchone('SELECT tstart, rowstart FROM archfiles '
+                                'order by filetime asc')
+
+    rowstart = query_row['rowstart']
+
+    query_row = db.fetchone('SELECT tstop, rowstop FROM archfiles '
+                            'WHERE filetime > ? order by filetime asc',
+                            (tstop,))
+    if not query_row:
+        query_row = db.fetchone('SELECT tstop, rowstop FROM archfiles '
+                                'order by filetime desc')
+
+    rowstop = query_row['rowstop']
+
+    return slice(rowstart, rowstop)
+
+
+@local_or_remote_function("Getting archfiles row index from " +
+                          "DB on Ska eng archive server...")
+def _get_archfiles_rows_from_db(server):
+    """
+    Get the filetime, rowstart and rowstop of all archive files in the archfiles
+    DB ``server`` (split path), sorted by filetime.
+    """
+    import Ska.DBI
+
+    db = Ska.DBI.DBI(dbi='sqlite', server=os.path.join(*server))
+    rows = db.fetchall('SELECT filetime, rowstart, rowstop FROM archfiles '
+                       'order by filetime asc')
+    return (np.array(rows['filetime'], dtype=np.float64),
+            np.array(rows['rowstart'], dtype=np.int64),
+            np.array(rows['rowstop'], dtype=np.int64))
+
+
+@lru_cache_timed(maxsize=100, timeout=600)
+def _get_archfiles_rows(server):
+    return _get_archfiles_rows_from_db(server)
+
+
+def get_interval_slices(content, tstarts, tstops):
+    """
+    Get the row slices that enclose the intervals ``tstarts`` to ``tstops`` for
+    the ``content`` type, with overlapping or adjacent slices merged.
+
+    The row range for each interval is the same as from ``get_interval()``, but
+    all are computed from a single read of the archfiles table.  The archfiles
+    table is cached for 10 minutes.
+
+    :param content: content type (e.g. 'pcad3eng', 'thm1eng')
+    :param tstarts: array of interval start times (CXC seconds), sorted
+    :param tstops: array of interval stop times (CXC seconds)
+
+    :returns: list of row slices, sorted and non-overlapping
+    """
+    with _fetch_lock:
+        ft['content'] = content
+        server = _split_path(msid_files['archfiles'].abs)
+    filetimes, rowstarts, rowstops = _get_archfiles_rows(server)
+    n_files = len(filetimes)
+
+    # Last file with filetime < tstart (else the first file), and first file with
+    # filetime > tstop (else the last file).
+    i0 = np.clip(np.searchsorted(filetimes, tstarts, side='left') - 1, 0, n_files - 1)
+    i1 = np.clip(np.searchsorted(filetimes, tstops, side='right'), 0, n_files - 1)
+
+    slices = []
+    for row0, row1 in zip(rowstarts[i0], rowstops[i1]):
+        if slices and row0 <= slices[-1][1]:
+            slices[-1][1] = max(slices[-1][1], row1)
+        else:
+            slices.append([row0, row1])
+
+    return [slice(int(row0), int(row1)) for row0, row1 in slices]
 
 
 @lru_cache_timed(maxsize=1000, timeout=600)
@@ -1888,54 +3531,188 @@ def get_interval(content, tstart, tstop):
     :returns: rowslice
     """
 
-    ft['content'] = content
+    with _fetch_lock:
+        ft['content'] = content
+        server = _split_path(msid_files['archfiles'].abs)
 
-    @local_or_remote_function("Getting interval data from " +
-                              "DB on Ska eng archive server...")
-    def get_interval_from_db(tstart, tstop, server):
+    return _get_interval_from_db(tstart, tstop, server)
 
-        import Ska.DBI
 
-        db = Ska.DBI.DBI(dbi='sqlite', server=os.path.join(*server))
+@local_or_remote_function("Getting archive state from " +
+                          "DB on Ska eng archive server...")
+def _get_archive_state_from_db(server):
+    import Ska.DBI
 
-        query_row = db.fetchone('SELECT tstart, rowstart FROM archfiles '
-                                'WHERE filetime < ? order by filetime desc',
-                                (tstart,))
-        if not query_row:
-            query_row = db.fetchone('SELECT tstart, rowstart FROM archfiles '
-                                    'order by filetime asc')
+    db = Ska.DBI.DBI(dbi='sqlite', server=os.path.join(*server))
+    query_row = db.fetchone('SELECT tstop, rowstop FROM archfiles '
+                            'order by filetime desc')
+    return (float(query_row['rowstop']), float(query_row['tstop']))
 
-        rowstart = query_row['rowstart']
 
-        query_row = db.fetchone('SELECT tstop, rowstop FROM archfiles '
-                                'WHERE filetime > ? order by filetime asc',
-                                (tstop,))
-        if not query_row:
-            query_row = db.fetchone('SELECT tstop, rowstop FROM archfiles '
-                                    'order by filetime desc')
+def _get_archive_state(content):
+    """
+    Get the current full-resolution archive state for ``content``, which is
+    the (rowstop, tstop) of the last ingested archive file.  This is not
+    cached since it is used to validate the persistent fetch cache.
+
+    :param content: content type (e.g. 'pcad3eng', 'thm1eng')
+    :returns: tuple (rowstop, tstop)
+    """
+    with _fetch_lock:
+        ft['content'] = content
+        server = _split_path(msid_files['archfiles'].abs)
+    return _get_archive_state_from_db(server)
+
+
+@local_or_remote_function("Getting modified times from Ska eng archive server...")
+def _get_modified_times_from_file(filename):
+    import os
+
+    if not os.path.exists(os.path.join(*filename)):
+        return []
+    with open(os.path.join(*filename)) as fh:
+        return [float(line) for line in fh if line.strip()]
+
+
+def _get_modified_times(content):
+    """
+    Get the times of the first samples of ``content`` archive data that were
+    modified in place, in the order of modification (see
+    ``fetch_cache.add_modified_time()``).  This is not cached since it is used
+    to validate the persistent fetch cache.
+
+    :param content: content type (e.g. 'pcad3eng', 'thm1eng')
+    :returns: list of times (CXC seconds)
+    """
+    with _fetch_lock:
+        ft['content'] = content
+        filename = _split_path(msid_files['modified'].abs)
+    return _get_modified_times_from_file(filename)
+
+
+def _is_disk_cache_entry_valid(entry, state, modified_times, tstop):
+    """
+    Check if a persistent fetch cache ``entry`` for a chunk of data ending at
+    ``tstop`` is still valid.
+
+    The entry is valid if the archive is unchanged since the entry was cached
+    (same ``state``), or if the chunk is complete, the archive has not been
+    truncated and no data before ``tstop`` were modified in place since the
+    entry was cached.  The last element of each state is the number of
+    ``modified_times`` at the time of caching.
+
+    :param entry: (arrays, state, complete) cache entry
+    :param state: current archive state
+    :param modified_times: current list of in-place modification times
+    :param tstop: time after which data modifications do not affect the chunk
+    :returns: bool
+    """
+    arrays, entry_state, complete = entry
+    if entry_state == state:
+        return True
+    if not complete or len(entry_state) != len(state) or state[0] < entry_state[0]:
+        return False
+    n_modified = int(entry_state[-1])
+    return (n_modified <= len(modified_times)
+            and all(time >= tstop for time in modified_times[n_modified:]))
+
+
+@local_or_remote_function("Getting row counts from " +
+                          "DB on Ska eng archive server...")
+def _get_n_rows_from_db(tstart, tstop, server):
+    """
+    Estimate the number of full-resolution rows between ``tstart`` and ``tstop``
+    from the archfiles DB ``server`` (split path).  Rows of archive files that
+    partly overlap the time range are counted pro rata.
+    """
+    import Ska.DBI
+
+    db = Ska.DBI.DBI(dbi='sqlite', server=os.path.join(*server))
+    rows = db.fetchall('SELECT tstart, tstop, rowstart, rowstop FROM archfiles '
+                       'WHERE tstop > ? AND tstart < ?', (tstart, tstop))
+    if len(rows) == 0:
+        return 0.0
+
+    dt = np.maximum(rows['tstop'] - rows['tstart'], 1e-3)
+    overlap = np.minimum(rows['tstop'], tstop) - np.maximum(rows['tstart'], tstart)
+    frac = np.clip(overlap / dt, 0.0, 1.0)
+    return float(np.sum(frac * (rows['rowstop'] - rows['rowstart'])))
+
+
+def get_n_rows(content, tstart, tstop):
+    """
+    Estimate the number of full-resolution rows for ``content`` between ``tstart``
+    and ``tstop`` using only the archfiles row counts (no data are read).
+
+    :param content: content type (e.g. 'pcad3eng', 'thm1eng')
+    :param tstart: start time (CXC seconds)
+    :param tstop: stop time (CXC seconds)
+    :returns: estimated number of rows (float)
+    """
+    with _fetch_lock:
+        ft['content'] = content
+        server = _split_path(msid_files['archfiles'].abs)
+    return _get_n_rows_from_db(tstart, tstop, server)
+
 
-        rowstop = query_row['rowstop']
+@local_or_remote_function("Getting HDF5 file metadata from Ska eng archive server...")
+def _get_h5_meta(filename):
+    """
+    Get metadata for the ``data`` node of HDF5 ``filename`` (split path).
+
+    :returns: tuple (dtype, number of rows, first index, last index), where the
+        index values are for stats tables and None for full-resolution files
+    """
+    import tables
 
-        return slice(rowstart, rowstop)
+    with tables.open_file(os.path.join(*filename), 'r') as h5:
+        data = h5.root.data
+        n_rows = len(data)
+        if isinstance(data, tables.Table):
+            if n_rows == 0:
+                return data.dtype, 0, None, None
+            index0 = int(data.read(0, 1, field='index')[0])
+            index1 = int(data.read(n_rows - 1, n_rows, field='index')[0])
+            return data.dtype, n_rows, index0, index1
+        return np.dtype((data.atom.dtype, data.shape[1:])), n_rows, None, None
 
-    return get_interval_from_db(tstart, tstop, _split_path(msid_files['archfiles'].abs))
+
+def get_h5_meta(msid, stat=None):
+    """
+    Get metadata for the full-resolution (``stat=None``) or stats HDF5 file of
+    ``msid`` without reading any data arrays.
+
+    :param msid: MSID name
+    :param stat: stat name or None for full resolution
+    :returns: tuple (dtype, number of rows, first index, last index), where the
+        index values are only available for stats
+    """
+    MSID = msid.upper()
+    with _cache_ft():
+        ft['content'] = content[MSID]
+        ft['msid'] = MSID
+        ft['interval'] = stat
+        filename = msid_files['stats' if stat else 'msid'].abs
+    return _get_h5_meta(_split_path(filename))
 
 
 @contextlib.contextmanager
 def _cache_ft():
     """
     Cache the global filetype ``ft`` context variable so that fetch operations
-    do not corrupt user values of ``ft``.
+    do not corrupt user values of ``ft``.  This holds ``_fetch_lock`` so that
+    only one thread at a time uses ``ft``.
     """
-    ft_cache_pickle = pickle.dumps(ft)
-    try:
-        yield
-    finally:
-        ft_cache = pickle.loads(ft_cache_pickle)
-        ft.update(ft_cache)
-        delkeys = [x for x in ft if x not in ft_cache]
-        for key in delkeys:
-            del ft[key]
+    with _fetch_lock:
+        ft_cache_pickle = pickle.dumps(ft)
+        try:
+            yield
+        finally:
+            ft_cache = pickle.loads(ft_cache_pickle)
+            ft.update(ft_cache)
+            delkeys = [x for x in ft if x not in ft_cache]
+            for key in delkeys:
+                del ft[key]
 
 
 @contextlib.contextmanager
@@ -1998,6 +3775,26 @@ def add_logging_handler(level=logging.INFO,
     logger.addHandler(handler)
 
 
+def _get_stat_table_colnames(stat_cols):
+    """Return the stats table column names that can provide output ``stat_cols``.
+
+    Output columns are the table columns with ``_plural()`` applied (``n`` is
+    ``samples``) and ``vals`` is ``means`` if available.  Where the singular is
+    ambiguous both candidates are returned; names not in the table are ignored.
+    """
+    colnames = set()
+    for stat_col in stat_cols:
+        if stat_col == 'samples':
+            colnames.add('n')
+        elif stat_col in ('vals', 'midvals'):
+            colnames.update(['val', 'mean'])
+        elif stat_col != 'times':
+            colnames.add(stat_col[:-1])
+            if stat_col.endswith('es'):
+                colnames.add(stat_col[:-2])
+    return sorted(colnames)
+
+
 def _plural(x):
     """Return English plural of ``x``.  Super-simple and only valid for the
     known small set of cases within fetch where it will get applied.
@@ -0,0 +1,174 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+Persistent on-disk cache of fetch results.
+
+Enable with ``fetch_cache.enable(path)``, after which ``fetch`` stores
+full-resolution values and stats rows in chunks that are validated against the
+current archive state (see ``fetch.MSID._get_msid_data_from_disk_cache``).
+"""
+import hashlib
+import os
+
+import numpy as np
+
+
+class DiskCache(object):
+    """
+    Persistent on-disk cache of fetch results with least-recently-used eviction.
+
+    Each entry is a set of named numpy arrays stored as an uncompressed ``.npz``
+    file, along with the archive ``state`` at the time it was stored and a
+    ``complete`` flag.  Validation of entries against the current archive state
+    is done by the caller (see ``fetch``).
+
+    :param path: cache directory (created if needed)
+    :param max_bytes: maximum total size of cache files
+    """
+    def __init__(self, path, max_bytes):
+        self.path = os.path.abspath(path)
+        self.max_bytes = int(max_bytes)
+        os.makedirs(self.path, exist_ok=True)
+        self.n_bytes = sum(size for _, _, size in self._entries())
+        self.hits = self.misses = 0
+
+    def __repr__(self):
+        return ('<DiskCache path={} n_bytes={} max_bytes={} hits={} misses={}>'
+                .format(self.path, self.n_bytes, self.max_bytes, self.hits, self.misses))
+
+    def _entries(self):
+        """Yield (filename, last access time, size) for each cache file"""
+        for dirpath, dirnames, filenames in os.walk(self.path):
+            for name in filenames:
+                if name.endswith('.npz'):
+                    filename = os.path.join(dirpath, name)
+                    try:
+                        stat = os.stat(filename)
+                    except OSError:
+                        continue
+                    yield filename, stat.st_mtime, stat.st_size
+
+    def _get_filename(self, key):
+        # First element of key (MSID name) gives a subdirectory to keep
+        # directories from getting too large.
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.path, str(key[0]).upper(), digest + '.npz')
+
+    def get(self, key):
+        """
+        Get cache entry for ``key``.
+
+        :param key: hashable key with the MSID name as the first element
+        :returns: tuple (dict of arrays, state, complete) or None if not found
+        """
+        filename = self._get_filename(key)
+        try:
+            with np.load(filename, allow_pickle=False) as npz:
+                arrays = {name: npz[name] for name in npz.files}
+            # Record access time for LRU eviction (atime is not reliable)
+            os.utime(filename)
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        state = tuple(arrays.pop('_state').tolist())
+        complete = bool(arrays.pop('_complete'))
+        return arrays, state, complete
+
+    def put(self, key, arrays, state, complete):
+        """
+        Store ``arrays`` for ``key`` with the archive ``state``.
+
+        :param key: hashable key with the MSID name as the first element
+        :param arrays: dict of numpy arrays
+        :param state: tuple of numbers identifying the archive state
+        :param complete: True if the data for ``key`` can no longer change
+        """
+        filename = self._get_filename(key)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        tmp_filename = '{}.{}.tmp'.format(filename, os.getpid())
+        with open(tmp_filename, 'wb') as fh:
+            np.savez(fh, _state=np.array(state, dtype=np.float64),
+                     _complete=np.array(complete), **arrays)
+        size = os.path.getsize(tmp_filename)
+        try:
+            old_size = os.path.getsize(filename)
+        except OSError:
+            old_size = 0
+        os.replace(tmp_filename, filename)
+
+        self.n_bytes += size - old_size
+        if self.n_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self, fraction=0.9):
+        """
+        Remove least recently used entries until the cache is below
+        ``fraction`` of ``max_bytes``.
+        """
+        entries = sorted(self._entries(), key=lambda x: x[1])
+        self.n_bytes = sum(x[2] for x in entries)
+        for filename, _, size in entries:
+            if self.n_bytes <= self.max_bytes * fraction:
+                break
+            try:
+                os.unlink(filename)
+            except OSError:
+                continue
+            self.n_bytes -= size
+
+    def clear(self):
+        """Remove all entries"""
+        self.evict(fraction=0)
+
+
+# Module-level persistent fetch result cache, set with enable()
+disk_cache = None
+
+
+def enable(path, max_bytes=4 * 2 ** 30):
+    """
+    Enable the persistent on-disk cache of fetch results.
+
+    Fetched values are stored in ``path`` in chunks aligned on fixed time
+    boundaries, so fetches that re-run over the same time ranges (e.g. daily
+    reports) read mostly from the cache.  Each chunk is validated against the
+    current archive state, so newly appended telemetry only invalidates the
+    last chunk.
+
+    Example::
+
+      >>> from cheta import fetch, fetch_cache
+      >>> fetch_cache.enable('/tmp/cheta_cache', max_bytes=10e9)
+      >>> dat = fetch.Msid('tephin', '2015:001', '2020:001')  # slow first time
+
+    :param path: cache directory
+    :param max_bytes: maximum size of cache in bytes (default=4 GiB)
+    :returns: DiskCache object
+    """
+    global disk_cache
+    disk_cache = DiskCache(path, max_bytes)
+    return disk_cache
+
+
+def disable():
+    """Disable the persistent on-disk cache of fetch results"""
+    global disk_cache
+    disk_cache = None
+
+
+def add_modified_time(filename, time):
+    """
+    Record that archive data at or after ``time`` were modified in place.
+
+    Tools that change existing archive rows (e.g. setting the quality of
+    overlapping data or fixing bad values) append the time of the first
+    modified sample to the content ``modified`` file (see ``file_defs``).  A
+    cached chunk is re-read if any data before its end were modified since the
+    chunk was cached.
+
+    :param filename: content modified times file
+    :param time: time of the first modified sample (CXC seconds)
+    """
+    with open(filename, 'a') as fh:
+        fh.write('{!r}\n'.format(float(time)))
@@ -23,6 +23,15 @@ def set_units(unit_system):
 set_units.__doc__ = fetch.set_units.__doc__
 
 
+def find_intervals(msid, op=None, val=None, start=fetch.LAUNCH_DATE, stop=None,
+                   complete_intervals=True, max_gap=None, table=True):
+    return fetch._find_intervals(MSID, msid, op, val, start, stop, complete_intervals,
+                                 max_gap, table)
+
+
+find_intervals.__doc__ = fetch.find_intervals.__doc__
+
+
 class MSID(fetch.MSID):
     __doc__ = fetch.MSID.__doc__
     units = UNITS
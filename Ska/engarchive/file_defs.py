@@ -33,6 +33,8 @@ msid_files = {'filetypes':    'filetypes.dat',
               'statsdir':     'data/{{ft.content}}/{{ft.interval}}/',
               'stats':        'data/{{ft.content}}/{{ft.interval}}/{{ft.msid | upper}}.h5',
               'last_date_id': 'data/{{ft.content}}/{{ft.interval}}/last_date_id',
+              'colstore':     'data/{{ft.content}}/colstore/',
+              'modified':     'data/{{ft.content}}/modified_times.dat',
               }
 
 
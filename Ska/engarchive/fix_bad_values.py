@@ -49,7 +49,7 @@ import scipy.stats.mstats
 
 import pyyaks.context
 import pyyaks.logger
-from Ska.engarchive import fetch
+from Ska.engarchive import fetch, colstore, fetch_cache
 import Ska.engarchive.file_defs as file_defs
 from Chandra.Time import DateTime
 
@@ -217,6 +217,8 @@ def fix_stats_h5(msid, tstart, tstop, interval):
 def fix_msid_h5(msid, tstart, tstop):
     """
     Fix the msid full-resolution HDF5 data file
+
+    :returns: first row index that was fixed (None if no rows)
     """
     logger.info('Fixing MSID {} h5 file'.format(msid))
     row_slice = fetch.get_interval(ft['content'].val, tstart, tstop)
@@ -265,6 +267,35 @@ def fix_msid_h5(msid, tstart, tstop):
         h5.close()
     logger.info('')
 
+    return int(fix_idxs[0]) if len(fix_idxs) > 0 else None
+
+
+def sync_colstore(msid, rowstart):
+    """
+    Re-copy rows from ``rowstart`` onward of ``msid`` to the memory-mapped column
+    store mirror (if enabled), since rows were modified in place.
+    """
+    colstore_dir = msid_files['colstore'].abs
+    if not colstore.is_enabled(colstore_dir):
+        return
+
+    logger.info('Syncing {} column store mirror {} from row {}'
+                .format(msid, colstore_dir, rowstart))
+    if opt.run:
+        colstore.sync_content(msid_files['contentdir'].abs, colstore_dir, [msid],
+                              rowstart=rowstart)
+
+
+def record_modified_time(filename, tstart):
+    """
+    Record that data from ``tstart`` onward were modified in place, so the
+    persistent fetch cache re-reads them.
+    """
+    logger.info('Recording modified data from {} in {}'
+                .format(DateTime(tstart).date, filename))
+    if opt.run:
+        fetch_cache.add_modified_time(filename, tstart)
+
 
 def main():
     global opt
@@ -303,12 +334,22 @@ def main():
     # First fix the HDF5 file with full resolution MSID data
     # Need to potentially set basedir for 1999 data.
     with _set_msid_files_basedir(DateTime(tstart).date):
-        fix_msid_h5(msid, tstart, tstop)
+        fix_rowstart = fix_msid_h5(msid, tstart, tstop)
+        if fix_rowstart is not None:
+            sync_colstore(msid, fix_rowstart)
+        modified_file = msid_files['modified'].abs
 
     # Now fix stats files
     fix_stats_h5(msid, tstart, tstop, '5min')
     fix_stats_h5(msid, tstart, tstop, 'daily')
 
+    # Record the change only after all files are fixed, since fetch results cached
+    # after the record are taken to include it.  Stats are always in the default
+    # data root, which differs from the full-resolution data root for 1999 data.
+    record_modified_time(modified_file, tstart)
+    if msid_files['modified'].abs != modified_file:
+        record_modified_time(msid_files['modified'].abs, tstart)
+
 
 if __name__ == '__main__':
     main()
@@ -17,6 +17,9 @@ Examples
   % ska_fetch AIRU2BT --start 2004:001 --sampling=daily --outfile=airu2bt.zip \\
               --remove-events='ltt_bads[msid="AIRU2BT"]'
 
+  # Get 5-minute data for two weeks as one HDF5 file (format from extension)
+  % ska_fetch TEPHIN TCYLAFT6 --start 2013:001 --stop 2013:015 --outfile=temps.h5
+
 Arguments
 =========
 """
@@ -24,6 +27,7 @@ from __future__ import print_function, division, absolute_import
 
 import ast
 import argparse
+import os
 import re
 import shlex
 from itertools import count
@@ -154,10 +158,24 @@ def get_queryset(expr):
     return eval(queryset_expr)
 
 
+def write_outfile(dat, outfile):
+    """
+    Write MSIDset ``dat`` to ``outfile`` in the format given by the file
+    extension (.h5 or .hdf5, .npz, .parquet, default=zip of CSV files).
+    """
+    ext = os.path.splitext(outfile)[1].lower()
+    writers = {'.h5': dat.write_hdf5,
+               '.hdf5': dat.write_hdf5,
+               '.npz': dat.write_npz,
+               '.parquet': dat.write_parquet}
+    write = writers.get(ext, dat.write_zip)
+    write(outfile)
+
+
 def get_telem(msids, start=None, stop=None, sampling='full', unit_system='eng',
               interpolate_dt=None, remove_events=None, select_events=None,
               time_format=None, outfile=None, quiet=False,
-              max_fetch_Mb=None, max_output_Mb=None):
+              max_fetch_Mb=None, max_output_Mb=None, max_points=None):
     """
     High-level routine to get telemetry for one or more MSIDs and perform
     common post-processing functions.
@@ -174,10 +192,14 @@ def get_telem(msids, start=None, stop=None, sampling='full', unit_system='eng',
     # Set defaults and translate to fetch keywords
     stop = DateTime(stop)
     start = stop - 30 if start is None else DateTime(start)
-    stat = None if sampling == 'full' else sampling
     filter_bad = interpolate_dt is None
     if isinstance(msids, six.string_types):
         msids = [msids]
+    if max_points is not None:
+        stat = fetch.select_stat(msids, start, stop, max_points=max_points)
+        sampling = stat or 'full'
+    else:
+        stat = None if sampling == 'full' else sampling
 
     logger.info('Fetching {}-resolution data for MSIDS={}\n  from {} to {}'
                 .format(sampling, msids, start.date, stop.date))
@@ -221,7 +243,7 @@ def get_telem(msids, start=None, stop=None, sampling='full', unit_system='eng',
 
     if outfile:
         logger.info('Writing data to {}'.format(outfile))
-        dat.write_zip(outfile)
+        write_outfile(dat, outfile)
 
     return dat
 
@@ -240,7 +262,8 @@ def get_opt():
     parser.add_argument('--sampling',
                         type=str,
                         default='5min',
-                        help='Data sampling (full|5min|daily) (default=5min)')
+                        help='Data sampling (full|{}) (default=5min)'
+                             .format('|'.join(utils.STATS_DT)))
 
     parser.add_argument('--unit-system',
                         type=str,
@@ -266,7 +289,8 @@ def get_opt():
     parser.add_argument('--outfile',
                         default='fetch.zip',
                         type=str,
-                        help='Output file name (default=fetch.zip)')
+                        help='Output file name with format from the extension '
+                             '(.zip|.h5|.npz|.parquet, default=fetch.zip)')
 
     parser.add_argument('--quiet',
                         action='store_true',
@@ -282,6 +306,11 @@ def get_opt():
                         type=float,
                         help='Max allowed memory (Mb) for file output (default=100)')
 
+    parser.add_argument('--max-points',
+                        type=int,
+                        help='Select sampling automatically for at most about this many '
+                             'samples per MSID (overrides --sampling)')
+
     parser.add_argument('msids',
                         metavar='MSID',
                         type=str,
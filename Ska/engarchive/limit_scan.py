@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+Scan many MSIDs against low / high limits and expected states.
+
+The limits table has one row per limit set with columns:
+
+=======  ==================================================================
+msid     MSID name
+low      violation when the value is below ``low`` (optional)
+high     violation when the value is above ``high`` (optional)
+state    violation when the value is not ``state`` (optional)
+=======  ==================================================================
+
+Empty or masked values are ignored, so e.g. yellow and red limits are just
+two rows for the same MSID.  The violation intervals are found as for
+``fetch.find_intervals()``: the daily and 5min ``mins`` / ``maxes`` rule out
+the times where a low / high limit cannot be violated, and full-resolution
+data are read only in the remaining windows.  The MSIDs of each content type
+are processed together with the same windows, so the TIME column is read once
+per content, and the content types are processed in parallel.
+
+Example::
+
+  cheta_scan_limits limits.dat --start 2020:001 --stop 2020:100 --outfile=viols.ecsv
+"""
+import argparse
+import collections
+import concurrent.futures
+
+import numpy as np
+from astropy.io import ascii
+from astropy.table import Table
+
+from Chandra.Time import DateTime
+from . import fetch, utils
+
+# Limit columns of the limits table and the logical operator for a violation
+LIMIT_OPS = collections.OrderedDict([('low', '<'), ('high', '>'), ('state', '!=')])
+
+
+def get_options(args=None):
+    parser = argparse.ArgumentParser(
+        description='Scan MSIDs for limit violations in the cheta archive')
+    parser.add_argument("limits",
+                        help="Limits table file with msid, low, high, state columns")
+    parser.add_argument("--start",
+                        help="Start time for scan (default=<stop> - 1 day)")
+    parser.add_argument("--stop",
+                        help="Stop time for scan (default=NOW)")
+    parser.add_argument("--unit-system",
+                        default='eng',
+                        help="Unit system for limits (eng|sci|cxc, default=eng)")
+    parser.add_argument("--processes",
+                        type=int,
+                        help="Number of worker processes (default=number of CPUs)")
+    parser.add_argument("--max-gap",
+                        type=float,
+                        help="Max allowed gap between samples in a violation (sec)")
+    parser.add_argument("--complete-intervals",
+                        action="store_true",
+                        help="Only report violations that start and end within the scan")
+    parser.add_argument("--outfile",
+                        help="Output violations table (format from extension, "
+                             "default=print table)")
+    return parser.parse_args(args)
+
+
+def _is_missing(val):
+    return (val is None or val is np.ma.masked
+            or (isinstance(val, str) and val.strip() in ('', '--')))
+
+
+def get_conditions(limits):
+    """
+    Get the violation conditions for the ``limits`` table.
+
+    :param limits: limits table file name, Table or list of dict rows
+    :returns: list of (row, msid, limit, op, val) tuples
+    """
+    if isinstance(limits, str):
+        limits = ascii.read(limits)
+    elif not isinstance(limits, Table):
+        limits = Table(limits)
+
+    if 'msid' not in limits.colnames:
+        raise ValueError('limits table must have an msid column')
+
+    conditions = []
+    for irow, row in enumerate(limits):
+        for limit, op in LIMIT_OPS.items():
+            if limit not in limits.colnames or _is_missing(row[limit]):
+                continue
+            val = row[limit]
+            val = str(val) if limit == 'state' else float(val)
+            conditions.append((irow, str(row['msid']), limit, op, val))
+
+    return conditions
+
+
+def scan_limits(limits, start=None, stop=None, unit_system='eng', processes=None,
+                complete_intervals=False, max_gap=None):
+    """
+    Find the intervals from ``start`` to ``stop`` during which any MSID in the
+    ``limits`` table violates its limits.
+
+    The result is the same as looping over the limits with
+    ``Msid(msid, start, stop).logical_intervals(op, val, complete_intervals,
+    max_gap)``, where ``op`` is ``<`` for ``low``, ``>`` for ``high`` and ``!=``
+    for ``state``, but is much faster for many MSIDs and long time ranges.  Note
+    that by default violations that are in progress at ``start`` or ``stop``
+    are included (``complete_intervals=False``), unlike the
+    ``logical_intervals()`` default.
+
+    The output table has a row for each violation, with columns ``row`` (row
+    of the limits table), ``msid``, ``limit`` (low|high|state) and the interval
+    columns ``datestart``, ``datestop``, ``duration``, ``tstart`` and ``tstop``.
+
+    :param limits: limits table file name, Table or list of dict rows
+    :param start: start date of scan (default=``stop`` - 1 day)
+    :param stop: stop date of scan (default=NOW)
+    :param unit_system: unit system of the limits (eng|sci|cxc, default=eng)
+    :param processes: number of worker processes (default=number of CPUs, 1 to
+        run in this process)
+    :param complete_intervals: only report violations that start and stop within
+        the scan (default=False)
+    :param max_gap: max allowed gap between samples in a violation (sec, default=None)
+    :returns: Table of violations
+    """
+    tstop = DateTime(stop).secs
+    tstart = DateTime(start).secs if start else tstop - 86400
+
+    # Group conditions by content so the MSIDs of a content share the TIME reads
+    groups = collections.OrderedDict()
+    for cond in get_conditions(limits):
+        content = fetch.content.get(cond[1].upper())
+        groups.setdefault(content, []).append(cond)
+
+    args = [(conds, tstart, tstop, unit_system, fetch.data_source._data_sources,
+             complete_intervals, max_gap) for conds in groups.values()]
+    if processes == 1 or len(args) <= 1:
+        results = [_scan_group(*arg) for arg in args]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(_scan_group, *zip(*args)))
+
+    rows = collections.defaultdict(list)
+    for cond, intervals in (result for group in results for result in group):
+        irow, msid, limit = cond[:3]
+        n_intervals = len(intervals['tstart'])
+        rows['row'].append(np.full(n_intervals, irow, dtype=np.int64))
+        rows['msid'].append(np.full(n_intervals, msid.upper()))
+        rows['limit'].append(np.full(n_intervals, limit))
+        for name, vals in intervals.items():
+            rows[name].append(vals)
+
+    cols = {name: np.concatenate(vals) for name, vals in rows.items()}
+    if not cols:
+        cols = {name: np.zeros(0, dtype=dtype) for name, dtype in
+                (('row', np.int64), ('msid', 'U1'), ('limit', 'U5'),
+                 ('duration', np.float64), ('tstart', np.float64), ('tstop', np.float64))}
+
+    # Sort by limits table row then time, and add date columns
+    order = np.lexsort([cols['tstart'], cols['row']])
+    out = utils._get_intervals_output({name: cols[name][order]
+                                       for name in ('duration', 'tstart', 'tstop')}, table=True)
+    for ii, name in enumerate(('row', 'msid', 'limit')):
+        out.add_column(cols[name][order], name=name, index=ii)
+    return out
+
+
+def _scan_group(conds, tstart, tstop, unit_system, data_sources, complete_intervals,
+                max_gap):
+    """
+    Find the violation intervals for the conditions ``conds`` of MSIDs in one
+    content type.
+
+    MSIDs with limits that can be pruned with the stats are fetched over the
+    union of their candidate windows, and the others (e.g. state MSIDs) over
+    the full time range, so that within each set the TIME column is read once.
+
+    :returns: list of (condition, intervals) where intervals is a dict of
+        duration, tstart and tstop arrays
+    """
+    units = fetch.get_units()
+    fetch.set_units(unit_system)
+    try:
+        with fetch.data_source(*data_sources):
+            MSID = fetch.MSID
+            msid_conds = collections.OrderedDict()
+            for cond in conds:
+                msid_conds.setdefault(cond[1], []).append(cond)
+
+            full_range = (np.array([tstart]), np.array([tstop]))
+            msid_windows = {}
+            for msid, mconds in msid_conds.items():
+                windows = fetch._get_candidate_windows(
+                    MSID, msid, [cond[3:] for cond in mconds], tstart, tstop)
+                msid_windows[msid] = full_range if windows is None else windows
+
+            pruned = [msid for msid, windows in msid_windows.items()
+                      if windows is not full_range]
+            if pruned:
+                windows = fetch._merge_intervals(
+                    np.concatenate([msid_windows[msid][0] for msid in pruned]),
+                    np.concatenate([msid_windows[msid][1] for msid in pruned]))
+                for msid in pruned:
+                    msid_windows[msid] = windows
+
+            results = []
+            for msid, mconds in msid_conds.items():
+                tstarts, tstops = msid_windows[msid]
+                dat = (MSID(msid, list(zip(tstarts, tstops)), filter_bad=True, lazy=False,
+                            categorical=False)
+                       if len(tstarts) > 0 else None)
+                for cond in mconds:
+                    intervals = fetch._get_window_intervals(
+                        MSID, msid, cond[3], cond[4], tstarts, tstops, tstart, tstop,
+                        complete_intervals, max_gap, dat=dat)
+                    results.append((cond, intervals))
+    finally:
+        fetch.set_units(units)
+
+    return results
+
+
+def main(args=None):
+    opt = get_options(args)
+    viols = scan_limits(opt.limits, opt.start, opt.stop, unit_system=opt.unit_system,
+                        processes=opt.processes, complete_intervals=opt.complete_intervals,
+                        max_gap=opt.max_gap)
+    if opt.outfile:
+        viols.write(opt.outfile, overwrite=True)
+    else:
+        viols.pprint(max_lines=-1, max_width=-1)
+
+
+if __name__ == '__main__':
+    main()
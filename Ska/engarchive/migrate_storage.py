@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+Rewrite the HDF5 files of an existing cheta archive in a different storage layout.
+
+Each content type is processed in turn, converting the full-resolution MSID files
+and the stats files of every stats level in place.  Every file is written to a
+temporary file and then atomically renamed, and files already in the target
+layout are skipped, so the migration can be interrupted and resumed at any time.
+Fetch reads files in any layout, so the archive remains usable throughout.
+
+This must not be run at the same time as the archive update processing.
+
+Example::
+
+  cheta_migrate_storage --data-root /proj/sot/ska/data/eng_archive --layout 2 \\
+      --content 'PCAD'
+"""
+import argparse
+import glob
+import logging
+import os
+import re
+
+import pyyaks.logger
+import pyyaks.context
+
+import Ska.engarchive.fetch as fetch
+import Ska.engarchive.file_defs as file_defs
+import Ska.engarchive.storage as storage
+from Ska.engarchive.utils import STATS_DT
+
+
+def get_options(args=None):
+    parser = argparse.ArgumentParser(
+        description='Rewrite cheta archive HDF5 files in a different storage layout')
+    parser.add_argument("--data-root",
+                        default=".",
+                        help="Engineering archive root directory for MSID files")
+    parser.add_argument("--layout",
+                        type=int,
+                        default=2,
+                        help="Target storage layout version (default=2)")
+    parser.add_argument("--content",
+                        action='append',
+                        help="Content type to process [match regex] (default = all)")
+    parser.add_argument("--dry-run",
+                        action="store_true",
+                        help="Dry run (no actual file updates)")
+    parser.add_argument("--log-level",
+                        type=int,
+                        default=logging.INFO,
+                        help="Logging level")
+    return parser.parse_args(args)
+
+
+def migrate_content(content, msid_files, opt, logger):
+    """
+    Migrate all full-resolution and stats files for ``content`` to ``opt.layout``.
+
+    :returns: tuple (number of files migrated, number of files checked)
+    """
+    ft = fetch.ft
+    ft['content'] = content
+
+    filenames = sorted(glob.glob(os.path.join(msid_files['contentdir'].abs, '*.h5')))
+    for interval in STATS_DT:
+        ft['interval'] = interval
+        filenames.extend(sorted(glob.glob(os.path.join(msid_files['statsdir'].abs, '*.h5'))))
+
+    n_migrated = 0
+    for filename in filenames:
+        if storage.migrate_file(filename, opt.layout, dry_run=opt.dry_run):
+            logger.verbose('Migrated {} to layout {}'.format(filename, opt.layout))
+            n_migrated += 1
+
+    return n_migrated, len(filenames)
+
+
+def main(args=None):
+    opt = get_options(args)
+
+    logger = pyyaks.logger.get_logger(name='cheta_migrate_storage', level=opt.log_level,
+                                      format="%(asctime)s %(message)s")
+
+    msid_files = pyyaks.context.ContextDict('migrate_storage.msid_files',
+                                            basedir=opt.data_root)
+    msid_files.update(file_defs.msid_files)
+
+    contents = [filetype.content for filetype in fetch.filetypes]
+    if opt.content:
+        contents = [x for x in contents
+                    if any(re.match(y.upper(), x) for y in opt.content)]
+
+    for content in contents:
+        content = content.lower()
+        logger.info('Processing {} content type'.format(content))
+        n_migrated, n_files = migrate_content(content, msid_files, opt, logger)
+        logger.info('  Migrated {} of {} files to layout {}'
+                    .format(n_migrated, n_files, opt.layout))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,10 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 from __future__ import print_function, division, absolute_import
 
+import collections
+import concurrent.futures
+import weakref
+
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.dates import num2epoch, epoch2num
@@ -9,25 +13,167 @@ from Ska.Matplotlib import plot_cxctime
 from Chandra.Time import DateTime
 
 from . import __version__  # noqa
+from .utils import STATS_DT, DEFAULT_STATS
 
 MIN_TSTART_UNIX = DateTime('1999:100').unix
 MAX_TSTOP_UNIX = DateTime().unix + 1e7
 
+# Maximum number of fetched windows kept by each MsidPlot
+WINDOW_CACHE_SIZE = 8
+
+# Full-resolution data with more than this many points per pixel are reduced
+# to the min and max within each pixel before plotting
+DECIMATE_POINTS_PER_PIX = 4
+
+# Active MsidPlot of each figure, which is closed when a new MsidPlot replaces it
+_figure_plots = weakref.WeakKeyDictionary()
+
 
-def get_stat(t0, t1, npix):
+def get_stat(t0, t1, npix, stats=None):
+    """
+    Get the stat for plotting ``t0`` to ``t1`` over ``npix`` pixels.
+
+    This is the finest resolution (full resolution or one of ``stats``) for
+    which the next coarser stats level would have more points than pixels.
+
+    :param t0: start time
+    :param t1: stop time
+    :param npix: number of pixels
+    :param stats: available stats levels (default=utils.DEFAULT_STATS)
+    :returns: stat (None for full resolution)
+    """
     t0 = DateTime(t0)
     t1 = DateTime(t1)
-    dt_days = t1 - t0
-
-    if dt_days > npix:
-        stat = 'daily'
-    elif dt_days * (24 * 60 / 5) > npix:
-        stat = '5min'
-    else:
-        stat = None
+    dt_secs = (t1 - t0) * 86400
+
+    stat = None
+    for next_stat in sorted(stats or DEFAULT_STATS, key=STATS_DT.get):
+        if dt_secs / STATS_DT[next_stat] <= npix:
+            break
+        stat = next_stat
     return stat
 
 
+def get_minmax_indexes(times, vals, dt):
+    """
+    Get the indexes of the first, last, min and max of ``vals`` within each
+    ``dt`` bin of ``times``.  When each bin is one pixel wide this preserves
+    the plotted envelope of the data, including the lines across data gaps.
+
+    :param times: sorted array of times
+    :param vals: array of numeric values
+    :param dt: bin width (same units as ``times``)
+    :returns: sorted array of indexes
+    """
+    if len(times) == 0:
+        return np.arange(0)
+
+    bins = np.floor((times - times[0]) / dt).astype(np.int64)
+    i_starts = np.flatnonzero(np.diff(bins, prepend=-1))
+    i_stops = np.append(i_starts[1:], len(vals))
+    i_bins = np.repeat(np.arange(len(i_starts)), i_stops - i_starts)
+
+    indexes = [i_starts, i_stops - 1]
+    for reduce_func in (np.fmin, np.fmax):
+        bin_vals = reduce_func.reduceat(vals, i_starts)
+        i_match = np.flatnonzero(vals == bin_vals[i_bins])
+        # First matching index within each bin
+        i_first = np.flatnonzero(np.diff(i_bins[i_match], prepend=-1))
+        indexes.append(i_match[i_first])
+
+    return np.unique(np.concatenate(indexes))
+
+
+def get_lttb_indexes(times, vals, n_out):
+    """
+    Get the indexes of ``n_out`` points of ``vals`` selected with the Largest
+    Triangle Three Buckets algorithm, which keeps the visually significant
+    points of a line plot.  The first and last points are always kept.
+
+    :param times: sorted array of times
+    :param vals: array of numeric values
+    :param n_out: number of points to select (at least 3)
+    :returns: sorted array of indexes
+    """
+    n_vals = len(vals)
+    if n_out >= n_vals or n_out < 3:
+        return np.arange(n_vals)
+
+    times = np.asarray(times, dtype=np.float64)
+    vals = np.asarray(vals, dtype=np.float64)
+
+    # Bucket boundaries for the points between the first and last
+    edges = (1 + np.arange(n_out - 1) * (n_vals - 2) / (n_out - 2)).astype(np.int64)
+    indexes = np.zeros(n_out, dtype=np.int64)
+    indexes[-1] = n_vals - 1
+    i_prev = 0
+    for i_bucket in range(n_out - 2):
+        i0, i1 = edges[i_bucket], edges[i_bucket + 1]
+        # Average of the next bucket (or the last point for the final bucket)
+        i2 = edges[i_bucket + 2] if i_bucket + 2 < len(edges) else n_vals
+        t_next = times[i1:i2].mean()
+        v_next = vals[i1:i2].mean()
+        # Point in this bucket making the largest triangle with the previous
+        # selected point and the next bucket average
+        areas = np.abs((times[i_prev] - t_next) * (vals[i0:i1] - vals[i_prev])
+                       - (times[i_prev] - times[i0:i1]) * (v_next - vals[i_prev]))
+        i_prev = i0 + np.argmax(areas)
+        indexes[i_bucket + 1] = i_prev
+
+    return indexes
+
+
+def get_decimated_indexes(times, vals, max_points, method='minmax', state_codes=None):
+    """
+    Get the indexes of at most about ``max_points`` samples of ``vals`` that give
+    the same plot as all the values at a resolution of about ``max_points / 4``
+    pixels.
+
+    For state-valued data (``state_codes`` supplied, with ``vals`` the raw
+    values, or string ``vals``) the samples on each side of every state change
+    are kept so that the plot shows the steps exactly, and only if there are
+    still too many points are these decimated with ``method``.
+
+    :param times: sorted array of times
+    :param vals: array of numeric or string values
+    :param max_points: maximum number of points
+    :param method: decimation method, 'minmax' (first, last, min and max in each
+        time bin) or 'lttb' (Largest Triangle Three Buckets)
+    :param state_codes: state codes for state-valued data (default=None)
+    :returns: sorted array of indexes
+    """
+    if method not in ('minmax', 'lttb'):
+        raise ValueError("decimate method {!r} is not in allowed values "
+                         "('minmax', 'lttb')".format(method))
+
+    n_vals = len(vals)
+    if n_vals <= max_points:
+        return np.arange(n_vals)
+
+    is_string = vals.dtype.kind in 'SU'
+    if is_string:
+        # Decimate the integer codes of string states (no min / max for strings)
+        vals = np.unique(vals, return_inverse=True)[1]
+
+    if state_codes or is_string:
+        i_change = np.flatnonzero(vals[1:] != vals[:-1])
+        indexes = np.unique(np.concatenate([[0, n_vals - 1], i_change, i_change + 1]))
+        if len(indexes) <= max_points:
+            return indexes
+        return indexes[get_decimated_indexes(times[indexes], vals[indexes], max_points,
+                                             method)]
+
+    if method == 'lttb':
+        return get_lttb_indexes(times, vals, max_points)
+
+    n_bins = max(1, max_points // DECIMATE_POINTS_PER_PIX)
+    dt = (times[-1] - times[0]) / n_bins
+    if dt <= 0:
+        return np.arange(n_vals)
+    # Bins a little wider than the data span / n_bins so there are n_bins bins
+    return get_minmax_indexes(times, vals, dt * (1 + 1e-9))
+
+
 class MsidPlot(object):
     """Make an interactive plot for exploring the MSID data.
 
@@ -35,8 +181,9 @@ class MsidPlot(object):
     and plots the MSID ``vals`` versus ``times``.  This plot can be
     panned or zoomed arbitrarily and the data values will be fetched
     from the archive as needed.  Depending on the time scale, ``iplot``
-    will display either full resolution, 5-minute, or daily values.
-    For 5-minute and daily values the min and max values are also
+    will display either full resolution, 5-minute, or daily values, or
+    values from other stats levels that are available for the MSID (e.g.
+    hourly or weekly).  For stats values the min and max values are also
     plotted.
 
     Once the plot is displayed and the window is selected by clicking in
@@ -56,6 +203,15 @@ class MsidPlot(object):
       dat = fetch.Msid('aoattqt1', '2011:001', '2012:001', stat='5min')
       iplot = Ska.engarchive.MsidPlot(dat)
 
+    To keep panning and zooming responsive, the data for the windows to the
+    left and right of the current view and one zoom level in and out are
+    fetched in a background thread after each redraw, and the most recently
+    used windows are cached (``WINDOW_CACHE_SIZE``).  Full-resolution data
+    with many points per pixel are reduced to the min and max in each pixel.
+    Fetches are serialized with other fetches (see ``fetch._fetch_lock``), and
+    the background thread is stopped by ``close()``, which is called when the
+    figure is closed or a new ``MsidPlot`` is made in the same figure.
+
     Caveat: the ``MsidPlot()`` class is not meant for use within scripts, and
     may give unexpected results if used in combination with other plotting
     commands directed at the same plot figure.
@@ -63,12 +219,17 @@ class MsidPlot(object):
     :param msid: MSID object
     :param fmt: plot format for values (default="-b")
     :param fmt_minmax: plot format for mins and maxes (default="-c")
+    :param prefetch: fetch adjacent windows in the background (default=True)
     :param plot_kwargs: additional plotting keyword args
 
     """
 
-    def __init__(self, msid, fmt='-b', fmt_minmax='-c', **plot_kwargs):
+    def __init__(self, msid, fmt='-b', fmt_minmax='-c', prefetch=True, **plot_kwargs):
         self.fig = plt.gcf()
+        old_plot = _figure_plots.get(self.fig)
+        if old_plot is not None:
+            old_plot.close()
+        _figure_plots[self.fig] = self
         self.fig.clf()
         self.ax = self.fig.gca()
         self.zoom = 4.0
@@ -82,18 +243,49 @@ class MsidPlot(object):
         self.tstart = self.msid.times[0]
         self.tstop = self.msid.times[-1]
         self.scaley = True
+        self.stats = self.fetch.get_available_stats(self.msidname)
+
+        # Fetched windows as {(stat, tstart, tstop): Future of Msid} in order of
+        # use.  All fetches run in one worker thread so that they never overlap.
+        self._windows = collections.OrderedDict()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.prefetch = prefetch
+        future = concurrent.futures.Future()
+        future.set_result(self.msid)
+        self._windows[self.msid.stat, self.msid.tstart, self.msid.tstop] = future
 
         # Make sure MSID is sampled at the correct density for initial plot
-        stat = get_stat(self.tstart, self.tstop, self.npix)
+        stat = get_stat(self.tstart, self.tstop, self.npix, self.stats)
         if stat != self.msid.stat:
-            self.msid = self.fetch.Msid(self.msidname, self.tstart, self.tstop,
-                                        stat=stat)
+            self.msid = self._get_msid(stat, self.tstart, self.tstop, pad=False)
 
         self.ax.set_autoscale_on(True)
         self.draw_plot()
         self.ax.set_autoscale_on(False)
         plt.grid()
-        self.fig.canvas.mpl_connect('key_press_event', self.key_press)
+        canvas = self.fig.canvas
+        self._canvas_cids = [canvas.mpl_connect('key_press_event', self.key_press),
+                             canvas.mpl_connect('close_event', self.close)]
+
+    def close(self, event=None):
+        """
+        Stop the interactive plot updates and the background fetches, cancelling
+        pending fetches.  This is called when the figure is closed (``event`` is
+        the matplotlib close event) or a new ``MsidPlot`` replaces this one.
+        """
+        self.prefetch = False
+        for cid in self._canvas_cids:
+            self.fig.canvas.mpl_disconnect(cid)
+        self._canvas_cids = []
+        try:
+            self.ax.callbacks.disconnect(self.xlim_callback)
+        except AttributeError:
+            pass
+        for window in self._windows.values():
+            window.cancel()
+        self._executor.shutdown(wait=False)
+        if _figure_plots.get(self.fig) is self:
+            del _figure_plots[self.fig]
 
     @property
     def npix(self):
@@ -150,18 +342,78 @@ Interactive MSID plot keys:
         x0, x1 = self.ax.get_xlim()
         self.tstart = DateTime(num2epoch(x0), format='unix').secs
         self.tstop = DateTime(num2epoch(x1), format='unix').secs
-        stat = get_stat(self.tstart, self.tstop, self.npix)
+        stat = get_stat(self.tstart, self.tstop, self.npix, self.stats)
 
         if (self.tstart < self.msid.tstart or
             self.tstop > self.msid.tstop or
                 stat != self.msid.stat):
-            dt = self.tstop - self.tstart
-            self.tstart -= dt / 4
-            self.tstop += dt / 4
-            self.msid = self.fetch.Msid(self.msidname, self.tstart, self.tstop,
-                                        stat=stat)
+            self.msid = self._get_msid(stat, self.tstart, self.tstop)
         self.draw_plot()
 
+    def _fetch_window(self, stat, tstart, tstop):
+        """Start fetching the window ``tstart`` to ``tstop`` at ``stat``"""
+        key = (stat, tstart, tstop)
+        future = self._executor.submit(self.fetch.Msid, self.msidname, tstart, tstop,
+                                       stat=stat)
+        self._windows[key] = future
+        while len(self._windows) > WINDOW_CACHE_SIZE:
+            self._windows.popitem(last=False)
+        return future
+
+    def _find_window(self, stat, tstart, tstop):
+        """Find a fetched (or pending) window at ``stat`` covering ``tstart`` to ``tstop``"""
+        for key in reversed(self._windows):
+            if key[0] == stat and key[1] <= tstart and key[2] >= tstop:
+                self._windows.move_to_end(key)
+                return self._windows[key]
+        return None
+
+    def _get_window(self, stat, tstart, tstop, pad=True):
+        """Get the window (fetched or pending) for viewing ``tstart`` to ``tstop``"""
+        window = self._find_window(stat, tstart, tstop)
+        if (window is None or window.cancelled()
+                or (window.done() and window.exception() is not None)):
+            if pad:
+                dt = tstop - tstart
+                tstart -= dt / 4
+                tstop += dt / 4
+            window = self._fetch_window(stat, tstart, tstop)
+        return window
+
+    def _get_msid(self, stat, tstart, tstop, pad=True):
+        """
+        Get the MSID at ``stat`` for viewing ``tstart`` to ``tstop``, from the
+        cache of fetched windows if possible, otherwise fetching a window that
+        is padded by a quarter of the view on each side.
+        """
+        return self._get_window(stat, tstart, tstop, pad).result()
+
+    def _prefetch(self):
+        """
+        Queue background fetches of the windows for panning the current view
+        left and right and zooming in and out, replacing any pending prefetches
+        that have not started.
+        """
+        for key, window in list(self._windows.items()):
+            if window.cancel():
+                del self._windows[key]
+
+        tstart, tstop = self.tstart, self.tstop
+        dt = tstop - tstart
+        tmid = (tstart + tstop) / 2
+        views = [(tstart - dt, tstart),
+                 (tstop, tstop + dt),
+                 (tmid - dt * self.zoom / 2, tmid + dt * self.zoom / 2),
+                 (tmid - dt / self.zoom / 2, tmid + dt / self.zoom / 2)]
+        tmin = DateTime(MIN_TSTART_UNIX, format='unix').secs
+        tmax = DateTime(MAX_TSTOP_UNIX, format='unix').secs
+        for view_tstart, view_tstop in views:
+            view_tstart, view_tstop = max(view_tstart, tmin), min(view_tstop, tmax)
+            if view_tstop <= view_tstart:
+                continue
+            stat = get_stat(view_tstart, view_tstop, self.npix, self.stats)
+            self._get_window(stat, view_tstart, view_tstop)
+
     def draw_plot(self):
         msid = self.msid
         for _ in range(len(self.ax.lines)):
@@ -191,7 +443,15 @@ Interactive MSID plot keys:
                 ymax = np.max(msid.maxes[ok])
 
         vals = msid.raw_vals if msid.state_codes else msid.vals
-        plot_cxctime(msid.times, vals, self.fmt,
+        times, plotvals = msid.times, vals
+        npix = self.npix
+        if msid.stat is None and len(times) > DECIMATE_POINTS_PER_PIX * npix:
+            if vals.dtype.kind in 'SU':
+                i_plot = get_decimated_indexes(times, vals, DECIMATE_POINTS_PER_PIX * npix)
+            else:
+                i_plot = get_minmax_indexes(times, vals, (self.tstop - self.tstart) / npix)
+            times, plotvals = times[i_plot], vals[i_plot]
+        plot_cxctime(times, plotvals, self.fmt,
                      ax=self.ax, fig=self.fig,
                      state_codes=msid.state_codes, **self.plot_kwargs)
 
@@ -215,3 +475,6 @@ Interactive MSID plot keys:
 
         self.xlim_callback = self.ax.callbacks.connect('xlim_changed',
                                                        self.xlim_changed)
+
+        if self.prefetch:
+            self._prefetch()
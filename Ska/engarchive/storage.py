@@ -0,0 +1,178 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+Storage layout definitions for the HDF5 files in the cheta archive.
+
+A storage layout defines the compression filter and chunk size used for the
+full-resolution MSID files (``data`` and ``quality`` earrays) and the 5min /
+daily stats files (``data`` table).  The layout version is recorded as an
+attribute of the root node when a file is created.  Files without this
+attribute use layout 1, which is the original zlib layout.
+
+======  ==========  ====================================================
+Layout  Compressor  Notes
+======  ==========  ====================================================
+1       zlib        Original layout, PyTables default chunks (default)
+2       blosc:lz4   Shuffle filter, ~64 KiB chunks (fast decode)
+3       blosc:zstd  Shuffle filter, ~64 KiB chunks (better compression)
+======  ==========  ====================================================
+
+Reading is transparent since PyTables applies the filters defined for each
+node, so fetch can read an archive containing any mix of layouts.  Existing
+files are converted to a new layout with ``cheta_migrate_storage``.
+"""
+import os
+
+import numpy as np
+import tables
+
+# Name of root node attribute that records the storage layout version
+LAYOUT_ATTR = 'cheta_layout'
+
+# Storage layout definitions.  A ``chunk_bytes`` value of None means use the
+# PyTables default chunkshape for the ``expectedrows`` of the node.
+LAYOUTS = {
+    1: {'complib': 'zlib', 'complevel': 5, 'shuffle': True, 'chunk_bytes': None},
+    2: {'complib': 'blosc:lz4', 'complevel': 5, 'shuffle': True, 'chunk_bytes': 2 ** 16},
+    3: {'complib': 'blosc:zstd', 'complevel': 5, 'shuffle': True, 'chunk_bytes': 2 ** 16},
+}
+
+# Layout for newly created files
+DEFAULT_LAYOUT = 1
+
+
+def _get_layout_def(layout):
+    layout = DEFAULT_LAYOUT if layout is None else int(layout)
+    try:
+        return LAYOUTS[layout]
+    except KeyError:
+        raise ValueError('storage layout {} is not in allowed values {}'
+                         .format(layout, sorted(LAYOUTS)))
+
+
+def get_filters(layout=None):
+    """
+    Get the PyTables filters for storage ``layout``.
+
+    :param layout: layout version (default=DEFAULT_LAYOUT)
+    :returns: tables.Filters
+    """
+    layout_def = _get_layout_def(layout)
+    return tables.Filters(complevel=layout_def['complevel'],
+                          complib=layout_def['complib'],
+                          shuffle=layout_def['shuffle'])
+
+
+def get_chunkshape(layout, dtype, shape=(0,)):
+    """
+    Get the chunkshape for a node with row ``dtype`` and ``shape`` in storage
+    ``layout``.  The first axis is the extendable (row) axis.
+
+    :param layout: layout version (None => DEFAULT_LAYOUT)
+    :param dtype: numpy dtype of one element (or one row for a table)
+    :param shape: node shape, where shape[0] is the row axis (default=(0,))
+    :returns: chunkshape tuple or None for the PyTables default
+    """
+    chunk_bytes = _get_layout_def(layout)['chunk_bytes']
+    if chunk_bytes is None:
+        return None
+
+    row_bytes = np.dtype(dtype).itemsize * int(np.prod(shape[1:], dtype=np.int64))
+    n_rows = max(1, chunk_bytes // max(1, row_bytes))
+    return (n_rows,) + tuple(shape[1:])
+
+
+def get_layout(h5):
+    """
+    Get the storage layout version of the open HDF5 file ``h5``.
+
+    :param h5: tables.File object
+    :returns: int layout version
+    """
+    return int(getattr(h5.root._v_attrs, LAYOUT_ATTR, 1))
+
+
+def set_layout(h5, layout=None):
+    """
+    Record storage ``layout`` in the root attributes of the open HDF5 file ``h5``.
+
+    :param h5: tables.File object (writeable)
+    :param layout: layout version (default=DEFAULT_LAYOUT)
+    """
+    layout = DEFAULT_LAYOUT if layout is None else int(layout)
+    h5.root._v_attrs[LAYOUT_ATTR] = layout
+
+
+def create_msid_file(filename, colname, h5type, h5shape, n_rows, layout=None):
+    """
+    Create a new full-resolution MSID file with empty ``data`` and ``quality``
+    earrays using storage ``layout``.
+
+    :param filename: output file name
+    :param colname: column (MSID) name, used as title of ``data``
+    :param h5type: tables.Atom for ``data``
+    :param h5shape: shape of ``data`` where the first axis has length 0
+    :param n_rows: expected number of rows
+    :param layout: layout version (default=DEFAULT_LAYOUT)
+    """
+    h5 = tables.open_file(filename, mode='w', filters=get_filters(layout))
+    h5.create_earray(h5.root, 'data', h5type, h5shape, title=colname,
+                     expectedrows=n_rows,
+                     chunkshape=get_chunkshape(layout, h5type.dtype, h5shape))
+    h5.create_earray(h5.root, 'quality', tables.BoolAtom(), (0,), title='Quality',
+                     expectedrows=n_rows,
+                     chunkshape=get_chunkshape(layout, np.bool_))
+    set_layout(h5, layout)
+    h5.close()
+
+
+def create_stats_table(h5, vals_stats, title, expectedrows, layout=None):
+    """
+    Create the stats ``data`` table in the open HDF5 file ``h5`` from the
+    initial rows ``vals_stats`` using storage ``layout``.
+
+    :param h5: tables.File object (writeable)
+    :param vals_stats: structured array of initial stats rows
+    :param title: table title
+    :param expectedrows: expected number of rows
+    :param layout: layout version (default=DEFAULT_LAYOUT)
+    """
+    h5.create_table(h5.root, 'data', vals_stats, title, expectedrows=expectedrows,
+                    filters=get_filters(layout),
+                    chunkshape=get_chunkshape(layout, vals_stats.dtype))
+    set_layout(h5, layout)
+
+
+def migrate_file(filename, layout, dry_run=False):
+    """
+    Rewrite the HDF5 file ``filename`` in storage ``layout``.
+
+    All leaf nodes in the root group are copied with the new filters and
+    chunkshape to a temporary file in the same directory, which then
+    atomically replaces the original.  A file that is already in ``layout``
+    is left unchanged, so an interrupted migration can simply be re-run.
+
+    :param filename: HDF5 file name
+    :param layout: target layout version
+    :param dry_run: do not write anything
+    :returns: True if the file was (or would be) migrated, else False
+    """
+    with tables.open_file(filename, mode='r') as h5:
+        if get_layout(h5) == layout:
+            return False
+        if dry_run:
+            return True
+
+        tmp_filename = filename + '.tmp'
+        with tables.open_file(tmp_filename, mode='w') as h5_out:
+            for node in h5.root._f_iter_nodes():
+                shape = (0,) + node.shape[1:]
+                dtype = (node.dtype if isinstance(node, tables.Table)
+                         else node.atom.dtype)
+                chunkshape = get_chunkshape(layout, dtype, shape) or 'auto'
+                node.copy(h5_out.root, node.name,
+                          filters=get_filters(layout), chunkshape=chunkshape)
+            h5.root._v_attrs._f_copy(h5_out.root)
+            set_layout(h5_out, layout)
+
+    os.replace(tmp_filename, filename)
+    return True
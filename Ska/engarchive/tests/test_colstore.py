@@ -0,0 +1,108 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""Test the memory-mapped column store mirror of MSID files."""
+
+import os
+
+import numpy as np
+import tables
+
+from .. import colstore
+
+
+def make_msid_file(filename, vals):
+    with tables.open_file(filename, mode='w') as h5:
+        h5.create_earray(h5.root, 'data', tables.Atom.from_dtype(vals.dtype), (0,))
+        h5.create_earray(h5.root, 'quality', tables.BoolAtom(), (0,))
+        append_msid_file(filename, vals, h5)
+
+
+def append_msid_file(filename, vals, h5=None):
+    if h5 is None:
+        with tables.open_file(filename, mode='a') as h5:
+            return append_msid_file(filename, vals, h5)
+    h5.root.data.append(vals)
+    h5.root.quality.append(np.arange(len(vals)) % 3 == 0)
+
+
+def test_sync_and_read(tmpdir, monkeypatch):
+    monkeypatch.setattr(colstore, 'SYNC_CHUNK_ROWS', 7)
+    contentdir = str(tmpdir)
+    colstore_dir = str(tmpdir.join('colstore'))
+    make_msid_file(str(tmpdir.join('TIME.h5')), np.arange(100, dtype=np.float64))
+    make_msid_file(str(tmpdir.join('AOPCADMD.h5')), np.array(['NPNT', 'NMAN'] * 50, dtype='S4'))
+
+    assert not colstore.is_enabled(colstore_dir)
+    colstore.enable(colstore_dir)
+    n_rows = colstore.sync_content(contentdir, colstore_dir, ['TIME', 'AOPCADMD', 'MISSING'])
+    assert n_rows == {'TIME': 100, 'AOPCADMD': 100}
+
+    # Append rows to one column only
+    append_msid_file(str(tmpdir.join('TIME.h5')), np.arange(100, 150, dtype=np.float64))
+    n_rows = colstore.sync_content(contentdir, colstore_dir, ['TIME', 'AOPCADMD'])
+    assert n_rows == {'TIME': 150, 'AOPCADMD': 100}
+
+    times, quals = colstore.read_column(colstore_dir, 'time', slice(90, 150))
+    assert np.all(times == np.arange(90, 150))
+    assert np.all(quals == (np.concatenate([np.arange(90, 100), np.arange(50)]) % 3 == 0))
+
+    # Arrays are copy-on-write so the mirror file is unchanged
+    times[0] = -1
+    assert np.load(colstore.get_filenames(colstore_dir, 'TIME')[0])[90] == 90
+
+    # Rows not yet in the mirror
+    assert colstore.read_column(colstore_dir, 'AOPCADMD', slice(90, 101)) is None
+    vals, quals = colstore.read_column(colstore_dir, 'AOPCADMD', slice(0, 4))
+    assert vals.tolist() == [b'NPNT', b'NMAN', b'NPNT', b'NMAN']
+
+    # Archive truncation
+    with tables.open_file(str(tmpdir.join('TIME.h5')), mode='a') as h5:
+        h5.root.data.truncate(20)
+        h5.root.quality.truncate(20)
+    n_rows = colstore.sync_content(contentdir, colstore_dir, ['TIME'])
+    assert n_rows == {'TIME': 20, 'AOPCADMD': 100}
+    assert np.load(colstore.get_filenames(colstore_dir, 'TIME')[0]).shape == (20,)
+
+
+def test_sync_modified_quality(tmpdir):
+    """Quality set in place (e.g. archive file overlaps) is synced from rowstart"""
+    contentdir = str(tmpdir)
+    colstore_dir = str(tmpdir.join('colstore'))
+    make_msid_file(str(tmpdir.join('TIME.h5')), np.arange(100, dtype=np.float64))
+    colstore.enable(colstore_dir)
+    colstore.sync_content(contentdir, colstore_dir, ['TIME'])
+
+    with tables.open_file(str(tmpdir.join('TIME.h5')), mode='a') as h5:
+        h5.root.quality[80:100] = True
+    append_msid_file(str(tmpdir.join('TIME.h5')), np.arange(90, 120, dtype=np.float64))
+
+    # Only new rows are copied by default
+    colstore.sync_content(contentdir, colstore_dir, ['TIME'])
+    times, quals = colstore.read_column(colstore_dir, 'TIME', slice(80, 100))
+    assert not np.all(quals)
+
+    n_rows = colstore.sync_content(contentdir, colstore_dir, ['TIME'], rowstart=80)
+    assert n_rows == {'TIME': 130}
+    times, quals = colstore.read_column(colstore_dir, 'TIME', slice(80, 130))
+    assert np.all(quals[:20])
+    assert np.all(times[20:] == np.arange(90, 120))
+
+
+def test_set_npy_rows(tmpdir):
+    filename = str(tmpdir.join('x.npy'))
+    colstore.set_npy_rows(filename, 0, np.arange(5, dtype=np.int32))
+    colstore.set_npy_rows(filename, 3, np.arange(10, 12, dtype=np.int32))
+    assert np.load(filename).tolist() == [0, 1, 2, 10, 11]
+    assert colstore.get_npy_len(filename) == 5
+
+    # Append in place, so existing memory maps see the same file
+    mmap_vals = np.load(filename, mmap_mode='r')
+    inode = os.stat(filename).st_ino
+    colstore.set_npy_rows(filename, 5, np.arange(20, 22, dtype=np.int32))
+    assert np.load(filename).tolist() == [0, 1, 2, 10, 11, 20, 21]
+    assert os.stat(filename).st_ino == inode
+
+    # Shrink by replacing the file, so existing memory maps stay readable
+    colstore.set_npy_rows(filename, 2)
+    assert np.load(filename).tolist() == [0, 1]
+    assert os.stat(filename).st_ino != inode
+    assert mmap_vals.tolist() == [0, 1, 2, 10, 11]
@@ -397,6 +397,21 @@ def test_nonexistent_msids():
     assert "MSID 'asdfasdfasdfasdf' is not" in str(err.value)
 
 
+def test_msid_glob_index():
+    msids, MSIDs = fetch.msid_glob('aoattqt[1234]')
+    assert MSIDs == ['AOATTQT1', 'AOATTQT2', 'AOATTQT3', 'AOATTQT4']
+    assert msids == ['aoattqt1', 'aoattqt2', 'aoattqt3', 'aoattqt4']
+
+    assert fetch.msid_glob('dpa_pow*') == (['dp_dpa_power'], ['DP_DPA_POWER'])
+    assert fetch.msid_glob('*pcadmd') == (['aopcadmd'], ['AOPCADMD'])
+    assert fetch.msid_glob('TephIN') == (['TephIN'], ['TEPHIN'])
+
+    # Index is rebuilt after clearing and gives the same answer
+    fetch.clear_msid_index()
+    assert 'TEPHIN' in fetch.data_source.get_msids('cxc')
+    assert fetch.msid_glob('aoattqt[1234]')[1] == MSIDs
+
+
 def test_daily_state_bins():
     dat = fetch.Msid('aoacaseq', '2016:232:12:00:00', '2016:235:12:00:00', stat='daily')
     for attr, val in (('n_BRITs', [0, 136, 0]),
@@ -407,3 +422,246 @@ def test_daily_state_bins():
 
     dat = fetch.Msid('aoacaseq', '2016:234:12:00:00', '2016:234:12:30:00', stat='5min')
     assert np.all(dat.n_BRITs == [0, 0, 51, 17, 0, 0])
+
+
+@pytest.mark.parametrize('stat', ['5min', 'daily'])
+def test_stat_cols(stat):
+    dat = fetch.Msid('tephin', '2016:001', '2016:030', stat=stat)
+    dat_cols = fetch.Msid('tephin', '2016:001', '2016:030', stat=stat,
+                          stat_cols=['means', 'maxes'])
+    assert dat_cols.colnames == ['times', 'maxes', 'means']
+    assert not hasattr(dat_cols, 'mins')
+    for attr in dat_cols.colnames:
+        assert np.all(getattr(dat_cols, attr) == getattr(dat, attr))
+
+    dats = fetch.MSIDset(['tephin', 'aoacaseq'], '2016:232:12:00:00', '2016:235:12:00:00',
+                         stat='daily', stat_cols=['samples'])
+    assert dats['aoacaseq'].colnames == ['times', 'samples']
+    assert len(dats['tephin']) == 3
+
+
+def test_stat_cols_bad():
+    with pytest.raises(ValueError, match='not available'):
+        fetch.MSID('tephin', '2016:001', '2016:002', stat='5min', stat_cols=['stds'])
+
+    with pytest.raises(ValueError, match='only be specified for stat data'):
+        fetch.MSID('tephin', '2016:001', '2016:002', stat_cols=['means'])
+
+
+def test_select_stat():
+    assert fetch.select_stat('tephin', '2016:001', '2016:002', max_points=100000) is None
+    assert fetch.select_stat('tephin', '2016:001', '2016:030', max_points=10000) == '5min'
+    assert fetch.select_stat(['tephin', 'aopcadmd'], '2015:001', '2016:001',
+                             max_points=1000) == 'daily'
+    assert fetch.select_stat('tephin', '2016:001', '2016:002', target_dt=1000) == '5min'
+    assert fetch.select_stat('tephin', '2016:001', '2016:002', target_dt=10) is None
+
+    with pytest.raises(ValueError, match='exactly one'):
+        fetch.select_stat('tephin', '2016:001', '2016:002')
+
+
+def test_max_points_fetch():
+    dat = fetch.Msid('tephin', '2016:001', '2016:002', max_points=100000)
+    assert dat.stat is None
+    assert np.all(dat.mins == dat.vals)
+    assert np.all(dat.maxes == dat.vals)
+
+    dats = fetch.MSIDset(['tephin', 'tcylaft6'], '2015:001', '2016:001', max_points=1000)
+    for dat in dats.values():
+        assert dat.stat == 'daily'
+        assert len(dat) <= 1000
+
+    dats = fetch.Msidset(['tephin', 'tcylaft6'], '2016:001', '2016:002', target_dt=1000)
+    for dat in dats.values():
+        assert dat.stat == '5min'
+
+    with pytest.raises(ValueError, match='stat cannot be specified'):
+        fetch.MSID('tephin', '2016:001', '2016:002', stat='5min', max_points=100)
+
+
+def test_get_times_mask():
+    times = np.arange(10.0)
+    # Overlapping, unsorted intervals with points exactly on the boundaries
+    tstarts = np.array([6.0, 1.0, 2.5])
+    tstops = np.array([7.0, 3.0, 3.5])
+    ok = fetch._get_times_mask(times, tstarts, tstops, exclude=True)
+    assert np.all(times[ok] == [0, 4, 5, 8, 9])
+    ok = fetch._get_times_mask(times, tstarts, tstops, exclude=False)
+    assert np.all(times[ok] == [1, 2, 3, 6, 7])
+
+
+def test_msidset_remove_select_intervals():
+    intervals = [('2010:001:01:00:00', '2010:001:02:00:00'),
+                 ('2010:001:05:00:00', '2010:001:05:30:00')]
+    msids = ['aorate1', 'aorate2', 'tephin']
+    dats = fetch.MSIDset(msids, '2010:001', '2010:002')
+    dats.interpolate(dt=32.8)
+    removed = dats.remove_intervals(intervals, copy=True)
+    selected = dats.select_intervals(intervals, copy=True)
+    for msid in msids:
+        dat = dats[msid].remove_intervals(intervals, copy=True)
+        assert np.all(removed[msid].times == dat.times)
+        assert np.all(removed[msid].vals == dat.vals)
+        dat = dats[msid].select_intervals(intervals, copy=True)
+        assert np.all(selected[msid].times == dat.times)
+    assert len(removed['tephin']) + len(selected['tephin']) == len(dats['tephin'])
+
+
+def test_lazy_msid():
+    dat = fetch.Msid('aopcadmd', '2016:001', '2016:002')
+    dat_lazy = fetch.Msid('aopcadmd', '2016:001', '2016:002', lazy=True)
+    assert 'vals' not in dat_lazy.__dict__
+    assert 'lazy=True' in repr(dat_lazy)
+    assert dat_lazy.colnames == dat.colnames
+    for attr in dat.colnames:
+        assert np.all(getattr(dat_lazy, attr) == getattr(dat, attr))
+    assert 'lazy' not in repr(dat_lazy)
+
+
+def test_lazy_queued_ops():
+    intervals = [('2016:001:01:00:00', '2016:001:02:00:00')]
+    dat = fetch.MSID('aopcadmd', '2016:001', '2016:002')
+    dat.filter_bad()
+    dat.remove_intervals(intervals)
+
+    with fetch.lazy():
+        dats = fetch.MSIDset(['aopcadmd', 'tephin'], '2016:001', '2016:002')
+    dat_lazy = dats['aopcadmd']
+    dat_lazy.filter_bad()
+    dat_lazy.remove_intervals(intervals)
+    assert 'vals' not in dat_lazy.__dict__
+    assert 'vals' not in dats['tephin'].__dict__
+    assert np.all(dat_lazy.vals == dat.vals)
+    assert np.all(dat_lazy.times == dat.times)
+    assert fetch.LAZY is False
+
+
+def test_lazy_fetch_error(monkeypatch):
+    """A lazy MSID keeps its queued operations if fetching the data fails"""
+    intervals = [('2016:001:01:00:00', '2016:001:02:00:00')]
+    dat = fetch.MSID('aopcadmd', '2016:001', '2016:002')
+    dat.remove_intervals(intervals)
+
+    dat_lazy = fetch.MSID('aopcadmd', '2016:001', '2016:002', lazy=True)
+    dat_lazy.remove_intervals(intervals)
+
+    def fetch_data_error(self, *args):
+        self.times = np.array([1.0])
+        raise IOError('archive not available')
+
+    with monkeypatch.context() as m:
+        m.setattr(fetch.MSID, '_fetch_data', fetch_data_error)
+        with pytest.raises(IOError, match='archive not available'):
+            dat_lazy.vals
+    assert 'times' not in dat_lazy.__dict__
+    assert 'lazy=True' in repr(dat_lazy)
+
+    assert np.all(dat_lazy.vals == dat.vals)
+    assert np.all(dat_lazy.times == dat.times)
+
+
+def test_categorical_msid():
+    dat = fetch.Msid('aopcadmd', '2016:001', '2016:002')
+    dat_cat = fetch.Msid('aopcadmd', '2016:001', '2016:002', categorical=True)
+    assert 'codes' in dat_cat.colnames
+    assert 'vals' not in dat_cat.colnames
+    assert dat_cat.codes.dtype == np.uint8
+    assert dat_cat.dtype == dat.dtype
+    assert np.all(dat_cat.vals == dat.vals)
+    assert np.all(dat_cat.raw_vals == dat.raw_vals)
+
+    for op in ('==', '!='):
+        assert np.all(dat_cat.logical_intervals(op, 'NPNT')['tstart']
+                      == dat.logical_intervals(op, 'NPNT')['tstart'])
+    states = dat.state_intervals()
+    states_cat = dat_cat.state_intervals()
+    assert np.all(states_cat['val'] == states['val'])
+    assert np.all(states_cat['tstop'] == states['tstop'])
+
+    # Numeric MSIDs are unchanged
+    dat = fetch.Msid('tephin', '2016:001', '2016:002', categorical=True)
+    assert 'vals' in dat.colnames
+    assert dat.categories is None
+
+
+def test_write_formats(tmpdir):
+    import tables
+    import zipfile
+
+    dats = fetch.MSIDset(['tephin', 'aopcadmd'], '2016:001', '2016:001:01:00:00')
+
+    filename = str(tmpdir.join('dats.zip'))
+    dats.write_zip(filename)
+    with zipfile.ZipFile(filename) as zf:
+        assert zf.namelist() == ['tephin.csv', 'aopcadmd.csv']
+        lines = zf.read('aopcadmd.csv').decode().splitlines()
+    dat = dats['aopcadmd']
+    assert lines[0] == 'times,vals,bads,raw_vals'
+    assert lines[1:] == ['%s,%s,%s,%s' % x
+                         for x in zip(dat.times, dat.vals, dat.bads, dat.raw_vals)]
+
+    filename = str(tmpdir.join('dats.npz'))
+    dats.write_npz(filename)
+    with np.load(filename) as npz:
+        assert np.all(npz['tephin/vals'] == dats['tephin'].vals)
+        assert np.all(npz['aopcadmd/raw_vals'] == dat.raw_vals)
+
+    filename = str(tmpdir.join('dats.h5'))
+    dats.write_hdf5(filename)
+    with tables.open_file(filename) as h5:
+        assert np.all(h5.root.tephin.times[:] == dats['tephin'].times)
+        assert np.all(h5.root.aopcadmd.vals[:].astype('U') == dat.vals)
+        assert h5.root.tephin._v_attrs.unit == 'K'
+
+
+def test_write_parquet(tmpdir):
+    pq = pytest.importorskip('pyarrow.parquet')
+
+    # Mixed float32 numeric and state MSIDs
+    dats = fetch.MSIDset(['tephin', 'aopcadmd'], '2016:001', '2016:001:01:00:00')
+    filename = str(tmpdir.join('dats.parquet'))
+    dats.write_parquet(filename)
+    table = pq.read_table(filename)
+    assert len(table) == len(dats['tephin']) + len(dats['aopcadmd'])
+
+    cols = table.to_pydict()
+    tephin = np.array(cols['msid']) == 'tephin'
+    assert np.all(np.array(cols['times'])[tephin] == dats['tephin'].times)
+    assert np.allclose(np.array(cols['vals'], dtype=float)[tephin], dats['tephin'].vals)
+    assert np.array(cols['state_vals'])[~tephin].tolist() == dats['aopcadmd'].vals.tolist()
+
+
+def test_to_pandas():
+    pd = pytest.importorskip('pandas')
+
+    dats = fetch.MSIDset(['tephin', 'aopcadmd'], '2016:001', '2016:002', stat='5min')
+    df = dats.to_pandas()
+    assert df.index.names == ['msid', 'times']
+    assert np.all(df.loc['tephin']['maxes'].values == dats['tephin'].maxes)
+
+    dats.interpolate(dt=328.0)
+    df = dats.to_pandas()
+    assert np.all(df.index.values == dats.times)
+    assert np.all(df['tephin'].values == dats['tephin'].vals)
+    assert isinstance(df['aopcadmd'].dtype, pd.CategoricalDtype)
+    assert np.all(df['aopcadmd'].astype(str).values == dats['aopcadmd'].vals)
+
+
+def test_to_arrow():
+    pa_types = pytest.importorskip('pyarrow.types')
+
+    dat = fetch.Msid('aopcadmd', '2016:001', '2016:002')
+    table = dat.to_arrow()
+    assert table.column_names == ['times', 'vals']
+    assert table['vals'].to_pylist() == dat.vals.tolist()
+
+    dats = fetch.MSIDset(['tephin', 'aopcadmd'], '2016:001', '2016:002')
+    table = dats.to_arrow()
+    assert table.column_names[:2] == ['msid', 'times']
+    assert len(table) == len(dats['tephin']) + len(dats['aopcadmd'])
+    assert str(table.schema.field('vals').type) == 'double'
+    assert pa_types.is_dictionary(table.schema.field('state_vals').type)
+    n_tephin = len(dats['tephin'])
+    assert table['vals'][:n_tephin].to_pylist() == dats['tephin'].vals.astype(float).tolist()
+    assert table['vals'][n_tephin:].null_count == len(dats['aopcadmd'])
+    assert table['state_vals'][n_tephin:].to_pylist() == dats['aopcadmd'].vals.tolist()
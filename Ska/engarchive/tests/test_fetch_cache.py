@@ -0,0 +1,147 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""Test the persistent on-disk fetch result cache."""
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from .. import fetch, fetch_cache
+
+
+def test_disk_cache(tmpdir):
+    disk_cache = fetch_cache.DiskCache(str(tmpdir), max_bytes=1e6)
+    key = ('TEPHIN', 1000, 'eng', '/data')
+    assert disk_cache.get(key) is None
+
+    vals = np.array(['NPNT', 'NMAN'])
+    rows = np.zeros(2, dtype=[('index', np.int32), ('val', np.float32)])
+    disk_cache.put(key, {'vals': vals, 'rows': rows}, (10, 1e8), complete=True)
+    arrays, state, complete = disk_cache.get(key)
+    assert np.all(arrays['vals'] == vals)
+    assert arrays['rows'].dtype == rows.dtype
+    assert state == (10, 1e8)
+    assert complete is True
+    assert disk_cache.hits == 1 and disk_cache.misses == 1
+
+    # Existing entries are found by a new instance
+    disk_cache = fetch_cache.DiskCache(str(tmpdir), max_bytes=1e6)
+    assert disk_cache.n_bytes > 0
+    disk_cache.clear()
+    assert disk_cache.n_bytes == 0
+    assert disk_cache.get(key) is None
+
+
+def test_disk_cache_evict(tmpdir):
+    vals = np.arange(1000, dtype=np.float64)
+    disk_cache = fetch_cache.DiskCache(str(tmpdir), max_bytes=30000)
+    for ii in range(10):
+        disk_cache.put(('TEPHIN', ii), {'vals': vals}, (0, 0), complete=False)
+    assert disk_cache.n_bytes <= 30000
+    # The most recent entry is always kept
+    assert disk_cache.get(('TEPHIN', 9)) is not None
+    assert disk_cache.get(('TEPHIN', 0)) is None
+
+
+def test_enable_disable(tmpdir):
+    try:
+        disk_cache = fetch_cache.enable(str(tmpdir), max_bytes=1e6)
+        assert fetch_cache.disk_cache is disk_cache
+    finally:
+        fetch_cache.disable()
+    assert fetch_cache.disk_cache is None
+
+
+def test_add_modified_time(tmpdir):
+    filename = str(tmpdir.join('modified_times.dat'))
+    fetch_cache.add_modified_time(filename, 1e8)
+    fetch_cache.add_modified_time(filename, np.float64(2e8 + 0.1))
+    modified_times = fetch._get_modified_times_from_file(fetch._split_path(filename))
+    assert modified_times == [1e8, 2e8 + 0.1]
+
+
+def test_entry_valid():
+    entry = ({}, (100, 1e8, 1), True)
+    assert fetch._is_disk_cache_entry_valid(entry, (100, 1e8, 1), [5e7], 1e7)
+    # Appended data
+    assert fetch._is_disk_cache_entry_valid(entry, (200, 2e8, 1), [5e7], 1e7)
+    assert not fetch._is_disk_cache_entry_valid(({}, (100, 1e8, 1), False),
+                                                (200, 2e8, 1), [5e7], 1e7)
+    # Truncated
+    assert not fetch._is_disk_cache_entry_valid(entry, (50, 5e7, 1), [5e7], 1e7)
+    # Data modified in place after (valid) or before (invalid) the chunk end
+    assert fetch._is_disk_cache_entry_valid(entry, (200, 2e8, 2), [5e7, 1e7], 1e7)
+    assert not fetch._is_disk_cache_entry_valid(entry, (200, 2e8, 3), [5e7, 1e7, 9e6], 1e7)
+    # Modified times file replaced
+    assert not fetch._is_disk_cache_entry_valid(entry, (200, 2e8, 0), [], 1e7)
+
+
+def _get_fake_stat_data(archive):
+    def get_stat_data(filename, dt, tstart, tstop, colnames=None):
+        vals = archive['vals']
+        times = (np.arange(len(vals)) + 0.5) * dt
+        row0, row1 = np.searchsorted(times, [tstart, tstop])
+        rows = np.zeros(row1 - row0, dtype=[('index', np.int32), ('val', np.float64)])
+        rows['index'] = np.arange(row0, row1)
+        rows['val'] = vals[row0:row1]
+        state = (float(len(vals)), times[-1] if len(vals) else 0.0)
+        return times[row0:row1], rows, row0, row1, state
+
+    return get_stat_data
+
+
+def test_stat_rows_truncated(tmpdir, monkeypatch):
+    """Complete cached stats chunks are not reused after the stats file is truncated"""
+    dt = 328.0
+    archive = {'vals': np.arange(10000.0)}
+    get_stat_data = _get_fake_stat_data(archive)
+    monkeypatch.setattr(fetch, '_get_modified_times', lambda content: [])
+
+    msid = SimpleNamespace(MSID='TEPHIN', content='thm1eng', stat='5min', dt=dt,
+                           tstart=0.0, tstop=8000 * dt)
+    try:
+        fetch_cache.enable(str(tmpdir), max_bytes=1e7)
+        times, rows = fetch.MSID._get_stat_rows_disk_cached(msid, get_stat_data, None)
+        assert np.all(rows['val'] == np.arange(8000))
+
+        # Stats file truncated and partly rebuilt with different values
+        archive['vals'] = -np.arange(3000.0)
+        msid.tstop = 3000 * dt
+        times, rows = fetch.MSID._get_stat_rows_disk_cached(msid, get_stat_data, None)
+        assert np.all(rows['val'] == -np.arange(3000))
+    finally:
+        fetch_cache.disable()
+
+
+def test_stat_rows_modified(tmpdir, monkeypatch):
+    """Complete cached stats chunks are re-read where data were modified in place"""
+    dt = 328.0
+    archive = {'vals': np.arange(10000.0)}
+    get_fake_stat_data = _get_fake_stat_data(archive)
+    reads = []
+
+    def get_stat_data(filename, dt, tstart, tstop, colnames=None):
+        reads.append((tstart, tstop))
+        return get_fake_stat_data(filename, dt, tstart, tstop, colnames)
+
+    modified_times = []
+    monkeypatch.setattr(fetch, '_get_modified_times', lambda content: modified_times)
+
+    msid = SimpleNamespace(MSID='TEPHIN', content='thm1eng', stat='5min', dt=dt,
+                           tstart=0.0, tstop=8000 * dt)
+    try:
+        fetch_cache.enable(str(tmpdir), max_bytes=1e7)
+        fetch.MSID._get_stat_rows_disk_cached(msid, get_stat_data, None)
+
+        # Fix values in place starting at row 5000 (in the fifth 1024-row chunk)
+        archive['vals'] = archive['vals'].copy()
+        archive['vals'][5000:5010] = -1.0
+        modified_times.append(5000 * dt + 1.0)
+        del reads[:]
+        times, rows = fetch.MSID._get_stat_rows_disk_cached(msid, get_stat_data, None)
+        assert np.all(rows['val'][5000:5010] == -1.0)
+        assert np.all(rows['val'][:5000] == np.arange(5000))
+        # State read and then only the chunks from the modified one are re-read
+        assert [tstart for tstart, tstop in reads] == [0.0] + [ii * 1024 * dt
+                                                               for ii in range(4, 8)]
+    finally:
+        fetch_cache.disable()
@@ -205,6 +205,15 @@ def test_util_logical_intervals_gap():
     assert np.allclose(out['tstart'], [0.5])
     assert np.allclose(out['tstop'], [202.5])
 
+    # Several gaps and the structured array output without dates
+    times = np.array([1, 2, 3, 200, 201, 202, 400, 401, 700])
+    bools = np.ones(len(times), dtype=bool)
+    out = utils.logical_intervals(times, bools, complete_intervals=False, max_gap=10,
+                                  table=False)
+    assert out.dtype.names == ('duration', 'tstart', 'tstop')
+    assert np.allclose(out['tstart'], [0.5, 197.5, 397.5, 697.5])
+    assert np.allclose(out['tstop'], [5.5, 204.5, 403.5, 702.5])
+
 
 def test_msid_state_intervals():
     """
@@ -224,3 +233,46 @@ def test_msid_state_intervals():
 
     intervals = utils.state_intervals(dat.times, dat.vals)['datestart', 'datestop', 'val']
     assert intervals.pformat() == expected
+
+
+def test_fetch_intervals_single_pass():
+    """
+    Fetching many intervals in a single pass matches concatenating separate
+    fetches of each interval, including adjacent and widely separated intervals.
+    """
+    t0 = DateTime('2012:175:00:00:00').secs
+    intervals = [(t0 + i * 3000.0, t0 + i * 3000.0 + 1000.0) for i in range(20)]
+    intervals += [(t0 + 60000.0, t0 + 61000.0), (t0 + 61000.0, t0 + 62000.0),
+                  (t0 + 30 * 86400.0, t0 + 30 * 86400.0 + 1000.0)]
+    for msid in ('tephin', 'aopcadmd'):
+        dat = fetch.MSID(msid, intervals)
+        dats = [fetch.MSID(msid, tstart, tstop) for tstart, tstop in intervals]
+        for attr in ('vals', 'times', 'bads'):
+            assert np.all(getattr(dat, attr)
+                          == np.concatenate([getattr(x, attr) for x in dats]))
+
+
+def test_find_intervals():
+    """
+    The coarse-to-fine find_intervals() matches logical_intervals() on the full
+    resolution data, including for the state MSID fallback and a list of conditions.
+    """
+    start, stop = '2012:001:00:00:00', '2012:030:00:00:00'
+    dat = fetch.Msid('tephin', start, stop)
+    hi = np.percentile(dat.vals, 99)
+    lo = np.percentile(dat.vals, 1)
+    conditions = [('tephin', '>', hi), ('tephin', '<=', lo), ('aopcadmd', '==', 'NMAN')]
+    outs = fetch.find_intervals(conditions, start=start, stop=stop, table=False)
+    assert len(outs) == 3
+
+    for (msid, op, val), out in zip(conditions, outs):
+        exp = fetch.Msid(msid, start, stop).logical_intervals(op, val, table=False)
+        assert len(exp) > 0
+        for name in ('tstart', 'tstop', 'duration'):
+            assert np.all(out[name] == exp[name])
+
+    out = fetch.find_intervals('tephin', '>', hi, start, stop, complete_intervals=False,
+                               max_gap=300)
+    exp = dat.logical_intervals('>', hi, complete_intervals=False, max_gap=300)
+    assert np.all(out['datestart'] == exp['datestart'])
+    assert np.all(out['datestop'] == exp['datestop'])
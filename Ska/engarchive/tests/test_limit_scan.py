@@ -0,0 +1,43 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+import numpy as np
+
+from .. import fetch_eng, limit_scan
+
+START, STOP = '2012:001:00:00:00', '2012:010:00:00:00'
+
+
+def test_get_conditions():
+    limits = [{'msid': 'tephin', 'low': 20.0, 'high': 110.0},
+              {'msid': 'aopcadmd', 'low': None, 'high': None, 'state': 'NPNT'}]
+    conds = limit_scan.get_conditions(limits)
+    assert conds == [(0, 'tephin', 'low', '<', 20.0),
+                     (0, 'tephin', 'high', '>', 110.0),
+                     (1, 'aopcadmd', 'state', '!=', 'NPNT')]
+
+
+def test_scan_limits():
+    """
+    Scanning limits matches logical_intervals() on the full-resolution data for
+    each limit, both in this process and with a process pool.
+    """
+    tephin = fetch_eng.Msid('tephin', START, STOP)
+    pitch = fetch_eng.Msid('aosares1', START, STOP)
+    limits = [{'msid': 'tephin', 'low': np.percentile(tephin.vals, 2),
+               'high': np.percentile(tephin.vals, 98), 'state': None},
+              {'msid': 'aosares1', 'low': np.percentile(pitch.vals, 5), 'high': None,
+               'state': None},
+              {'msid': 'aopcadmd', 'low': None, 'high': None, 'state': 'NPNT'}]
+
+    viols = limit_scan.scan_limits(limits, START, STOP, processes=1)
+    viols_pool = limit_scan.scan_limits(limits, START, STOP, processes=2)
+    assert np.all(viols['tstart'] == viols_pool['tstart'])
+    assert np.all(viols['msid'] == viols_pool['msid'])
+
+    for irow, msid, limit, op, val in limit_scan.get_conditions(limits):
+        exp = fetch_eng.Msid(msid, START, STOP).logical_intervals(
+            op, val, complete_intervals=False)
+        assert len(exp) > 0
+        ok = (viols['row'] == irow) & (viols['limit'] == limit)
+        assert np.all(viols['msid'][ok] == msid.upper())
+        for name in ('datestart', 'datestop', 'duration', 'tstart', 'tstop'):
+            assert np.all(viols[name][ok] == exp[name])
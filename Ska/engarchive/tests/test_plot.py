@@ -0,0 +1,125 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+import numpy as np
+import pytest
+
+pytest.importorskip('matplotlib')
+pytest.importorskip('Ska.Matplotlib')
+
+from .. import plot  # noqa: E402
+
+
+def get_bins(times, dt):
+    return np.floor((times - times[0]) / dt).astype(np.int64)
+
+
+def test_minmax_indexes_envelope():
+    """Min, max, first and last of every bin are kept"""
+    rng = np.random.RandomState(0)
+    times = np.sort(rng.uniform(0, 1000, 20000))
+    vals = rng.normal(size=len(times)).cumsum()
+    dt = 10.0
+
+    idx = plot.get_minmax_indexes(times, vals, dt)
+    assert np.all(np.diff(idx) > 0)
+    assert idx[0] == 0
+    assert idx[-1] == len(times) - 1
+
+    bins = get_bins(times, dt)
+    for i_bin in np.unique(bins):
+        i_all = np.flatnonzero(bins == i_bin)
+        i_out = idx[bins[idx] == i_bin]
+        assert i_out[0] == i_all[0]
+        assert i_out[-1] == i_all[-1]
+        assert vals[i_out].min() == vals[i_all].min()
+        assert vals[i_out].max() == vals[i_all].max()
+        assert len(i_out) <= 4
+
+
+def test_minmax_indexes_gap():
+    """The samples on each side of a data gap are kept"""
+    times = np.concatenate([np.arange(0, 100, 0.1), np.arange(500, 600, 0.1)])
+    vals = np.sin(times)
+    idx = plot.get_minmax_indexes(times, vals, 7.0)
+    assert 999 in idx
+    assert 1000 in idx
+    assert len(idx) < len(times) / 10
+
+
+def test_minmax_indexes_small():
+    assert len(plot.get_minmax_indexes(np.array([]), np.array([]), 1.0)) == 0
+
+    times = np.arange(3.0)
+    vals = np.array([2.0, 1.0, 3.0])
+    assert plot.get_minmax_indexes(times, vals, 10.0).tolist() == [0, 1, 2]
+
+
+def test_lttb_indexes():
+    times = np.arange(1000.0)
+    vals = np.zeros(1000)
+    vals[345] = 10.0
+    vals[678] = -5.0
+
+    idx = plot.get_lttb_indexes(times, vals, 50)
+    assert len(idx) == 50
+    assert np.all(np.diff(idx) > 0)
+    assert idx[0] == 0
+    assert idx[-1] == 999
+    # Spikes are visually significant and kept
+    assert 345 in idx
+    assert 678 in idx
+
+    assert plot.get_lttb_indexes(times, vals, 1000).tolist() == list(range(1000))
+    assert plot.get_lttb_indexes(times, vals, 2).tolist() == list(range(1000))
+
+
+def test_decimated_indexes():
+    rng = np.random.RandomState(1)
+    times = np.cumsum(rng.uniform(0.5, 1.5, 100000))
+    vals = rng.normal(size=len(times)).cumsum()
+    max_points = 2000
+
+    for method in ('minmax', 'lttb'):
+        idx = plot.get_decimated_indexes(times, vals, max_points, method)
+        assert len(idx) <= max_points
+        assert np.all(np.diff(idx) > 0)
+        assert idx[0] == 0
+        assert idx[-1] == len(times) - 1
+
+    # minmax preserves the envelope in each of the max_points / 4 bins
+    idx = plot.get_decimated_indexes(times, vals, max_points)
+    assert vals[idx].min() == vals.min()
+    assert vals[idx].max() == vals.max()
+    bins = np.minimum(get_bins(times, (times[-1] - times[0]) / (max_points // 4)),
+                      max_points // 4 - 1)
+    for i_bin in (0, 123, max_points // 4 - 1):
+        assert vals[idx][bins[idx] == i_bin].max() == vals[bins == i_bin].max()
+        assert vals[idx][bins[idx] == i_bin].min() == vals[bins == i_bin].min()
+
+    assert plot.get_decimated_indexes(times[:10], vals[:10], 100).tolist() == list(range(10))
+    with pytest.raises(ValueError):
+        plot.get_decimated_indexes(times, vals, max_points, 'bogus')
+
+
+def test_decimated_indexes_state():
+    """Samples on each side of every state change are kept"""
+    times = np.arange(100000.0)
+    raw_vals = (times // 1000 % 3).astype(np.int16)
+    state_codes = [(0, 'NPNT'), (1, 'NMAN'), (2, 'NSUN')]
+    i_change = np.flatnonzero(np.diff(raw_vals))
+
+    idx = plot.get_decimated_indexes(times, raw_vals, 1000, state_codes=state_codes)
+    assert set(i_change) <= set(idx)
+    assert set(i_change + 1) <= set(idx)
+    assert idx[0] == 0
+    assert idx[-1] == len(times) - 1
+
+    # String values without state codes
+    vals = np.array(['NPNT', 'NMAN', 'NSUN'])[raw_vals]
+    assert np.all(plot.get_decimated_indexes(times, vals, 1000) == idx)
+
+    # Too many state changes are decimated further
+    vals = np.array(['NPNT', 'NMAN'])[np.arange(100000) % 2]
+    idx = plot.get_decimated_indexes(times, vals, 1000)
+    assert len(idx) <= 1000
+    assert idx[0] == 0
+    assert idx[-1] == len(times) - 1
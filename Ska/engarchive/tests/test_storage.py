@@ -0,0 +1,50 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""Test HDF5 storage layouts and migration between them."""
+
+import numpy as np
+import pytest
+import tables
+
+from .. import storage
+
+
+@pytest.mark.parametrize('layout', sorted(storage.LAYOUTS))
+def test_create_and_migrate_msid_file(tmpdir, layout):
+    filename = str(tmpdir.join('TEPHIN.h5'))
+    storage.create_msid_file(filename, 'TEPHIN', tables.Float32Atom(), (0,), 1e6)
+    vals = np.arange(100000, dtype=np.float32)
+    quals = vals % 7 == 0
+    with tables.open_file(filename, mode='a') as h5:
+        h5.root.data.append(vals)
+        h5.root.quality.append(quals)
+        assert storage.get_layout(h5) == storage.DEFAULT_LAYOUT
+
+    migrated = storage.migrate_file(filename, layout)
+    assert migrated is (layout != storage.DEFAULT_LAYOUT)
+    # Already in target layout so nothing to do
+    assert storage.migrate_file(filename, layout) is False
+
+    with tables.open_file(filename) as h5:
+        assert storage.get_layout(h5) == layout
+        assert h5.root.data.filters.complib == storage.LAYOUTS[layout]['complib']
+        assert h5.root.data.title == 'TEPHIN'
+        assert np.all(h5.root.data[:] == vals)
+        assert np.all(h5.root.quality[:] == quals)
+
+
+def test_create_stats_table(tmpdir):
+    filename = str(tmpdir.join('TEPHIN.h5'))
+    rows = np.zeros(10, dtype=[('index', np.int32), ('n', np.int32), ('val', np.float32)])
+    rows['index'] = np.arange(10)
+    with tables.open_file(filename, mode='w') as h5:
+        storage.create_stats_table(h5, rows, 'daily sampling', expectedrows=1e5, layout=2)
+
+    with tables.open_file(filename) as h5:
+        assert storage.get_layout(h5) == 2
+        assert h5.root.data.chunkshape == storage.get_chunkshape(2, rows.dtype)
+        assert np.all(h5.root.data.col('index') == rows['index'])
+
+
+def test_bad_layout():
+    with pytest.raises(ValueError):
+        storage.get_filters(99)
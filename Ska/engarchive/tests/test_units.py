@@ -109,3 +109,23 @@ def test_unit_name_value_types():
         for name, value in units.items():
             assert type(name) is str
             assert type(value) is str
+
+
+def test_convert_in_place():
+    units = Units('sci')
+    assert 'TEPHIN' in units.get_conversions()
+    assert 'AORATE1' not in units.get_conversions()
+
+    vals = np.array([273.15, 300.0], dtype=np.float32)
+    vals_copy = units.convert('TEPHIN', vals)
+    assert vals_copy is not vals
+    vals_in_place = units.convert('TEPHIN', vals, copy=False)
+    assert vals_in_place is vals
+    assert vals.dtype == np.float32
+    assert np.all(vals == vals_copy)
+
+    # Integer values cannot be converted in place
+    vals = np.array([32, 212])
+    assert np.allclose(Units('sci').convert('TEPHIN', vals, from_system='eng', copy=False),
+                       [0.0, 100.0])
+    assert np.all(vals == [32, 212])
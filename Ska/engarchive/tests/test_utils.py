@@ -1,7 +1,8 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 import numpy as np
+import pytest
 
-from ..utils import get_fetch_size
+from ..utils import get_fetch_size, get_stats_levels, STATS_LEVELS
 from .. import fetch
 
 
@@ -56,3 +57,58 @@ def test_get_fetch_size_accuracy():
     dat.interpolate(328.0 * 2)
     fetch_bytes = sum(getattr(dat, attr).nbytes for attr in dat.colnames)
     assert np.isclose(out_mb, fetch_bytes / 1e6, rtol=0.0, atol=0.01)
+
+
+def test_get_stats_levels():
+    assert get_stats_levels(['5min', 'daily']) == ['5min', 'daily']
+    assert get_stats_levels(['weekly']) == ['1min', 'hourly', 'weekly']
+    assert get_stats_levels(['hourly', '1min', 'weekly']) == ['1min', 'hourly', 'weekly']
+
+    # Each derived level is an integer multiple of its parent
+    for level in STATS_LEVELS.values():
+        if level['parent'] is not None:
+            assert level['dt'] % STATS_LEVELS[level['parent']]['dt'] == 0
+
+    with pytest.raises(ValueError):
+        get_stats_levels(['monthly'])
+
+
+def test_get_fetch_size_metadata():
+    """
+    Estimate comes from archive metadata and is close for a range without data gaps.
+    """
+    dat = fetch.MSID('tephin', '2010:001', '2010:060')
+    fetch_bytes = sum(getattr(dat, attr).nbytes for attr in dat.colnames)
+    fetch_mb, out_mb = get_fetch_size('tephin', '2010:001', '2010:060', fast=False)
+    assert np.isclose(fetch_mb, fetch_bytes / 1e6, rtol=0.02)
+
+    dtype, n_rows, index0, index1 = fetch.get_h5_meta('tephin', 'daily')
+    assert index1 - index0 + 1 >= n_rows
+    assert fetch.get_h5_meta('tephin')[2] is None
+
+
+def test_quat_transforms():
+    """Batched quaternion transforms match Quaternion.Quat"""
+    Quaternion = pytest.importorskip('Quaternion')
+    from ..utils import _quat_transforms
+
+    rng = np.random.RandomState(0)
+    qs = rng.normal(size=(20, 4))
+    qs /= np.sqrt(np.sum(qs ** 2, axis=1))[:, np.newaxis]
+    rmats = _quat_transforms(qs)
+    for q, rmat in zip(qs, rmats):
+        assert np.allclose(rmat, Quaternion.Quat(q).transform, rtol=0, atol=1e-12)
+
+
+def test_ss_vector():
+    """Body and ECI vectors are unit vectors related by the attitude"""
+    from ..utils import ss_vector, _quat_transforms
+
+    vec = ss_vector('2012:001', '2012:003', obj='Sun')
+    assert len(vec) > 500
+    body = np.column_stack([vec['body_x'], vec['body_y'], vec['body_z']])
+    eci = np.column_stack([vec['eci_x'], vec['eci_y'], vec['eci_z']])
+    qs = np.column_stack([vec['q1'], vec['q2'], vec['q3'], vec['q4']])
+    assert np.allclose(np.sum(body ** 2, axis=1), 1.0)
+    assert np.allclose(np.einsum('nij,nj->ni', _quat_transforms(qs), body), eci)
+    assert np.all(vec['distance'] > 1e8)
@@ -86,46 +86,62 @@ equiv_units = set([('AMP', 'A'),
 equiv_units.update((u2, u1) for u1, u2 in list(equiv_units))
 
 
-def F_to_C(vals, delta_val=False):
-    if delta_val:
-        return vals / 1.8
-    else:
-        return (vals - 32.0) / 1.8
-
+def _apply_steps(vals, steps, decimals=None, copy=True):
+    """
+    Apply the ``steps`` list of (ufunc, constant) elementwise operations to
+    ``vals`` in order and then round to ``decimals``.
 
-def C_to_F(vals, delta_val=False):
-    if delta_val:
-        return vals * 1.8
-    else:
-        return vals * 1.8 + 32
+    If ``copy`` is False and ``vals`` is a writeable float array then ``vals`` is
+    modified in place.  Otherwise the first step makes a new array and any further
+    steps are done in place on that array.
+    """
+    def can_write(vals):
+        return (isinstance(vals, np.ndarray) and vals.dtype.kind == 'f'
+                and vals.flags.writeable)
+
+    in_place = not copy and can_write(vals)
+    for ufunc, value in steps:
+        if in_place:
+            ufunc(vals, value, out=vals)
+        else:
+            vals = ufunc(vals, value)
+            in_place = can_write(vals)
 
+    if decimals is not None:
+        vals = np.round(vals, decimals=decimals, out=vals if in_place else None)
 
-def C_to_K(vals, delta_val=False):
-    if delta_val:
-        return vals
-    else:
-        return vals + 273.15
+    return vals
 
 
-def K_to_C(vals, delta_val=False):
-    if delta_val:
-        return vals
-    else:
-        return vals - 273.15
+def arith(steps, delta_steps=None, decimals=None):
+    """
+    Make a converter that applies the ``steps`` list of (ufunc, constant)
+    elementwise operations in order (or ``delta_steps`` for delta values, default
+    same as ``steps``) and then rounds to ``decimals``.  Unlike a general
+    converter function this can be applied in place with ``copy=False``.
+    """
+    if delta_steps is None:
+        delta_steps = steps
 
+    def convert(vals, delta_val=False, copy=True):
+        return _apply_steps(vals, delta_steps if delta_val else steps, decimals, copy)
 
-def K_to_F(vals, delta_val=False):
-    if delta_val:
-        return vals * 1.8
-    else:
-        return vals * 1.8 - 459.67  # (vals - 273.15) * 1.8 + 32
+    convert.in_place = True
+    return convert
 
 
-def F_to_K(vals, delta_val=False):
-    if delta_val:
-        return vals / 1.8
-    else:
-        return (vals + 459.67) / 1.8
+# Temperature conversions.  The operations are in the order of the formulae in the
+# comments, so in-place and new array results are identical.
+F_to_C = arith([(np.subtract, 32.0), (np.true_divide, 1.8)],  # (vals - 32) / 1.8
+               delta_steps=[(np.true_divide, 1.8)])
+C_to_F = arith([(np.multiply, 1.8), (np.add, 32.0)],  # vals * 1.8 + 32
+               delta_steps=[(np.multiply, 1.8)])
+C_to_K = arith([(np.add, 273.15)], delta_steps=[])  # vals + 273.15
+K_to_C = arith([(np.subtract, 273.15)], delta_steps=[])  # vals - 273.15
+K_to_F = arith([(np.multiply, 1.8), (np.subtract, 459.67)],  # vals * 1.8 - 459.67
+               delta_steps=[(np.multiply, 1.8)])
+F_to_K = arith([(np.add, 459.67), (np.true_divide, 1.8)],  # (vals + 459.67) / 1.8
+               delta_steps=[(np.true_divide, 1.8)])
 
 
 def FASTEP_to_mm(vals, delta_val=False):
@@ -154,12 +170,7 @@ def mm_to_FASTEP(vals, delta_val=False):
 
 
 def mult(scale_factor, decimals=None):
-    def convert(vals, delta_val=False):
-        result = vals * scale_factor
-        if decimals is not None:
-            result = np.round(result, decimals=decimals)
-        return result
-    return convert
+    return arith([(np.multiply, scale_factor)], decimals=decimals)
 
 
 def divide(scale_factor, decimals=None):
@@ -195,6 +206,10 @@ converters = {
     ('TSCSTEP', 'mm'): mult(0.00251431530156),
 }
 
+# Cache of the conversion table for each (from_system, system) pair of unit
+# systems, see Units.get_conversions()
+_conversions = {}
+
 
 def load_units(unit_system):
     """Load units definitions for unit_system if not already loaded.
@@ -274,11 +289,41 @@ class Units(dict):
         system_unit = self[system].get(MSID, cxc_unit)  # WHY this default of cxc_unit??
         return system_unit
 
-    def convert(self, msid, vals, delta_val=False, from_system='cxc'):
-        MSID = msid.upper()
-        conversion = (self[from_system].get(MSID), self.get_msid_unit(MSID))
+    def get_conversions(self, from_system='cxc'):
+        """
+        Get the table of unit conversions from ``from_system`` to the current
+        unit system.  The table is built once for each pair of unit systems.
 
-        if conversion[0] == conversion[1] or conversion in equiv_units:
+        :param from_system: unit system of the input values (default='cxc')
+        :returns: dict of {MSID: (from_unit, to_unit)} for every MSID that
+            needs a conversion
+        """
+        key = (from_system, self['system'])
+        if key not in _conversions:
+            msids = set(self['cxc']) | set(self[from_system]) | set(self[self['system']])
+            table = {}
+            for MSID in msids:
+                conversion = (self[from_system].get(MSID), self.get_msid_unit(MSID))
+                if conversion[0] != conversion[1] and conversion not in equiv_units:
+                    table[MSID] = conversion
+            _conversions[key] = table
+
+        return _conversions[key]
+
+    def convert(self, msid, vals, delta_val=False, from_system='cxc', copy=True):
+        """
+        Convert ``vals`` for ``msid`` from ``from_system`` to the current units.
+
+        :param msid: MSID name
+        :param vals: values to convert
+        :param delta_val: values are differences (e.g. standard deviations)
+        :param from_system: unit system of ``vals`` (default='cxc')
+        :param copy: if False then a float ``vals`` array may be converted in place
+        :returns: converted values (``vals`` itself if no conversion is needed)
+        """
+        MSID = msid.upper()
+        conversion = self.get_conversions(from_system).get(MSID)
+        if conversion is None:
             return vals
 
         if conversion not in converters:
@@ -289,6 +334,10 @@ class Units(dict):
                           'PLEASE REPORT THIS to the Ska developers!\n'
                           .format(MSID, conversion[0], conversion[1]))
 
-        vals = converters[conversion](vals, delta_val)
+        converter = converters[conversion]
+        if not copy and getattr(converter, 'in_place', False):
+            return converter(vals, delta_val, copy=False)
+
+        vals = converter(vals, delta_val)
 
         return vals
@@ -30,6 +30,10 @@ import Ska.engarchive.fetch as fetch
 import Ska.engarchive.converters as converters
 import Ska.engarchive.file_defs as file_defs
 import Ska.engarchive.derived as derived
+import Ska.engarchive.storage as storage
+import Ska.engarchive.colstore as colstore
+import Ska.engarchive.fetch_cache as fetch_cache
+from Ska.engarchive.utils import STATS_DT, STATS_LEVELS, DEFAULT_STATS, get_stats_levels
 import Ska.arc5gl
 
 
@@ -84,6 +88,24 @@ def get_options(args=None):
                         type=int,
                         default=500,
                         help="Maximum number of archive files to ingest at once")
+    parser.add_argument("--storage-layout",
+                        type=int,
+                        default=storage.DEFAULT_LAYOUT,
+                        help=("Storage layout version for newly created MSID and stats "
+                              "files (default={})".format(storage.DEFAULT_LAYOUT)))
+    parser.add_argument("--stats-level",
+                        action='append',
+                        help=("Enable an additional stats level ({}) for the processed "
+                              "content types".format(', '.join(
+                                  x for x in STATS_LEVELS if x not in DEFAULT_STATS))))
+    parser.add_argument("--colstore-content",
+                        action='append',
+                        help=("Enable the memory-mapped column store mirror for content "
+                              "type [match regex]"))
+    parser.add_argument("--n-procs",
+                        type=int,
+                        default=1,
+                        help="Number of processes for writing MSID h5 files (default=1)")
     parser.add_argument("--data-root",
                         default=".",
                         help="Engineering archive root directory for MSID and arch files")
@@ -92,6 +114,12 @@ def get_options(args=None):
                         help="Content type to process [match regex] (default = all)")
     parser.add_argument("--log-level",
                         help="Logging level")
+    parser.add_argument("--no-wal",
+                        action="store_false",
+                        dest="wal",
+                        default=True,
+                        help=("Do not set archfiles DB to WAL journal mode (e.g. for "
+                              "archives on a network file system)"))
     return parser.parse_args(args)
 
 
@@ -235,23 +263,30 @@ def main_loop():
 
         if opt.truncate:
             truncate_archive(filetype, opt.truncate)
+            update_colstore()
             continue
 
         if opt.fix_misorders:
             misorder_time = fix_misorders(filetype)
             if misorder_time:
                 for colname in colnames:
-                    del_stats(colname, misorder_time, 'daily')
-                    del_stats(colname, misorder_time, '5min')
+                    for interval in get_content_stats_levels():
+                        del_stats(colname, misorder_time, interval)
+                # Rows were swapped in place so rebuild the whole mirror
+                update_colstore(rowstart=0)
             continue
 
         if opt.update_full:
             if filetype['instrum'] == 'DERIVED':
                 update_derived(filetype)
+                modified_rowstart = None
             else:
-                update_archive(filetype)
+                modified_rowstart = update_archive(filetype)
+            # Re-copy rows from the first row with quality set in place (overlaps)
+            update_colstore(rowstart=modified_rowstart)
 
         if opt.update_stats:
+            stats_levels = get_content_stats_levels()
             for colname in colnames:
                 if opt.state_codes_only:
                     # Check if colname has a state code in the TDB or if it is in the
@@ -262,8 +297,62 @@ def main_loop():
                         if not colname.upper() in fetch.STATE_CODES:
                             continue
 
-                msid = update_stats(colname, 'daily')
-                update_stats(colname, '5min', msid)
+                # Full-resolution data fetched for the first (daily) level are
+                # re-used for the finer levels.
+                msid = None
+                for interval in stats_levels:
+                    if STATS_LEVELS[interval]['parent'] is None:
+                        msid = update_stats(colname, interval, msid)
+                    else:
+                        update_derived_stats(colname, interval, msid)
+
+
+def get_content_stats_levels():
+    """
+    Get the stats levels to maintain for the current content type.
+
+    These are the standard levels plus any level which already exists for the
+    content (has a stats directory) or is enabled with --stats-level.  Levels
+    computed from full-resolution data come first in order of decreasing dt,
+    followed by derived levels after their parents.
+
+    :returns: list of stats level names
+    """
+    stats = list(DEFAULT_STATS)
+    for stat in STATS_LEVELS:
+        ft['interval'] = stat
+        if stat in (opt.stats_level or []) or os.path.exists(msid_files['statsdir'].abs):
+            stats.append(stat)
+    stats = get_stats_levels(stats)
+
+    full_stats = sorted((stat for stat in stats if STATS_LEVELS[stat]['parent'] is None),
+                        key=lambda stat: STATS_DT[stat], reverse=True)
+    derived_stats = [stat for stat in stats if STATS_LEVELS[stat]['parent'] is not None]
+    return full_stats + derived_stats
+
+
+def update_colstore(rowstart=None):
+    """
+    Bring the memory-mapped column store mirror for the current content type
+    up to date with the MSID h5 files, if the mirror is enabled for the content.
+
+    :param rowstart: re-copy all rows from ``rowstart`` onward (default=new rows only)
+    """
+    if opt.dry_run:
+        return
+
+    colstore_dir = msid_files['colstore'].abs
+    if opt.colstore_content and any(re.match(y.upper(), ft['content'].upper())
+                                    for y in opt.colstore_content):
+        colstore.enable(colstore_dir)
+
+    if not colstore.is_enabled(colstore_dir):
+        return
+
+    logger.info('Syncing column store mirror for %s', ft['content'])
+    colnames = pickle.load(open(msid_files['colnames'].abs, 'rb'))
+    colstore.sync_content(msid_files['contentdir'].abs, colstore_dir, colnames,
+                          rowstart=rowstart, logger=logger)
 
 
 def fix_misorders(filetype):
@@ -357,8 +446,7 @@ def del_stats(colname, time0, interval):
     that result from a file misorder.  Subsequent runs of update_stats will
     refresh the values correctly.
     """
-    dt = {'5min': 328,
-          'daily': 86400}[interval]
+    dt = STATS_DT[interval]
 
     ft['msid'] = colname
     ft['interval'] = interval
@@ -386,6 +474,39 @@ def del_stats(colname, time0, interval):
     stats.close()
 
 
+# Percentiles stored in stats levels that include percentiles
+QUANTILES = (1, 5, 16, 50, 84, 95, 99)
+
+# Time span (sec) of full-resolution data fetched at once to compute the
+# percentiles of derived stats levels (at least one row of the level)
+DERIVED_STATS_CHUNK_DT = 7 * 86400
+
+
+def calc_sample_weights(msid):
+    """
+    Compute the time weight of each sample of ``msid`` as the average of the
+    time steps to the neighboring samples, clipped to the range 0.001 to 300 sec
+    (see calc_stats_vals).
+
+    :param msid: Msid object (filter_bad=True)
+    :returns: np.ndarray of float64 weights
+    """
+    times = msid.times
+    if len(times) <= 2:
+        return np.ones(len(times), dtype=np.float64)
+
+    dts = np.empty(len(times), dtype=np.float64)
+    dts[0] = times[1] - times[0]
+    dts[-1] = times[-1] - times[-2]
+    dts[1:-1] = (times[2:] - times[:-2]) / 2.0
+    negs = dts < 0.0
+    if np.any(negs):
+        times_dts = [(DateTime(t).date, dt) for t, dt in zip(times[negs], dts[negs])]
+        logger.warning('WARNING - negative dts in {} at {}'.format(msid.MSID, times_dts))
+    dts.clip(0.001, 300.0, out=dts)
+    return dts
+
+
 def calc_stats_vals(msid, rows, indexes, interval):
     """
     Compute statistics values for ``msid`` over specified intervals.
@@ -393,9 +514,9 @@ def calc_stats_vals(msid, rows, indexes, interval):
     :param msid: Msid object (filter_bad=True)
     :param rows: Msid row indices corresponding to stat boundaries
     :param indexes: Universal index values for stat (row times // dt)
-    :param interval: interval name (5min or daily)
+    :param interval: interval name (key of STATS_LEVELS)
     """
-    quantiles = (1, 5, 16, 50, 84, 95, 99)
+    level = STATS_LEVELS[interval]
     n_out = len(rows) - 1
 
     # Check if data type is "numeric".  Boolean values count as numeric,
@@ -418,11 +539,17 @@ def calc_stats_vals(msid, rows, indexes, interval):
     if msid_is_numeric:
         out['min'] = np.ndarray((n_out,), dtype=msid_dtype)
         out['max'] = np.ndarray((n_out,), dtype=msid_dtype)
-        out['mean'] = np.ndarray((n_out,), dtype=np.float32)
-
-        if interval == 'daily':
-            out['std'] = np.ndarray((n_out,), dtype=msid_dtype)
-            for quantile in quantiles:
+        out['mean'] = np.ndarray((n_out,), dtype=np.float64 if level['weights'] else np.float32)
+
+        if level['std']:
+            out['std'] = np.ndarray((n_out,), dtype=np.float64 if level['weights'] else msid_dtype)
+        if level['weights']:
+            # Sample weights are computed across stat boundaries so that
+            # stats of a derived level can be combined exactly from these.
+            out['sum_w'] = np.ndarray((n_out,), dtype=np.float64)
+            all_dts = calc_sample_weights(msid)
+        if level['percentiles']:
+            for quantile in QUANTILES:
                 out['p{:02d}'.format(quantile)] = np.ndarray((n_out,), dtype=msid_dtype)
 
     # MSID may have state codes
@@ -441,7 +568,9 @@ def calc_stats_vals(msid, rows, indexes, interval):
             out['n'][i] = n_vals
             out['val'][i] = vals[n_vals // 2]
             if msid_is_numeric:
-                if n_vals <= 2:
+                if level['weights']:
+                    dts = all_dts[row0:row1]
+                elif n_vals <= 2:
                     dts = np.ones(n_vals, dtype=np.float64)
                 else:
                     dts = np.empty(n_vals, dtype=np.float64)
@@ -467,13 +596,16 @@ def calc_stats_vals(msid, rows, indexes, interval):
                 out['min'][i] = np.min(vals)
                 out['max'][i] = np.max(vals)
                 out['mean'][i] = np.sum(dts * vals) / sum_dts
-                if interval == 'daily':
+                if level['std']:
                     # biased weighted estimator of variance (N should be big enough)
                     # http://en.wikipedia.org/wiki/Mean_square_weighted_deviation
                     sigma_sq = np.sum(dts * (vals - out['mean'][i]) ** 2) / sum_dts
                     out['std'][i] = np.sqrt(sigma_sq)
-                    quant_vals = scipy.stats.mstats.mquantiles(vals, np.array(quantiles) / 100.0)
-                    for quant_val, quantile in zip(quant_vals, quantiles):
+                if level['weights']:
+                    out['sum_w'][i] = sum_dts
+                if level['percentiles']:
+                    quant_vals = scipy.stats.mstats.mquantiles(vals, np.array(QUANTILES) / 100.0)
+                    for quant_val, quantile in zip(quant_vals, QUANTILES):
                         out['p%02d' % quantile][i] = quant_val
 
             if msid.state_codes:
@@ -492,8 +624,7 @@ def calc_stats_vals(msid, rows, indexes, interval):
 
 
 def update_stats(colname, interval, msid=None):
-    dt = {'5min': 328,
-          'daily': 86400}[interval]
+    dt = STATS_DT[interval]
 
     ft['msid'] = colname
     ft['interval'] = interval
@@ -547,8 +678,10 @@ def update_stats(colname, interval, msid=None):
                         logger.info('  Adding %d records', len(vals_stats))
                     except tables.NoSuchNodeError:
                         logger.info('  Creating table with %d records ...', len(vals_stats))
-                        stats.create_table(stats.root, 'data', vals_stats,
-                                           "{} sampling".format(interval), expectedrows=2e7)
+                        storage.create_stats_table(stats, vals_stats,
+                                                   "{} sampling".format(interval),
+                                                   expectedrows=2e7,
+                                                   layout=opt.storage_layout)
                     stats.root.data.flush()
             else:
                 logger.info('  No stat records within available fetched values')
@@ -563,6 +696,162 @@ def update_stats(colname, interval, msid=None):
     return msid
 
 
+def calc_derived_stats_vals(parent_rows, ratio, interval, msid=None):
+    """
+    Compute ``interval`` statistics from the stats rows of the finer parent level.
+
+    The number of samples, min, max, state counts and sum of weights are
+    combined exactly.  The mean and standard deviation are the weighted
+    combination of the parent values using the parent ``sum_w`` weights, which is
+    exact since sample weights do not depend on the stat boundaries.  The
+    sampled value ``val`` is taken from the middle parent row.  Percentiles are
+    computed from the full-resolution ``msid`` values.
+
+    :param parent_rows: structured array of parent stats rows, sorted by index
+    :param ratio: number of parent intervals in one ``interval``
+    :param interval: interval name (key of STATS_LEVELS)
+    :param msid: Msid object (filter_bad=True), required for percentiles
+    :returns: np.recarray of stats values
+    """
+    level = STATS_LEVELS[interval]
+    names = parent_rows.dtype.names
+
+    groups = parent_rows['index'] // ratio
+    starts = np.flatnonzero(np.concatenate([[True], groups[1:] != groups[:-1]]))
+    ends = np.append(starts[1:], len(parent_rows))
+
+    out = OrderedDict()
+    out['index'] = groups[starts].astype(np.int32)
+    out['n'] = np.add.reduceat(parent_rows['n'], starts).astype(np.int32)
+    out['val'] = parent_rows['val'][starts + (ends - starts) // 2]
+
+    if 'min' in names:
+        out['min'] = np.minimum.reduceat(parent_rows['min'], starts)
+        out['max'] = np.maximum.reduceat(parent_rows['max'], starts)
+        weights = parent_rows['sum_w']
+        sum_w = np.add.reduceat(weights, starts)
+        mean = np.add.reduceat(weights * parent_rows['mean'], starts) / sum_w
+        out['mean'] = mean
+        if level['std']:
+            # Within-bin variance plus the spread of bin means about the mean
+            dev_sq = (parent_rows['mean'] - np.repeat(mean, ends - starts)) ** 2
+            var = np.add.reduceat(weights * (parent_rows['std'] ** 2 + dev_sq), starts) / sum_w
+            out['std'] = np.sqrt(var)
+        out['sum_w'] = sum_w
+        if level['percentiles']:
+            dt = level['dt']
+            rows0 = np.searchsorted(msid.times, out['index'] * dt)
+            rows1 = np.searchsorted(msid.times, (out['index'] + 1) * dt)
+            quant_vals = np.empty((len(starts), len(QUANTILES)), dtype=parent_rows['min'].dtype)
+            for i, row0, row1 in zip(itertools.count(), rows0, rows1):
+                vals = msid.vals[row0:row1]
+                quant_vals[i] = (scipy.stats.mstats.mquantiles(vals, np.array(QUANTILES) / 100.0)
+                                 if len(vals) > 0 else out['val'][i])
+            for j, quantile in enumerate(QUANTILES):
+                out['p{:02d}'.format(quantile)] = quant_vals[:, j]
+
+    for name in names:
+        if name.startswith('n_'):
+            out[name] = np.add.reduceat(parent_rows[name], starts).astype(np.int32)
+
+    return np.rec.fromarrays(list(out.values()), names=list(out.keys()))
+
+
+def update_derived_stats(colname, interval, msid=None):
+    """
+    Update the ``interval`` stats file for ``colname`` from the stats of its
+    finer parent level.
+
+    A row is only added once the parent level has a row beyond the end of the
+    row interval, so all the parent rows that go into it are final.  For levels
+    with percentiles the full-resolution data are fetched, and rows computed and
+    appended, in chunks of ``DERIVED_STATS_CHUNK_DT`` so that memory use is
+    bounded on the first build of a level.
+
+    :param colname: column (MSID) name
+    :param interval: interval name (key of STATS_LEVELS with a parent)
+    :param msid: full-resolution Msid object (filter_bad=True), used for
+        percentiles if it covers the required time range (optional)
+    """
+    level = STATS_LEVELS[interval]
+    dt = level['dt']
+    parent = level['parent']
+    ratio = int(round(dt / STATS_DT[parent]))
+
+    ft['msid'] = colname
+    ft['interval'] = parent
+    parent_file = msid_files['stats'].abs
+    if not os.path.exists(parent_file):
+        logger.info('No {} stats file {} for {} - skipping'.format(parent, parent_file, interval))
+        return
+
+    ft['interval'] = interval
+    stats_file = msid_files['stats'].abs
+    logger.info('Updating stats file %s from %s', stats_file, parent_file)
+
+    if not os.path.exists(msid_files['statsdir'].abs):
+        logger.info('Making stats dir {}'.format(msid_files['statsdir'].abs))
+        os.makedirs(msid_files['statsdir'].abs)
+
+    with tables.open_file(parent_file, mode='r') as h5:
+        try:
+            parent_indexes = h5.root.data.col('index')
+        except tables.NoSuchNodeError:
+            parent_indexes = np.array([], dtype=np.int32)
+
+        if len(parent_indexes) == 0:
+            logger.info('  No {} stats available'.format(parent))
+            return
+
+        stats = tables.open_file(stats_file, mode='a')
+        try:
+            index0 = stats.root.data.cols.index[-1] + 1
+        except tables.NoSuchNodeError:
+            index0 = parent_indexes[0] // ratio
+
+        # Only use complete groups, i.e. parent has a row after the end of the group
+        index1 = parent_indexes[-1] // ratio
+        row0, row1 = np.searchsorted(parent_indexes, [index0 * ratio, index1 * ratio])
+        parent_rows = h5.root.data[row0:row1]
+
+    if len(parent_rows) == 0:
+        logger.info('  No complete {} intervals in {} stats'.format(interval, parent))
+        stats.close()
+        return
+
+    # Split parent rows into chunks of whole level rows, aligned to multiples
+    # of the chunk size, if full-resolution data are needed for percentiles.
+    percentiles = level['percentiles'] and 'min' in parent_rows.dtype.names
+    if percentiles:
+        chunk_rows = max(1, int(DERIVED_STATS_CHUNK_DT // dt))
+        chunks = parent_rows['index'] // (ratio * chunk_rows)
+        splits = np.flatnonzero(chunks[1:] != chunks[:-1]) + 1
+    else:
+        splits = []
+
+    for rows in np.split(parent_rows, splits):
+        chunk_msid = msid
+        if percentiles:
+            tstart = (rows['index'][0] // ratio) * dt
+            tstop = (rows['index'][-1] // ratio + 1) * dt
+            if msid is None or msid.tstart > tstart or msid.tstop < tstop:
+                chunk_msid = fetch.MSID(colname, tstart, tstop, filter_bad=True)
+
+        vals_stats = calc_derived_stats_vals(rows, ratio, interval, chunk_msid)
+        if not opt.dry_run:
+            try:
+                stats.root.data.append(vals_stats)
+                logger.info('  Adding %d records', len(vals_stats))
+            except tables.NoSuchNodeError:
+                logger.info('  Creating table with %d records ...', len(vals_stats))
+                storage.create_stats_table(stats, vals_stats,
+                                           "{} sampling".format(interval),
+                                           expectedrows=max(1e4, 2e7 * 328 / dt),
+                                           layout=opt.storage_layout)
+            stats.root.data.flush()
+    stats.close()
+
+
 def update_derived(filetype):
     """Update full resolution MSID archive files for derived parameters with ``filetype``
     """
@@ -630,18 +919,61 @@ def update_derived(filetype):
 def update_archive(filetype):
     """Get new CXC archive files for ``filetype`` and update the full-resolution MSID
     archive files.
+
+    :returns: first existing row with quality set in place (None if no rows changed)
     """
     tmpdir = Ska.File.TempDir(dir=opt.data_root)
     dirname = tmpdir.name
+    modified_rowstart = None
 
     with Ska.File.chdir(dirname):
         archfiles = get_archive_files(filetype)
         if archfiles:
-            archfiles_processed = update_msid_files(filetype, archfiles)
+            archfiles_processed, modified_rowstart = update_msid_files(filetype, archfiles)
             unlink_archive_files(filetype, archfiles_processed)
 
+    return modified_rowstart
+
 
-def make_h5_col_file(dats, colname):
+def stack_dats(dats):
+    """
+    Stack the structured arrays in ``dats`` into a single structured array.
+
+    In the normal case every file for a content type has the same dtype, and
+    then the columns of the single stacked array can be used directly as views
+    for writing each MSID file.  If the dtypes differ (e.g. a TDB update added a
+    column) then None is returned and columns are stacked one at a time.
+
+    :param dats: list of structured arrays from converters.convert()
+    :returns: stacked structured array or None
+    """
+    if len(set(dat.dtype for dat in dats)) != 1:
+        return None
+    return np.concatenate(dats)
+
+
+def get_stacked_col(dats, colname, stacked=None):
+    """
+    Get the stacked data and quality values for ``colname`` from ``dats``.
+
+    :param dats: list of structured arrays
+    :param colname: column name
+    :param stacked: output of stack_dats(dats) (default=None)
+    :returns: data, quality arrays
+    """
+    def i_colname(dat):
+        """Return the index for `colname` in `dat`"""
+        return list(dat.dtype.names).index(colname)
+
+    if stacked is not None:
+        return stacked[colname], stacked['QUALITY'][:, i_colname(stacked)]
+
+    stacked_data = np.hstack([x[colname] for x in dats])
+    stacked_quality = np.hstack([x['QUALITY'][:, i_colname(x)] for x in dats])
+    return stacked_data, stacked_quality
+
+
+def make_h5_col_file(dats, colname, stacked=None):
     """Make a new h5 table to hold column from ``dat``."""
     filename = msid_files['msid'].abs
     filedir = os.path.dirname(filename)
@@ -649,23 +981,18 @@ def make_h5_col_file(dats, colname):
         os.makedirs(filedir)
 
     # Estimate the number of rows for 20 years based on available data
-    times = np.hstack([x['TIME'] for x in dats])
+    times = (stacked['TIME'] if stacked is not None
+             else np.hstack([x['TIME'] for x in dats]))
     dt = np.median(times[1:] - times[:-1])
     n_rows = int(86400 * 365 * 20 / dt)
 
-    filters = tables.Filters(complevel=5, complib='zlib')
-    h5 = tables.open_file(filename, mode='w', filters=filters)
-
     col = dats[-1][colname]
     h5shape = (0,) + col.shape[1:]
     h5type = tables.Atom.from_dtype(col.dtype)
-    h5.create_earray(h5.root, 'data', h5type, h5shape, title=colname,
-                     expectedrows=n_rows)
-    h5.create_earray(h5.root, 'quality', tables.BoolAtom(), (0,), title='Quality',
-                     expectedrows=n_rows)
+    storage.create_msid_file(filename, colname, h5type, h5shape, n_rows,
+                             layout=opt.storage_layout)
     logger.verbose('WARNING: made new file {} for column {!r} shape={} with n_rows(1e6)={}'
                    .format(filename, colname, h5shape, n_rows / 1.0e6))
-    h5.close()
 
 
 def append_filled_h5_col(dats, colname, data_len):
@@ -700,19 +1027,16 @@ def append_filled_h5_col(dats, colname, data_len):
     append_h5_col(new_dats, colname, [])
 
 
-def append_h5_col(dats, colname, files_overlaps):
+def append_h5_col(dats, colname, files_overlaps, stacked=None):
     """Append new values to an HDF5 MSID data table.
 
     :param dats: List of pyfits HDU data objects
     :param colname: column name
+    :param files_overlaps: list of 2-tuples of overlapping archfiles rows
+    :param stacked: output of stack_dats(dats) (default=None)
     """
-    def i_colname(dat):
-        """Return the index for `colname` in `dat`"""
-        return list(dat.dtype.names).index(colname)
-
     h5 = tables.open_file(msid_files['msid'].abs, mode='a')
-    stacked_data = np.hstack([x[colname] for x in dats])
-    stacked_quality = np.hstack([x['QUALITY'][:, i_colname(x)] for x in dats])
+    stacked_data, stacked_quality = get_stacked_col(dats, colname, stacked)
     logger.verbose('Appending %d items to %s' % (len(stacked_data), msid_files['msid'].abs))
 
     if not opt.dry_run:
@@ -750,6 +1074,51 @@ def append_h5_col(dats, colname, files_overlaps):
     return data_len
 
 
+# Arguments for _append_h5_col_worker(), set before forking the worker processes
+# in append_h5_cols() so that the data arrays are inherited instead of pickled.
+_append_h5_cols_args = None
+
+
+def _append_h5_col_worker(colname):
+    dats, files_overlaps, stacked = _append_h5_cols_args
+    ft['msid'] = colname
+    return colname, append_h5_col(dats, colname, files_overlaps, stacked)
+
+
+def append_h5_cols(dats, colnames, files_overlaps, stacked=None):
+    """Append new values to the HDF5 MSID data table for each of ``colnames``.
+
+    If ``opt.n_procs`` is greater than 1 then the MSID files are written in
+    parallel by a pool of forked processes.  This is safe because each column
+    is stored in a separate file.
+
+    :param dats: List of pyfits HDU data objects
+    :param colnames: list of column names
+    :param files_overlaps: list of 2-tuples of overlapping archfiles rows
+    :param stacked: output of stack_dats(dats) (default=None)
+    :returns: dict of data length for each column name
+    """
+    global _append_h5_cols_args
+
+    if opt.n_procs > 1 and len(colnames) > 1:
+        import multiprocessing
+
+        _append_h5_cols_args = (dats, files_overlaps, stacked)
+        try:
+            mp_context = multiprocessing.get_context('fork')
+            with mp_context.Pool(opt.n_procs) as pool:
+                data_lens = dict(pool.map(_append_h5_col_worker, colnames))
+        finally:
+            _append_h5_cols_args = None
+    else:
+        data_lens = {}
+        for colname in colnames:
+            ft['msid'] = colname
+            data_lens[colname] = append_h5_col(dats, colname, files_overlaps, stacked)
+
+    return data_lens
+
+
 def truncate_archive(filetype, date):
     """Truncate msid and statfiles for every archive file after date (to nearest
     year:doy)
@@ -773,6 +1142,7 @@ def truncate_archive(filetype, date):
 
     rowstart = out['rowstart'].min()
     time0 = DateTime("{0}:{1}:00:00:00".format(year, doy)).secs
+    stats_levels = get_content_stats_levels()
 
     for colname in colnames:
         ft['msid'] = colname
@@ -792,8 +1162,8 @@ def truncate_archive(filetype, date):
             # Colnames like TIME, MNF etc that are not in stats
             continue
 
-        # Delete the 5min and daily stats, with a little extra margin
-        for interval in ('5min', 'daily'):
+        # Delete the stats for each level, with a little extra margin
+        for interval in stats_levels:
             ft['interval'] = interval
             filename = msid_files['stats'].abs
             if os.path.exists(filename):
@@ -804,7 +1174,7 @@ def truncate_archive(filetype, date):
                 logger.debug(f'Stats file {filename} not found - skipping')
 
     # Remove the last_date_id file if it exists
-    for interval in ('5min', 'daily'):
+    for interval in stats_levels:
         ft['interval'] = interval
         filename = os.path.join(msid_files['statsdir'].abs, 'last_date_id')
         if os.path.exists(filename):
@@ -820,14 +1190,15 @@ def truncate_archive(filetype, date):
     logger.verbose(cmd)
 
 
-def read_archfile(i, f, filetype, row, colnames, archfiles, db):
+def read_archfile(i, f, filetype, row, colnames, archfiles, known_filenames):
     """Read filename ``f`` with index ``i`` (position within list of filenames).  The
     file has type ``filetype`` and will be added to MSID file at row index ``row``.
     ``colnames`` is the list of column names for the content type (not used here).
+    ``known_filenames`` is the set of filenames already in the archfiles table.
     """
     # Check if filename is already in archfiles.  If so then abort further processing.
     filename = os.path.basename(f)
-    if db.fetchall('SELECT filename FROM archfiles WHERE filename=?', (filename,)):
+    if filename in known_filenames:
         logger.verbose('File %s already in archfiles - unlinking and skipping' % f)
         os.unlink(f)
         return None, None
@@ -870,18 +1241,17 @@ def read_archfile(i, f, filetype, row, colnames, archfiles, db):
     return dat, archfiles_row
 
 
-def read_derived(i, filename, filetype, row, colnames, archfiles, db):
+def read_derived(i, filename, filetype, row, colnames, archfiles, known_filenames):
     """Read derived data using eng_archive and derived computation classes.
     ``filename`` has format <content>_<index0>_<index1> where <content>
     is the content type (e.g. "dp_thermal128"), <index0> is the start index for
     the new data and index1 is the end index (using Python slicing convention
-    index0:index1).  Args ``i``, ``filetype``, and ``row`` are as in
-    read_archive().  ``row`` must equal <index0>.  ``colnames`` is the list of
+    index0:index1).  Args ``i``, ``filetype``, ``row`` and ``known_filenames`` are
+    as in read_archive().  ``row`` must equal <index0>.  ``colnames`` is the list of
     column names for the content type.
     """
     # Check if filename is already in archfiles.  If so then abort further processing.
-
-    if db.fetchall('SELECT filename FROM archfiles WHERE filename=?', (filename,)):
+    if filename in known_filenames:
         logger.verbose('File %s already in archfiles - skipping' % filename)
         return None, None
 
@@ -932,7 +1302,41 @@ def read_derived(i, filename, filetype, row, colnames, archfiles, db):
     return dat, archfiles_row
 
 
+def get_known_filenames(db):
+    """
+    Get the set of filenames that are already in the archfiles table of ``db``.
+    """
+    rows = db.fetchall('SELECT filename FROM archfiles')
+    return set(rows['filename']) if len(rows) > 0 else set()
+
+
+def insert_archfiles_rows(db, archfiles_rows):
+    """
+    Insert ``archfiles_rows`` (list of dict with the same keys) into the
+    archfiles table of ``db`` with a single executemany.  This does not commit.
+    """
+    if not archfiles_rows:
+        return
+
+    cols = list(archfiles_rows[0])
+    cmd = ('INSERT INTO archfiles ({}) VALUES ({})'
+           .format(', '.join(cols), ', '.join('?' for col in cols)))
+    vals = [[(row[col].item() if isinstance(row[col], np.generic) else row[col])
+             for col in cols]
+            for row in archfiles_rows]
+    logger.verbose('Inserting {} rows into archfiles'.format(len(vals)))
+    db.conn.executemany(cmd, vals)
+
+
 def update_msid_files(filetype, archfiles):
+    """
+    Ingest ``archfiles`` of ``filetype`` into the full-resolution MSID files.
+
+    Rows of an existing archive file that are overlapped by the next file are
+    marked bad in place (see ``append_h5_col``).
+
+    :returns: tuple (archfiles processed, first row with quality set in place or None)
+    """
     colnames = pickle.load(open(msid_files['colnames'].abs, 'rb'))
     colnames_all = pickle.load(open(msid_files['colnames_all'].abs, 'rb'))
     old_colnames = colnames.copy()
@@ -941,11 +1345,21 @@ def update_msid_files(filetype, archfiles):
     # Setup db handle with autocommit=False so that error along the way aborts insert transactions
     db = Ska.DBI.DBI(dbi='sqlite', server=msid_files['archfiles'].abs, autocommit=False)
 
+    # Use write-ahead logging so that concurrent readers (fetch) are never
+    # blocked by the update.  This setting is persistent in the db file.
+    if opt.wal and not opt.dry_run:
+        db.execute('PRAGMA journal_mode=WAL')
+
     # Get the last row number from the archfiles table
     out = db.fetchone('SELECT max(rowstop) FROM archfiles')
     row = out['max(rowstop)'] or 0
     last_archfile = db.fetchone('SELECT * FROM archfiles where rowstop=?', (row,))
 
+    # Filenames already ingested are checked in memory, and new archfiles rows
+    # are inserted in one batch just before the commit.
+    known_filenames = get_known_filenames(db)
+    archfiles_rows = []
+
     archfiles_overlaps = []
     dats = []
     archfiles_processed = []
@@ -954,7 +1368,7 @@ def update_msid_files(filetype, archfiles):
 
     for i, f in enumerate(archfiles):
         get_data = (read_derived if content_is_derived else read_archfile)
-        dat, archfiles_row = get_data(i, f, filetype, row, colnames, archfiles, db)
+        dat, archfiles_row = get_data(i, f, filetype, row, colnames, archfiles, known_filenames)
         if dat is None:
             continue
 
@@ -1035,8 +1449,8 @@ def update_msid_files(filetype, archfiles):
         # where ingest is stopped before all archfiles are processed, this will
         # leave files in a tmp dir.
         archfiles_processed.append(f)
-        if not opt.dry_run:
-            db.insert(archfiles_row, 'archfiles')
+        archfiles_rows.append(archfiles_row)
+        known_filenames.add(archfiles_row['filename'])
 
         # Capture the data for subsequent storage in the hdf5 files
         dats.append(dat)
@@ -1054,20 +1468,22 @@ def update_msid_files(filetype, archfiles):
 
     if dats:
         logger.verbose('Writing accumulated column data to h5 file at ' + time.ctime())
-        data_lens = set()
-        processed_cols = set()
+        stacked = stack_dats(dats)
+        append_cols = []
         for colname in colnames:
             ft['msid'] = colname
             if not os.path.exists(msid_files['msid'].abs):
-                make_h5_col_file(dats, colname)
+                make_h5_col_file(dats, colname, stacked)
                 if not opt.create:
                     # New MSID was found for this content type.  This must be associated with
                     # an update to the TDB.  Skip for the moment to ensure that other MSIDs
                     # are fully processed.
                     continue
-            data_len = append_h5_col(dats, colname, archfiles_overlaps)
-            data_lens.add(data_len)
-            processed_cols.add(colname)
+            append_cols.append(colname)
+
+        col_data_lens = append_h5_cols(dats, append_cols, archfiles_overlaps, stacked)
+        data_lens = set(col_data_lens.values())
+        processed_cols = set(col_data_lens)
 
         if len(data_lens) != 1:
             raise ValueError('h5 data length inconsistency {}, investigate NOW!'
@@ -1079,9 +1495,10 @@ def update_msid_files(filetype, archfiles):
             ft['msid'] = colname
             append_filled_h5_col(dats, colname, data_len)
 
-    # Assuming everything worked now commit the db inserts that signify the
-    # new archive files have been processed
+    # Assuming everything worked now insert and commit the archfiles rows that
+    # signify the new archive files have been processed
     if not opt.dry_run:
+        insert_archfiles_rows(db, archfiles_rows)
         db.commit()
 
     # If colnames or colnames_all changed then give warning and update files.
@@ -1096,7 +1513,15 @@ def update_msid_files(filetype, archfiles):
         if not opt.dry_run:
             pickle.dump(colnames_all, open(msid_files['colnames_all'].abs, 'wb'), protocol=0)
 
-    return archfiles_processed
+    # Rows of the first file of each overlap can have quality set in place.  Record
+    # the time of the first such row so the persistent fetch cache is re-read there.
+    modified_rowstart = None
+    if dats and archfiles_overlaps and not opt.dry_run:
+        modified_rowstart = int(min(file0['rowstart'] for file0, _ in archfiles_overlaps))
+        fetch_cache.add_modified_time(msid_files['modified'].abs,
+                                      min(file1['tstart'] for _, file1 in archfiles_overlaps))
+
+    return archfiles_processed, modified_rowstart
 
 
 def unlink_archive_files(filetype, archfiles):
@@ -36,8 +36,8 @@ from Ska.DBI import DBI
 from astropy.table import Table
 from astropy.utils.data import download_file
 
-from . import file_defs, __version__
-from .utils import get_date_id, STATS_DT
+from . import file_defs, colstore, fetch_cache, __version__
+from .utils import get_date_id, STATS_DT, DEFAULT_STATS
 
 sync_files = pyyaks.context.ContextDict('update_client_archive.sync_files')
 sync_files.update(file_defs.sync_files)
@@ -271,7 +271,8 @@ def get_copy_files(logger, msids, msids_content):
 
     This knows about the cheta archive structure and requires that the full, 5min,
     daily h5 files are copied along with (if not already there) the archfiles.db3,
-    colnames.pkl, and TIME.h5.
+    colnames.pkl, and TIME.h5.  Stats files for any additional stats levels (e.g.
+    hourly) are copied if that level is present in the local archive.
 
     :param logger: logger
     :param msids: list of MSIDs
@@ -287,9 +288,11 @@ def get_copy_files(logger, msids, msids_content):
         copy_specs = [(msid, None, 'msid'),
                       (msid, None, 'archfiles'),
                       (msid, None, 'colnames'),
-                      (msid, '5min', 'stats'),
-                      (msid, 'daily', 'stats'),
                       ('TIME', None, 'msid')]
+        for stat in STATS_DT:
+            ft['interval'] = stat
+            if stat in DEFAULT_STATS or Path(msid_files['statsdir'].abs).exists():
+                copy_specs.append((msid, stat, 'stats'))
         for ft_msid, interval, filetype in copy_specs:
             ft['msid'] = ft_msid
             ft['interval'] = interval
@@ -434,8 +437,24 @@ def sync_full_archive(opt, msid_files, logger, content, index_tbl):
     if dats:
         dat, msids = concat_data_sets(dats, ['data', 'quality'])
         with DelayedKeyboardInterrupt(logger):
-            update_full_h5_files(dat, logger, msid_files, msids, opt)
+            modified_rowstart = update_full_h5_files(dat, logger, msid_files, msids, opt)
             update_full_archfiles_db3(dat, logger, msid_files, opt)
+        update_colstore(msid_files, logger, msids, opt, rowstart=modified_rowstart)
+
+
+def update_colstore(msid_files, logger, msids, opt, rowstart=None):
+    """Sync the memory-mapped column store mirror for ``msids`` if it is enabled
+
+    :param rowstart: re-copy all rows from ``rowstart`` onward, e.g. rows with
+        quality set in place (default=new rows only)
+    """
+    colstore_dir = msid_files['colstore'].abs
+    if opt.dry_run or not colstore.is_enabled(colstore_dir):
+        return
+
+    with timing_logger(logger, f'Syncing column store mirror {colstore_dir}'):
+        colstore.sync_content(msid_files['contentdir'].abs, colstore_dir, msids,
+                              rowstart=rowstart, logger=logger)
 
 
 def update_full_archfiles_db3(dat, logger, msid_files, opt):
@@ -466,11 +485,19 @@ def update_full_archfiles_db3(dat, logger, msid_files, opt):
 
 
 def update_full_h5_files(dat, logger, msid_files, msids, opt):
+    """Append the new full data ``dat`` for ``msids``
+
+    :returns: first existing row with quality set in place (None if no rows changed)
+    """
+    modified_rowstarts = []
     with timing_logger(logger, f'Applying updates to {len(msids)} h5 files',
                        'info', 'info'):
         for msid in msids:
             vals = {key: dat[f'{msid}.{key}'] for key in ('data', 'quality', 'row0', 'row1')}
-            append_h5_col(opt, msid, vals, logger, msid_files)
+            modified_rowstart = append_h5_col(opt, msid, vals, logger, msid_files)
+            if modified_rowstart is not None:
+                modified_rowstarts.append(modified_rowstart)
+    return min(modified_rowstarts) if modified_rowstarts else None
 
 
 def get_full_data_sets(ft, index_tbl, logger, opt):
@@ -505,7 +532,7 @@ def sync_stat_archive(opt, msid_files, logger, content, stat, index_tbl):
     :param msid_files:
     :param logger:
     :param content:
-    :param stat: stat interval '5min' or 'daily'
+    :param stat: stat interval (key of STATS_DT)
     :param index_tbl: table of sync file entries
     :return:
     """
@@ -758,13 +785,14 @@ def append_h5_col(opt, msid, vals, logger, msid_files):
     :param vals: dict with `data`, `quality`, `row0` and `row1` keys
     :param logger:
     :param msid_files:
+    :returns: first existing row with quality set in place (None if no rows changed)
     """
     fetch.ft['msid'] = msid
 
     msid_file = Path(msid_files['msid'].abs)
     if not msid_file.exists():
         logger.debug(f'Skipping MSID update no {msid_file}')
-        return
+        return None
 
     mode = 'r' if opt.dry_run else 'a'
     with tables.open_file(str(msid_file), mode=mode) as h5:
@@ -786,7 +814,7 @@ def append_h5_col(opt, msid, vals, logger, msid_files):
         # data.  However, user might have manually rsynced a file as part of adding
         # a new MSID, in which case it might be up to date and there is no req'd action.
         if n_vals == 0:
-            return
+            return None
 
         if vals['row0'] != len(h5.root.data):
             raise RowMismatchError(
@@ -804,6 +832,7 @@ def append_h5_col(opt, msid, vals, logger, msid_files):
         # overlaps in the archive data.  Here we only worry about the beginning of
         # new data because anything in the middle will have already been marked
         # bad by update_archive.py.
+        modified_rowstart = None
         if msid == 'TIME':
             time0 = vals['data'][0]
             idx1 = len(h5.root.data) - 1
@@ -813,11 +842,16 @@ def append_h5_col(opt, msid, vals, logger, msid_files):
                 ii += 1
             if ii > 0:
                 logger.verbose(f'Excluded {ii} rows due to overlap')
+                modified_rowstart = idx1 - ii + 1
+                if not opt.dry_run:
+                    fetch_cache.add_modified_time(msid_files['modified'].abs, time0 - 0.0001)
 
         if not opt.dry_run:
             h5.root.data.append(vals['data'])
             h5.root.quality.append(vals['quality'])
 
+    return modified_rowstart
+
 
 def get_index_tbl(content, logger, opt):
     # Read the index file to know what is available for new data
@@ -185,8 +185,10 @@ def update_sync_repo(opt, logger, content):
         ft['date_id'] = row['date_id']
 
         update_sync_data_full(content, logger, row)
-        update_sync_data_stat(content, logger, row, '5min')
-        update_sync_data_stat(content, logger, row, 'daily')
+        for stat in STATS_DT:
+            ft['interval'] = stat
+            if Path(fetch.msid_files['statsdir'].abs).exists():
+                update_sync_data_stat(content, logger, row, stat)
 
     remove_outdated_sync_files(opt, logger, index_tbl, index_file)
 
@@ -390,7 +392,7 @@ def _get_stat_data_from_archive(filename, stat, tstart, tstop, last_row1, logger
     Also returns the corresponding table row indexes.
 
     :param filename: HDF5 file to read
-    :param stat: stat (5min or daily)
+    :param stat: stat (key of STATS_DT)
     :param tstart: min time
     :param tstop: max time
     :param last_row1: row1 for previous index table entry
@@ -452,12 +454,12 @@ def _get_stat_data_from_archive(filename, stat, tstart, tstop, last_row1, logger
 
 def update_sync_data_stat(content, logger, row, stat):
     """
-    Update stats (5min, daily) sync data for index table ``row``
+    Update stats (e.g. 5min, daily) sync data for index table ``row``
 
     :param content: content name (e.g. acis4eng)
     :param logger: logger
     :param row: one row of the full-res index table
-    :param stat: stat interval (5min or daily)
+    :param stat: stat interval (key of STATS_DT)
     :return:
     """
     ft = fetch.ft
@@ -8,17 +8,85 @@ import re
 from contextlib import contextmanager
 
 import six
-from six.moves import zip
 import numpy as np
 from Chandra.Time import DateTime
 
 
-# Cache the results of fetching 3 days of telemetry keyed by MSID
+# Cache the results of fetching 3 days of telemetry keyed by (MSID, stat), used
+# for computed MSIDs that have no archive metadata
 FETCH_SIZES = {}
 
-# Standard intervals for 5min and daily telemetry
-STATS_DT = {'5min': 328,
-            'daily': 86400}
+# Cache of bytes per fetched row keyed by (MSID, stat, unit system)
+FETCH_ROW_BYTES = {}
+
+# Stats table columns that are unit-converted in fetch
+STATS_CONVERT_COLS = ('val', 'min', 'max', 'mean',
+                      'p01', 'p05', 'p16', 'p50', 'p84', 'p95', 'p99')
+
+# Stats levels.  Each level is defined by:
+#
+#   dt: interval (sec) of one stats row, where row ``index`` covers times
+#       index * dt <= time < (index + 1) * dt
+#   parent: finer level from which n, min, max, mean, std and state counts are
+#       derived exactly (None => computed from full-resolution data).  The dt
+#       of a derived level must be an integer multiple of the parent dt.
+#   std: include the (time-weighted) standard deviation
+#   percentiles: include percentiles, which are always computed from the
+#       full-resolution data
+#   weights: include the sum of sample time weights ``sum_w`` (float64) and
+#       store ``mean`` and ``std`` as float64, with sample weights computed
+#       across bin boundaries.  This makes a level usable as a parent.
+#
+# The 5min and daily levels are the standard levels which are always available.
+# Additional levels are maintained by update_archive.py for a content type
+# once enabled with the --stats-level option.
+STATS_LEVELS = {
+    '5min': {'dt': 328, 'parent': None,
+             'std': False, 'percentiles': False, 'weights': False},
+    'daily': {'dt': 86400, 'parent': None,
+              'std': True, 'percentiles': True, 'weights': False},
+    '1min': {'dt': 60, 'parent': None,
+             'std': True, 'percentiles': False, 'weights': True},
+    'hourly': {'dt': 3600, 'parent': '1min',
+               'std': True, 'percentiles': True, 'weights': True},
+    'weekly': {'dt': 604800, 'parent': 'hourly',
+               'std': True, 'percentiles': True, 'weights': True},
+}
+
+# Standard stats levels that exist for every content type
+DEFAULT_STATS = ('5min', 'daily')
+
+# Intervals for each stats level
+STATS_DT = {name: level['dt'] for name, level in STATS_LEVELS.items()}
+
+# Max allowed deviation of sum(q**2) from 1 for a valid attitude quaternion in
+# ss_vector() (same as Quaternion.Quat)
+QUAT_NORM_TOL = 1e-6
+
+
+def get_stats_levels(stats):
+    """
+    Get the stats levels needed to maintain ``stats``, including parent levels,
+    ordered so that each level comes after its parent.
+
+    :param stats: list of stats level names
+    :returns: list of stats level names
+    """
+    out = []
+
+    def add_level(stat):
+        if stat not in STATS_LEVELS:
+            raise ValueError('stats level {!r} is not in allowed values {}'
+                             .format(stat, list(STATS_LEVELS)))
+        parent = STATS_LEVELS[stat]['parent']
+        if parent is not None:
+            add_level(parent)
+        if stat not in out:
+            out.append(stat)
+
+    for stat in stats:
+        add_level(stat)
+    return out
 
 
 def get_fetch_size(msids, start, stop, stat=None, interpolate_dt=None, fast=True):
@@ -29,19 +97,23 @@ def get_fetch_size(msids, start, stop, stat=None, interpolate_dt=None, fast=True
 
     Returns a tuple of the estimated megabytes of memory for the raw fetch and megabytes
     for the final output (which is different only in the case of interpolating).  This is
-    done by fetching 3 days of telemetry (2010:001 to 2010:004) and scaling appropriately.
+    computed from archive metadata without reading any telemetry: the number of rows comes
+    from the archfiles row counts (full resolution) or the stats table extent (stats), and
+    the bytes per row from the HDF5 column dtypes after unit conversion.  Computed MSIDs
+    have no such metadata and are estimated by fetching 3 days of telemetry (2010:001 to
+    2010:004) and scaling appropriately.
 
     If ``fast`` is True (default) then if either of the conditions below apply a result of
     (-1, -1) is returned, indicating that the fetch will probably be less than ~100 Mb and
     should be OK.  (This does not account for the number of MSIDs passed in ``msids``).
 
       - Fetch duration (stop - start) is less than 30 days
-      - Fetch ``stat`` is '5min' or 'daily'
+      - Fetch ``stat`` is not None (e.g. '5min' or 'daily')
 
     :param msids: list of MSIDs or a single MSID
     :param start: start time
     :param stop: stop time
-    :param stat: fetch stat (None|'5min'|'daily', default=None)
+    :param stat: fetch stat (None or a key of STATS_DT, default=None)
     :param interpolate_dt: interpolate the output to uniform time steps (default=None)
     :param fast: return (-1, -1) if conditions on duration / stat (default=True)
 
@@ -57,34 +129,94 @@ def get_fetch_size(msids, start, stop, stat=None, interpolate_dt=None, fast=True
 
     from . import fetch
 
-    # Allow for a single MSID input and make all values lower-case
+    # Allow for a single MSID input and expand any globs to MSID names
     if isinstance(msids, six.string_types):
         msids = [msids]
-    msids = [msid.lower() for msid in msids]
-
-    for msid in msids:
-        if (msid, stat) in FETCH_SIZES:
-            fetch_bytes, fetch_rows = FETCH_SIZES[msid, stat]
-        else:
-            dat = fetch.MSID(msid, '2010:001:00:00:01', '2010:004:00:00:01', stat=stat)
-            fetch_bytes = sum(getattr(dat, attr).nbytes for attr in dat.colnames)
-            fetch_rows = len(dat.vals)
-            FETCH_SIZES[msid, stat] = (fetch_bytes, fetch_rows)
-
-    scale = (stop - start) / 3.0
-    fetch_bytes = sum(FETCH_SIZES[msid, stat][0] * scale for msid in msids)
+    MSIDs = [MSID for msid in msids for MSID in fetch.msid_glob(msid)[1]]
 
+    fetch_bytes = 0.0
+    out_bytes = 0.0
     # Number of output rows = total fetch time (days) / interpolate interval in days
-    if interpolate_dt is None:
-        out_bytes = fetch_bytes
-    else:
+    if interpolate_dt is not None:
         n_rows_out = (stop - start) / (interpolate_dt / 86400)
-        out_bytes = sum(FETCH_SIZES[msid, stat][0] * n_rows_out / FETCH_SIZES[msid, stat][1]
-                        for msid in msids)
+
+    for MSID in MSIDs:
+        if MSID in fetch.content:
+            n_rows = _get_fetch_rows(MSID, start.secs, stop.secs, stat)
+            row_bytes = _get_fetch_row_bytes(MSID, stat)
+        else:
+            # Computed MSID, so scale from a 3-day sample fetch
+            if (MSID, stat) not in FETCH_SIZES:
+                dat = fetch.MSID(MSID, '2010:001:00:00:01', '2010:004:00:00:01', stat=stat)
+                FETCH_SIZES[MSID, stat] = (sum(getattr(dat, attr).nbytes
+                                               for attr in dat.colnames), len(dat.vals))
+            sample_bytes, sample_rows = FETCH_SIZES[MSID, stat]
+            n_rows = sample_rows * (stop - start) / 3.0
+            row_bytes = sample_bytes / max(sample_rows, 1)
+
+        fetch_bytes += n_rows * row_bytes
+        out_bytes += (n_rows if interpolate_dt is None else n_rows_out) * row_bytes
 
     return round(fetch_bytes / 1e6, 2), round(out_bytes / 1e6, 2)
 
 
+def _get_fetch_rows(msid, tstart, tstop, stat):
+    """
+    Estimate the number of rows fetched for ``msid`` from archive metadata.
+    """
+    from . import fetch
+
+    if stat is None:
+        with fetch._cache_ft(), fetch._set_msid_files_basedir(DateTime(tstart).date):
+            return fetch.get_n_rows(fetch.content[msid], tstart, tstop)
+
+    # Stats tables have at most one row per interval.  Scale the number of
+    # intervals in the time range by the fraction filled over the whole table.
+    dtype, n_rows, index0, index1 = fetch.get_h5_meta(msid, stat)
+    if n_rows == 0:
+        return 0.0
+    dt = STATS_DT[stat]
+    n_intervals = min(tstop / dt, index1 + 1) - max(tstart / dt, index0)
+    return max(n_intervals, 0.0) * n_rows / (index1 - index0 + 1)
+
+
+def _get_fetch_row_bytes(msid, stat):
+    """
+    Get the bytes per row of the MSID object columns for fetching ``msid`` with
+    ``stat``, from the HDF5 column dtypes and the current fetch unit system.
+    """
+    from . import fetch
+
+    key = (msid, stat, fetch.UNITS['system'])
+    if key not in FETCH_ROW_BYTES:
+        dtype = fetch.get_h5_meta(msid, stat)[0]
+
+        def out_itemsize(col_dtype, convert=True, delta_val=False):
+            if convert:
+                col_dtype = fetch.UNITS.convert(msid, np.zeros(1, dtype=col_dtype),
+                                                delta_val=delta_val).dtype
+            # Byte strings are returned as unicode (4 bytes per character)
+            return col_dtype.itemsize * (4 if col_dtype.kind == 'S' else 1)
+
+        if stat is None:
+            # vals, times, bads
+            row_bytes = out_itemsize(dtype) + 8 + 1
+        else:
+            # times plus each table column, where vals is a reference to means and
+            # the original val column is kept as midvals.
+            row_bytes = 8
+            names = [name for name in dtype.names if name != 'sum_w']
+            if 'mean' in names:
+                names.append('mean')
+            for name in names:
+                row_bytes += out_itemsize(dtype[name],
+                                          convert=(name in STATS_CONVERT_COLS or name == 'std'),
+                                          delta_val=(name == 'std'))
+        FETCH_ROW_BYTES[key] = row_bytes
+
+    return FETCH_ROW_BYTES[key]
+
+
 def ss_vector(start, stop=None, obj='Earth'):
     """Calculate vector to Earth, Sun, or Moon in Chandra body coordinates
     between ``start`` and ``stop`` dates at 5 minute (328 sec) intervals.
@@ -130,9 +262,6 @@ def ss_vector(start, stop=None, obj='Earth'):
 
     :returns: table of vector values
     """
-    from itertools import count
-    from Quaternion import Quat
-    from scipy.interpolate import interp1d
     from . import fetch
 
     sign = dict(earth=-1, sun=1, moon=1)
@@ -165,65 +294,115 @@ def ss_vector(start, stop=None, obj='Earth'):
     for i, axis in enumerate(axes):
         for obj in objs:
             msid = '{0}_{1}'.format(prefixes[obj], axis)
-            ephem_interp = interp1d(ephem[msid].times - tstart,
-                                    ephem[msid].vals, kind='linear')
-            obj_ecis[:, i] += sign[obj] * ephem_interp(times0)
+            ephem_times0 = ephem[msid].times - tstart
+            if len(times0) > 0 and (len(ephem_times0) == 0
+                                    or times0[0] < ephem_times0[0]
+                                    or times0[-1] > ephem_times0[-1]):
+                raise ValueError('{} ephemeris does not cover the requested times'
+                                 .format(msid))
+            obj_ecis[:, i] += sign[obj] * np.interp(times0, ephem_times0, ephem[msid].vals)
 
     distances = np.sqrt(np.sum(obj_ecis * obj_ecis, 1))
 
-    bad_q_atts = []  # List of inconsistent quaternion values in telemetry
-    p_obj_body = np.ndarray((len(times0), 3), dtype=float)
-    for i, obj_eci, distance, time, q1, q2, q3, q4 in zip(
-            count(), obj_ecis, distances, times0, q_atts['aoattqt1'].midvals,
-            q_atts['aoattqt2'].midvals, q_atts['aoattqt3'].midvals,
-            q_atts['aoattqt4'].midvals):
-        try:
-            q_att = Quat([q1, q2, q3, q4])
-        except ValueError:
-            bad_q_atts.append(i)
-            continue
-        p_obj_eci = obj_eci / distance
-        p_obj_body[i, :] = np.dot(q_att.transform.transpose(), p_obj_eci)
-
-    out = np.rec.fromarrays([times,
-                             distances / 1000.0,
+    # Drop inconsistent quaternion values in telemetry
+    qs = np.column_stack([q_atts[msid].midvals for msid in q_att_msids]).astype(np.float64)
+    ok = np.abs(1.0 - np.sum(qs ** 2, axis=1)) <= QUAT_NORM_TOL
+
+    # Object direction in body coordinates is transform.T . p_obj_eci
+    p_obj_ecis = obj_ecis / distances[:, np.newaxis]
+    p_obj_body = np.einsum('nji,nj->ni', _quat_transforms(qs[ok]), p_obj_ecis[ok])
+
+    out = np.rec.fromarrays([times[ok],
+                             distances[ok] / 1000.0,
                              p_obj_body[:, 0],
                              p_obj_body[:, 1],
                              p_obj_body[:, 2],
-                             obj_ecis[:, 0] / distances,
-                             obj_ecis[:, 1] / distances,
-                             obj_ecis[:, 2] / distances,
-                             q_atts['aoattqt1'].midvals,
-                             q_atts['aoattqt2'].midvals,
-                             q_atts['aoattqt3'].midvals,
-                             q_atts['aoattqt4'].midvals],
+                             p_obj_ecis[ok, 0],
+                             p_obj_ecis[ok, 1],
+                             p_obj_ecis[ok, 2],
+                             q_atts['aoattqt1'].midvals[ok],
+                             q_atts['aoattqt2'].midvals[ok],
+                             q_atts['aoattqt3'].midvals[ok],
+                             q_atts['aoattqt4'].midvals[ok]],
                             names=['times', 'distance',
                                    'body_x', 'body_y', 'body_z',
                                    'eci_x', 'eci_y', 'eci_z',
                                    'q1', 'q2', 'q3', 'q4'])
-    if bad_q_atts:
-        ok = np.ones(len(out), dtype=bool)
-        ok[bad_q_atts] = False
-        out = out[ok]
 
     return out
 
 
+def _quat_transforms(qs):
+    """
+    Get the rotation (transform) matrices for an array of quaternions, as for
+    ``Quaternion.Quat(q).transform`` of each quaternion.
+
+    :param qs: array of quaternions with shape (N, 4)
+    :returns: array of transform matrices with shape (N, 3, 3)
+    """
+    x, y, z, w = qs.T
+    xx2 = 2 * x * x
+    yy2 = 2 * y * y
+    zz2 = 2 * z * z
+    xy2 = 2 * x * y
+    wz2 = 2 * w * z
+    zx2 = 2 * z * x
+    wy2 = 2 * w * y
+    yz2 = 2 * y * z
+    wx2 = 2 * w * x
+
+    rmats = np.empty((len(qs), 3, 3), dtype=np.float64)
+    rmats[:, 0, 0] = 1. - yy2 - zz2
+    rmats[:, 0, 1] = xy2 - wz2
+    rmats[:, 0, 2] = zx2 + wy2
+    rmats[:, 1, 0] = xy2 + wz2
+    rmats[:, 1, 1] = 1. - xx2 - zz2
+    rmats[:, 1, 2] = yz2 - wx2
+    rmats[:, 2, 0] = zx2 - wy2
+    rmats[:, 2, 1] = yz2 + wx2
+    rmats[:, 2, 2] = 1. - xx2 - yy2
+    return rmats
+
+
 def _pad_long_gaps(times, bools, max_gap):
     dts = np.diff(times)
     i_long_gaps = np.flatnonzero(dts > max_gap)
     if len(i_long_gaps) > 0:
-        for i in i_long_gaps[::-1]:
-            times = np.concatenate([times[:i + 1],
-                                    [times[i] + max_gap / 2.0, times[i + 1] - max_gap / 2.0],
-                                    times[i + 1:]])
-            bools = np.concatenate([bools[:i + 1],
-                                    [False, False],
-                                    bools[i + 1:]])
+        # Insert two False values in each long gap at ``max_gap / 2`` from the
+        # data on either side, all in one pass.
+        i_insert = np.repeat(i_long_gaps + 1, 2)
+        pad_times = np.column_stack([times[i_long_gaps] + max_gap / 2.0,
+                                     times[i_long_gaps + 1] - max_gap / 2.0]).ravel()
+        times = np.insert(times.astype(pad_times.dtype, copy=False), i_insert, pad_times)
+        bools = np.insert(bools, i_insert, False)
     return times, bools
 
 
-def logical_intervals(times, bools, complete_intervals=True, max_gap=None):
+def _get_intervals_output(intervals, table, dates=None):
+    """
+    Make the output for ``logical_intervals`` or ``state_intervals`` from the
+    dict of ``intervals`` columns.  For ``table=True`` add the date columns
+    (``dates`` if supplied, otherwise converted from tstart and tstop).
+    """
+    names = sorted(intervals)
+    if not table:
+        return np.rec.fromarrays([intervals[name] for name in names], names=names)
+
+    from astropy.table import Table
+
+    if dates is None:
+        n_intervals = len(intervals['tstart'])
+        dates = (DateTime(np.concatenate([intervals['tstart'], intervals['tstop']])).date
+                 if n_intervals > 0 else np.zeros(0, dtype='U21'))
+        intervals['datestart'] = dates[:n_intervals]
+        intervals['datestop'] = dates[n_intervals:]
+    else:
+        intervals['datestart'] = dates[:-1]
+        intervals['datestop'] = dates[1:]
+    return Table(intervals, names=sorted(intervals))
+
+
+def logical_intervals(times, bools, complete_intervals=True, max_gap=None, table=True):
     """Determine contiguous intervals during which `bools` is True.
 
     If ``complete_intervals`` is True (default) then the intervals are guaranteed to
@@ -242,6 +421,9 @@ def logical_intervals(times, bools, complete_intervals=True, max_gap=None):
     * tstart: time of interval start (CXC sec)
     * tstop: time of interval stop (CXC sec)
 
+    With ``table=False`` a numpy structured array without the date columns is
+    returned instead, which is much faster for many intervals.
+
     Example (find SCS107 runs via telemetry)::
 
       >>> from Ska.engarchive import utils, fetch
@@ -262,25 +444,45 @@ def logical_intervals(times, bools, complete_intervals=True, max_gap=None):
     :param bools: array of logical True/False values
     :param complete_intervals: return only complete intervals (default=True)
     :param max_gap: max allowed gap between time stamps (sec, default=None)
+    :param table: return a Table with date columns (default) or a structured array
     :returns: Table of intervals
     """
     if max_gap is not None:
         times, bools = _pad_long_gaps(times, bools, max_gap)
 
-    intervals = state_intervals(times, bools)
+    intervals = _get_state_intervals(times, bools)
+    ok = intervals.pop('val').astype(bool)  # Intervals where bools is True
 
-    if complete_intervals:
-        if len(intervals) > 0 and intervals['val'][0]:
-            intervals = intervals[1:]
-        if len(intervals) > 0 and intervals['val'][-1]:
-            intervals = intervals[:-1]
+    if complete_intervals and len(ok) > 0:
+        ok[0] = ok[-1] = False
 
-    ok = intervals['val']  # Intervals where bools is True
-    del intervals['val']
-    return intervals[ok]
+    intervals = {name: vals[ok] for name, vals in intervals.items()}
+    return _get_intervals_output(intervals, table)
 
 
-def state_intervals(times, vals):
+def _get_state_intervals(times, vals):
+    """
+    Get the state intervals for ``state_intervals`` as a dict of the tstart,
+    tstop, duration and val columns.
+    """
+    if len(vals) < 2:
+        raise ValueError('Filtered data length must be at least 2')
+
+    transitions = np.hstack([[True], vals[:-1] != vals[1:], [True]])
+    t0 = times[0] - (times[1] - times[0]) / 2
+    t1 = times[-1] + (times[-1] - times[-2]) / 2
+    midtimes = np.hstack([[t0], (times[:-1] + times[1:]) / 2, [t1]])
+
+    state_vals = vals[transitions[1:]]
+    state_times = midtimes[transitions]
+
+    return {'tstart': state_times[:-1],
+            'tstop': state_times[1:],
+            'duration': state_times[1:] - state_times[:-1],
+            'val': state_vals}
+
+
+def state_intervals(times, vals, table=True):
     """
     Determine contiguous intervals during which the ``vals`` is unchanged.
 
@@ -293,6 +495,9 @@ def state_intervals(times, vals):
     * tstop: time of interval stop (CXC sec)
     * val: MSID value during the interval
 
+    With ``table=False`` a numpy structured array without the date columns is
+    returned instead, which is much faster for many intervals.
+
     Example::
 
       >>> from Ska.engarchive import fetch, utils
@@ -307,29 +512,16 @@ def state_intervals(times, vals):
 
     :param times: times (CXC seconds)
     :param vals: state values for which intervals are returned.
+    :param table: return a Table with date columns (default) or a structured array
     :returns: structured array table of intervals
     """
-    from astropy.table import Table
-
-    if len(vals) < 2:
-        raise ValueError('Filtered data length must be at least 2')
-
-    transitions = np.hstack([[True], vals[:-1] != vals[1:], [True]])
-    t0 = times[0] - (times[1] - times[0]) / 2
-    t1 = times[-1] + (times[-1] - times[-2]) / 2
-    midtimes = np.hstack([[t0], (times[:-1] + times[1:]) / 2, [t1]])
+    intervals = _get_state_intervals(times, vals)
 
-    state_vals = vals[transitions[1:]]
-    state_times = midtimes[transitions]
-
-    intervals = {'datestart': DateTime(state_times[:-1]).date,
-                 'datestop': DateTime(state_times[1:]).date,
-                 'tstart': state_times[:-1],
-                 'tstop': state_times[1:],
-                 'duration': state_times[1:] - state_times[:-1],
-                 'val': state_vals}
-
-    return Table(intervals, names=sorted(intervals))
+    # The intervals are contiguous so convert each boundary time to date once
+    dates = None
+    if table:
+        dates = DateTime(np.append(intervals['tstart'], intervals['tstop'][-1])).date
+    return _get_intervals_output(intervals, table, dates)
 
 
 def get_date_id(date):
@@ -0,0 +1,95 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+Benchmark decode throughput of the cheta HDF5 storage layouts.
+
+Writes a synthetic full-resolution MSID column (or copies a real one with
+--msid-file) in each storage layout to a temporary directory, then times a
+full read and a set of short random-window reads for each layout.
+
+Example::
+
+  python dev_utils/bench_storage_layouts.py --n-rows 30000000
+  python dev_utils/bench_storage_layouts.py --msid-file $SKA/data/eng_archive/data/thm1eng/TEPHIN.h5
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import tables
+
+from Ska.engarchive import storage
+
+
+def get_options():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--msid-file', help='Existing MSID h5 file to benchmark')
+    parser.add_argument('--n-rows', type=int, default=10000000,
+                        help='Rows of synthetic data (default=10000000)')
+    parser.add_argument('--window', type=int, default=86400,
+                        help='Rows per short-window read (default=86400, ~1 day)')
+    parser.add_argument('--n-windows', type=int, default=50,
+                        help='Number of short-window reads (default=50)')
+    return parser.parse_args()
+
+
+def make_synthetic(filename, n_rows):
+    # Slowly varying quantized signal with noise, typical of a temperature MSID
+    t = np.arange(n_rows)
+    vals = (300 + 5 * np.sin(t / 20000) + np.random.normal(scale=0.1, size=n_rows))
+    vals = np.round(vals, 1).astype(np.float32)
+    storage.create_msid_file(filename, 'SYNTH', tables.Float32Atom(), (0,), n_rows, layout=1)
+    with tables.open_file(filename, mode='a') as h5:
+        h5.root.data.append(vals)
+        h5.root.quality.append(np.zeros(n_rows, dtype=bool))
+
+
+def bench(filename, window, n_windows):
+    size_mb = os.path.getsize(filename) / 1e6
+    # Short windows first with a freshly opened file so the PyTables chunk
+    # cache is not already populated by the full read.
+    with tables.open_file(filename) as h5:
+        n_rows = len(h5.root.data)
+        nbytes = h5.root.data.size_in_memory
+
+        rng = np.random.default_rng(0)
+        starts = rng.integers(0, max(1, n_rows - window), n_windows)
+        t0 = time.time()
+        for start in starts:
+            h5.root.data[start:start + window]
+        dt_short = (time.time() - t0) / n_windows
+
+    with tables.open_file(filename) as h5:
+        t0 = time.time()
+        h5.root.data[:]
+        dt_full = time.time() - t0
+
+    return size_mb, nbytes / 1e6 / dt_full, dt_short * 1000
+
+
+def main():
+    opt = get_options()
+    tmpdir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tmpdir, 'MSID.h5')
+        if opt.msid_file:
+            shutil.copy(opt.msid_file, filename)
+        else:
+            make_synthetic(filename, opt.n_rows)
+
+        print('{:>6s} {:>12s} {:>10s} {:>14s} {:>14s}'
+              .format('layout', 'complib', 'size (MB)', 'full (MB/s)', 'window (ms)'))
+        for layout in sorted(storage.LAYOUTS):
+            storage.migrate_file(filename, layout)
+            size_mb, full_rate, window_ms = bench(filename, opt.window, opt.n_windows)
+            print('{:>6d} {:>12s} {:>10.1f} {:>14.1f} {:>14.2f}'
+                  .format(layout, storage.LAYOUTS[layout]['complib'],
+                          size_mb, full_rate, window_ms))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()